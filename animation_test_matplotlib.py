@@ -2,33 +2,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.animation import FuncAnimation
 
+from blitting import BlitManager
 
-class BlitManager:
-    def __init__(self, canvas, animated_artists=()):
-        self.canvas = canvas
-        self._bg = None
-        self._artists = list(animated_artists)
-        canvas.mpl_connect("draw_event", self.on_draw)
-
-    def on_draw(self, event):
-        cv = self.canvas
-        if event is not None and event.canvas != cv:
-            return  # Ignore events from a different canvas
-        if self._bg is None:
-            self._bg = cv.copy_from_bbox(cv.figure.bbox)
-        self._draw_animated()
-
-    def _draw_animated(self):
-        for a in self._artists:
-            self.canvas.figure.draw_artist(a)
-
-    def update(self):
-        if self._bg is None:
-            self.on_draw(None)
-        else:
-            self.canvas.restore_region(self._bg)
-            self._draw_animated()
-            self.canvas.blit(self.canvas.figure.bbox)
 
 fig, ax = plt.subplots()
 x = np.linspace(0, 2 * np.pi, 500)
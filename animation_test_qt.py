@@ -1,9 +1,14 @@
 import sys
 import numpy as np
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QSlider, QLabel, QCheckBox
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QSlider, QLabel, QCheckBox, QComboBox
 from PyQt5.QtCore import Qt, QTimer
 import pyqtgraph as pg
-import sounddevice as sd
+
+from audio_backend import get_backend
+from callback_stats import CallbackStats
+from filters import DEFAULT_Q, FILTER_TYPES, BiquadFilter
+from limiter import LookaheadLimiter
+from trace_events import traced
 
 
 class SineWaveApp(QMainWindow):
@@ -106,12 +111,32 @@ class SineWaveApp(QMainWindow):
         self.add_slider("MAG", -100, 100, self.mag, lambda value: setattr(self, 'mag', value), layout)
         self.add_slider("FB", -200, 200, self.fb, lambda value: setattr(self, 'fb', value), layout)
 
-
-        # Start audio stream
-        self.stream = sd.OutputStream(
+        # Filter stage after the oscillator; parameter changes glide over the next block
+        self.filter_type = "off"
+        self.filter = BiquadFilter("lowpass", 2000.0, DEFAULT_Q, sample_rate=self.sample_rate)
+        self.filter_combo = QComboBox()
+        self.filter_combo.addItems(("off",) + FILTER_TYPES)
+        self.filter_combo.currentTextChanged.connect(self.update_filter_type)
+        layout.addWidget(QLabel("Filter"))
+        layout.addWidget(self.filter_combo)
+        # Slider positions 0..1000 map logarithmically to 20 Hz..20 kHz
+        self.add_slider("Cutoff (20 Hz - 20 kHz)", 0, 1000, 667,
+                        lambda value: self.filter.set(frequency=20 * 1000 ** (value / 1000)), layout)
+        self.add_slider("Q (x100)", 10, 1000, int(100 * DEFAULT_Q),
+                        lambda value: self.filter.set(q=value / 100), layout)
+        self.add_slider("Peak gain (dB)", -24, 24, 0, lambda value: self.filter.set(gain_db=value), layout)
+
+
+        # Lookahead limiter with true-peak detection as the last stage
+        self.limiter = LookaheadLimiter(self.sample_rate, true_peak=True)
+
+        # Start audio stream, timing every callback against its budget
+        self.callback_stats = CallbackStats("Output callback", self.sample_rate)
+        self.callback_stats.start_logging(log=print)
+        self.stream = get_backend().output_stream(
             samplerate=self.sample_rate,
             channels=1,
-            callback=self.audio_callback,
+            callback=self.callback_stats.wrap(self.audio_callback),
             blocksize=self.buffer_size
         )
         self.stream.start()
@@ -148,12 +173,20 @@ class SineWaveApp(QMainWindow):
     def update_frequency(self, value):
         self.frequency = value
 
+    def update_filter_type(self, kind):
+        if kind != "off":
+            self.filter.set_kind(kind)
+            if self.filter_type == "off":
+                self.filter.reset()  # Do not resume from the state of the last time it was on
+        self.filter_type = kind
+
     def update_amplitude(self, value):
         self.amplitude = value / self.amp_slider.maximum()
 
     def update_pvel(self, value):
         self.pvel = value
 
+    @traced("audio_callback")
     def audio_callback(self, outdata, frames, time, status):
         """
         Callback for sounddevice. Generates audio samples dynamically.
@@ -176,10 +209,14 @@ class SineWaveApp(QMainWindow):
         if self.feedback_enabled:
             samples += samples//1 * (self.fb/100)
 
+        if self.filter_type != "off":
+            samples = self.filter.process(samples)
+
         # Normalize
         # samples = samples / np.max(np.abs(samples))
 
-        samples = np.clip(samples, -1, 1)
+        # Modulation and feedback can overshoot; limit instead of clipping
+        samples = self.limiter.process(samples)
 
         # Update the buffer plot
         self.buffer_y = samples
@@ -194,6 +231,7 @@ class SineWaveApp(QMainWindow):
         outdata[:, 0] = samples
 
 
+    @traced("update_plot")
     def update_plot(self):
         # self.phase += (2 * np.pi * self.frequency / self.sample_rate)
         self.phase += 2 * np.pi * (200*self.pvel) / self.sample_rate
@@ -207,6 +245,8 @@ class SineWaveApp(QMainWindow):
         """
         self.stream.stop()
         self.stream.close()
+        self.callback_stats.stop_logging()
+        print(self.callback_stats.log_line())
         super().closeEvent(event)
 
 
@@ -0,0 +1,343 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+BACKEND_ENV = "WAVE_GEN_AUDIO_BACKEND"        # "sounddevice" (default) or "virtual"
+VIRTUAL_SPEED_ENV = "WAVE_GEN_VIRTUAL_SPEED"  # Pacing of the virtual backend, 0 = free-running
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_BLOCKSIZE = 1024
+TIMING_CAPACITY = 1 << 16                     # Callback durations kept per virtual stream
+
+class CallbackStop(Exception):
+    """Raised by a callback to stop the stream after the current block."""
+
+
+class CallbackAbort(Exception):
+    """Raised by a callback to abort the stream immediately."""
+
+
+class CallbackFlags:
+    """Stand-in for `sd.CallbackFlags`; falsy when nothing went wrong."""
+    def __init__(self):
+        self.input_overflow = False
+        self.input_underflow = False
+        self.output_overflow = False
+        self.output_underflow = False
+        self.priming_output = False
+
+    def __bool__(self):
+        return any((self.input_overflow, self.input_underflow, self.output_overflow,
+                    self.output_underflow, self.priming_output))
+
+    def __repr__(self):
+        names = [name for name, value in vars(self).items() if value]
+        return f"<CallbackFlags: {' | '.join(names) if names else 'ok'}>"
+
+
+class StreamTime:
+    """Stand-in for the `time` argument of a sounddevice callback."""
+    def __init__(self, current_time, adc_time, dac_time):
+        self.currentTime = current_time
+        self.inputBufferAdcTime = adc_time
+        self.outputBufferDacTime = dac_time
+
+
+class VirtualStream:
+    """
+    Stream driven by a simulated clock instead of an audio device.
+
+    Callbacks run on a background thread with the sounddevice signature. With
+    `speed` > 0 each block is due `blocksize / samplerate / speed` seconds after
+    the previous one and the thread sleeps until then (paced); with `speed` 0
+    blocks are issued back to back and the clock only advances virtually
+    (free-running). Every callback is timed against its budget so callback cost
+    and underrun behaviour can be measured without hardware.
+    """
+    def __init__(self, kind, samplerate=None, channels=1, callback=None, blocksize=None, dtype="float32",
+                 speed=1.0, source=None, sink=None, finished_callback=None, device=None, **kwargs):
+        """
+        Args:
+            kind: "input" or "output".
+            samplerate, channels, callback, blocksize, dtype: As for `sd.InputStream`/`sd.OutputStream`.
+            speed: 1 = real time, N = N times faster, 0 = free-running.
+            source: For input streams, `source(frames, channels)` returning the next block
+                (fewer frames or None ends the stream). Defaults to silence.
+            sink: For output streams, called with a copy of every rendered block.
+            finished_callback: Called once the stream has stopped.
+        """
+        self.kind = kind
+        self.samplerate = samplerate or DEFAULT_SAMPLE_RATE
+        self.channels = channels
+        self.callback = callback
+        self.blocksize = blocksize or DEFAULT_BLOCKSIZE
+        self.dtype = np.dtype(dtype)
+        self.speed = speed
+        self.source = source
+        self.sink = sink
+        self.finished_callback = finished_callback
+        self.latency = self.blocksize / self.samplerate
+
+        self.blocks = 0
+        self.deadline_misses = 0
+        self.durations_ns = np.zeros(TIMING_CAPACITY, dtype=np.int64)
+        self.active = False
+        self.stopped = True
+        self.closed = False
+        self._thread = None
+
+    @property
+    def budget(self):
+        """Seconds of audio per callback."""
+        return self.blocksize / self.samplerate
+
+    @property
+    def cpu_load(self):
+        """Fraction of the callback budget spent in the callback, as `sd.Stream.cpu_load`."""
+        durations = self.durations_ns[:min(self.blocks, TIMING_CAPACITY)]
+        return float(durations.mean()) / 1e9 / self.budget if len(durations) else 0.0
+
+    def _next_input(self):
+        if self.source is None:
+            return np.zeros((self.blocksize, self.channels), dtype=self.dtype), self.blocksize
+        block = self.source(self.blocksize, self.channels)
+        if block is None:
+            return None, 0
+        filled = len(block)
+        if filled < self.blocksize:
+            padded = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+            padded[:filled] = block
+            block = padded
+        return block, filled
+
+    def _run(self):
+        period = self.budget
+        budget_ns = int(period * 1e9)
+        outdata = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+        start = time.perf_counter()
+        late = False
+        while self.active:
+            status = CallbackFlags()
+            if late:
+                # A late callback means the device ran dry (output) or overwrote unread input
+                if self.kind == "output":
+                    status.output_underflow = True
+                else:
+                    status.input_overflow = True
+
+            stream_time = self.blocks * period
+            timing = StreamTime(stream_time, stream_time, stream_time + self.latency)
+            filled = self.blocksize
+            try:
+                if self.kind == "input":
+                    indata, filled = self._next_input()
+                    if indata is None:
+                        break
+                    started = time.perf_counter_ns()
+                    self.callback(indata, self.blocksize, timing, status)
+                else:
+                    outdata.fill(0)
+                    started = time.perf_counter_ns()
+                    self.callback(outdata, self.blocksize, timing, status)
+                    if self.sink is not None:
+                        self.sink(outdata.copy())
+                stop_request = None
+            except (CallbackStop, CallbackAbort) as e:
+                stop_request = e
+            duration = time.perf_counter_ns() - started
+            self.durations_ns[self.blocks % TIMING_CAPACITY] = duration
+            self.blocks += 1
+            if stop_request is not None or filled < self.blocksize:
+                break
+
+            if self.speed > 0:
+                # Paced: the next block is due one period after this one
+                deadline = start + self.blocks * period / self.speed
+                delay = deadline - time.perf_counter()
+                late = delay < 0
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                # Free-running: the virtual clock advances by one period per block
+                late = duration > budget_ns
+            if late:
+                self.deadline_misses += 1
+        self.active = False
+        if self.finished_callback is not None:
+            self.finished_callback()
+
+    def timing(self):
+        """
+        Summary of callback timing against the per-block budget.
+
+        Returns:
+            Dictionary with block count, budget, duration percentiles (ms) and deadline misses.
+        """
+        durations = self.durations_ns[:min(self.blocks, TIMING_CAPACITY)] / 1e6
+        if len(durations) == 0:
+            durations = np.zeros(1)
+        return {
+            "blocks": self.blocks,
+            "budget_ms": 1000 * self.budget,
+            "mean_ms": float(durations.mean()),
+            "p50_ms": float(np.percentile(durations, 50)),
+            "p99_ms": float(np.percentile(durations, 99)),
+            "max_ms": float(durations.max()),
+            "cpu_load": self.cpu_load,
+            "deadline_misses": self.deadline_misses,
+        }
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self.stopped = False
+        self._thread = threading.Thread(target=self._run, name=f"Virtual{self.kind.title()}Stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.active = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.stopped = True
+
+    def abort(self):
+        self.stop()
+
+    def close(self):
+        self.stop()
+        self.closed = True
+
+    def wait(self):
+        """Block until the stream finishes on its own (or is stopped)."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SoundDeviceBackend:
+    """Real audio devices through sounddevice/PortAudio."""
+    name = "sounddevice"
+
+    def query_devices(self, rescan=False):
+        import sounddevice as sd
+        if rescan:
+            # PortAudio only sees devices present when it was initialized; re-initializing
+            # picks up hotplugged ones but invalidates open streams, so only rescan without any
+            sd._terminate()
+            sd._initialize()
+        return sd.query_devices()
+
+    def query_hostapis(self):
+        import sounddevice as sd
+        return sd.query_hostapis()
+
+    def default_device(self):
+        import sounddevice as sd
+        return sd.default.device
+
+    def default_samplerate(self, kind="output"):
+        """Native rate of the default device, to which PortAudio or the OS would otherwise resample."""
+        import sounddevice as sd
+        return sd.query_devices(kind=kind)['default_samplerate']
+
+    def _open(self, stream_class, kwargs, sd):
+        # Callbacks raise this module's CallbackStop/CallbackAbort (defined here so importing
+        # audio_backend does not start PortAudio); PortAudio only recognizes sounddevice's own
+        callback = kwargs.get("callback")
+        if callback is not None:
+            def translated_callback(*args):
+                try:
+                    callback(*args)
+                except CallbackStop:
+                    raise sd.CallbackStop
+                except CallbackAbort:
+                    raise sd.CallbackAbort
+            kwargs["callback"] = translated_callback
+        return stream_class(**kwargs)
+
+    def input_stream(self, **kwargs):
+        import sounddevice as sd
+        return self._open(sd.InputStream, kwargs, sd)
+
+    def output_stream(self, **kwargs):
+        import sounddevice as sd
+        return self._open(sd.OutputStream, kwargs, sd)
+
+
+class VirtualBackend:
+    """Hardware-free backend whose streams are `VirtualStream`s on a simulated clock."""
+    name = "virtual"
+
+    def __init__(self, speed=1.0, sample_rate=DEFAULT_SAMPLE_RATE, channels=2):
+        self.speed = speed
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.streams = []  # Every stream opened, for inspecting timing afterwards
+
+    def query_devices(self, rescan=False):
+        # Same keys as the sounddevice device dictionaries the scripts read
+        return [{
+            'name': "Virtual device",
+            'index': 0,
+            'hostapi': 0,
+            'max_input_channels': self.channels,
+            'max_output_channels': self.channels,
+            'default_samplerate': float(self.sample_rate),
+            'default_low_input_latency': 0.0,
+            'default_low_output_latency': 0.0,
+            'default_high_input_latency': 0.0,
+            'default_high_output_latency': 0.0,
+        }]
+
+    def query_hostapis(self):
+        return [{'name': "Virtual", 'devices': [0], 'default_input_device': 0, 'default_output_device': 0}]
+
+    def default_device(self):
+        return 0, 0
+
+    def default_samplerate(self, kind="output"):
+        return float(self.sample_rate)
+
+    def _open(self, kind, kwargs):
+        kwargs.setdefault("speed", self.speed)
+        kwargs.setdefault("samplerate", self.sample_rate)
+        stream = VirtualStream(kind, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def input_stream(self, **kwargs):
+        return self._open("input", kwargs)
+
+    def output_stream(self, **kwargs):
+        return self._open("output", kwargs)
+
+
+_backend = None
+
+
+def get_backend():
+    """Process-wide backend, chosen by the WAVE_GEN_AUDIO_BACKEND environment variable."""
+    global _backend
+    if _backend is None:
+        name = os.environ.get(BACKEND_ENV, SoundDeviceBackend.name)
+        if name == VirtualBackend.name:
+            _backend = VirtualBackend(speed=float(os.environ.get(VIRTUAL_SPEED_ENV, "1")))
+        elif name == SoundDeviceBackend.name:
+            _backend = SoundDeviceBackend()
+        else:
+            raise ValueError(f"Unknown audio backend: {name}")
+    return _backend
+
+
+def set_backend(backend):
+    """Override the process-wide backend (e.g. with a configured `VirtualBackend`)."""
+    global _backend
+    _backend = backend
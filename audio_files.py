@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+import recorder
+
+
+def open_audio(path, sample_rate=None, channels=1, dtype="float32"):
+    """
+    Memory-map a WAV file, a `StreamRecorder` recording or a headerless raw file.
+
+    Args:
+        path: File to open.
+        sample_rate: Sampling rate of a headerless raw file (ignored otherwise).
+        channels: Channel count of a headerless raw file (ignored otherwise).
+        dtype: Sample type of a headerless raw file (ignored otherwise).
+
+    Returns:
+        (data, sample_rate) where data is a (frames, channels) array backed by the file.
+        Integer PCM is returned as stored; use `to_float` on the slices you need.
+    """
+    if path.lower().endswith(".wav"):
+        from scipy.io import wavfile  # Only WAV input needs scipy.io
+
+        sample_rate, data = wavfile.read(path, mmap=True)
+        return (data[:, np.newaxis] if data.ndim == 1 else data), sample_rate
+
+    if os.path.exists(path + ".json"):
+        return recorder.open_recording(path)
+
+    if sample_rate is None:
+        raise ValueError(f"{path} has no header; a sample rate is required")
+    data = np.memmap(path, dtype=dtype, mode="r")
+    return data[:len(data) // channels * channels].reshape(-1, channels), sample_rate
+
+
+def to_float(samples):
+    """Convert PCM samples to float32 in [-1, 1]; float input is passed through."""
+    samples = np.asarray(samples)
+    if samples.dtype.kind == "f":
+        return samples.astype(np.float32, copy=False)
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / 128
+    return samples.astype(np.float32) / -float(np.iinfo(samples.dtype).min)
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class BatchedSTFT:
+    """
+    Multichannel short-time Fourier transform computed in batches.
+
+    Incoming blocks are appended to a per-channel backlog. Each call to
+    `process` stacks every complete frame of every channel into one 2D array
+    and transforms them with a single multi-threaded `scipy.fft.rfft` call.
+    """
+    def __init__(self, n_fft, hop, channels, window="hann", workers=None):
+        """
+        Args:
+            n_fft: Frame length (FFT size) in samples.
+            hop: Number of samples between consecutive frames.
+            channels: Number of input channels.
+            window: Window name or tuple accepted by `scipy.signal.get_window`.
+            workers: Threads for the FFT (default: all CPU cores).
+        """
+        self.n_fft = n_fft
+        self.hop = hop
+        self.channels = channels
+        self.workers = workers or os.cpu_count() or 1
+        # scipy is imported here rather than at module level; scipy.signal alone takes ~1 s to load
+        import scipy.fft
+        from scipy.signal import get_window
+
+        self._rfft = scipy.fft.rfft
+        self.window = get_window(window, n_fft).astype(np.float32)
+        self.freqs = np.fft.rfftfreq(n_fft)  # In cycles/sample; multiply by the sample rate for Hz
+
+        # Backlog of samples not yet consumed by a full frame, shape (channels, samples)
+        self.backlog = np.zeros((channels, n_fft - hop), dtype=np.float32)
+
+    def push(self, block):
+        """Append a (frames, channels) block, as delivered by `sd.InputStream`."""
+        self.backlog = np.concatenate((self.backlog, np.asarray(block, dtype=np.float32).T), axis=1)
+
+    def pending_frames(self):
+        """Number of complete frames waiting to be transformed."""
+        available = self.backlog.shape[1]
+        return 0 if available < self.n_fft else 1 + (available - self.n_fft) // self.hop
+
+    def process(self):
+        """
+        Transform all pending frames of all channels in one batch.
+
+        Returns:
+            Complex array of shape (channels, frames, n_fft // 2 + 1).
+        """
+        count = self.pending_frames()
+        if count == 0:
+            return np.empty((self.channels, 0, self.n_fft // 2 + 1), dtype=np.complex64)
+
+        # (channels, count, n_fft) view of overlapping frames; the window multiply makes the copy
+        frames = sliding_window_view(self.backlog, self.n_fft, axis=1)[:, :count * self.hop:self.hop]
+        frames = frames * self.window
+
+        spectra = self._rfft(frames, axis=-1, workers=self.workers)
+
+        # Keep only the overlap still needed by the next frame
+        self.backlog = self.backlog[:, count * self.hop:].copy()
+        return spectra
+
+    def magnitude(self):
+        """Magnitude spectra of all pending frames, normalised by the FFT size."""
+        return np.abs(self.process()) / self.n_fft
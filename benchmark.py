@@ -0,0 +1,532 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import warnings
+
+import numpy as np
+
+MIN_TIME = 0.02                  # Seconds per timed repeat (loops are calibrated to reach it)
+REPEATS = 5                      # Timed repeats per case; the median is compared
+THRESHOLD = 0.15                 # Relative slowdown flagged as a regression
+SAMPLE_RATE = 44100
+BLOCK_SIZES = (64, 256, 1024, 2048, 4096, 8192)
+VERTEX_COUNTS = (3, 10, 100, 1000)
+INTERPOLATION_TYPES = ("linear", "cubic", "nearest", "smooth")
+
+_suites = []
+
+
+def suite(func):
+    """
+    Register a function yielding (case name, zero-argument callable) pairs.
+
+    A case may add a third item, the number of units (e.g. voices) one call
+    processes; the time per unit is then reported as well.
+    """
+    _suites.append(func)
+    return func
+
+
+def lazy(factory):
+    """
+    Defer building a fixture until a case first uses it.
+
+    `run` only calls the cases that `-k` selects, so fixtures wrapped this way
+    (large files, libraries, compiled filters) are never built for the others.
+    The first call happens during loop calibration, so it is not timed.
+    """
+    built = []
+
+    def get():
+        if not built:
+            built.append(factory())
+        return built[0]
+    return get
+
+
+def measure(fn, min_time=MIN_TIME, repeats=REPEATS):
+    """
+    Time `fn`, calibrating the loop count so each repeat takes at least `min_time`.
+
+    Returns:
+        Dictionary with the median and minimum time per call in microseconds.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed > min_time / 4 else 8
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - start) / loops)
+    return {"median_us": 1e6 * float(np.median(times)), "min_us": 1e6 * float(np.min(times)), "loops": loops}
+
+
+# --- Synthesis ---
+
+@suite
+def synthesis():
+    """wave_gen.generate_custom_waveform per callback: pick the mip level and read one block from the table."""
+    from synth import compile_mip_levels, compile_wavetable, mip_level, render_wavetable
+
+    x = np.linspace(0, 1, 10)
+    mips = lazy(lambda: compile_mip_levels(compile_wavetable(list(zip(x, np.sin(2 * np.pi * x))), "cubic")))
+    for frequency in (440, 4000):
+        increment = frequency / SAMPLE_RATE
+        for frames in BLOCK_SIZES:
+            def step(frames=frames, increment=increment):
+                tables = mips()
+                table = tables[mip_level(len(tables), increment, tables.shape[1] - 1)]
+                render_wavetable(table, frames, 0.25, increment)
+            yield f"synth/frequency={frequency}/block={frames}", step
+
+
+@suite
+def waveform_functions():
+    """sound_generation_test waveform functions for one block."""
+    import sound_generation_test
+
+    for name in ("sine", "square", "triangle"):
+        function = sound_generation_test.get_waveform_function(name)
+        for frames in BLOCK_SIZES:
+            t = np.arange(frames) / SAMPLE_RATE
+            yield f"waveform/{name}/block={frames}", lambda function=function, t=t: function(t, 440)
+
+
+@suite
+def wavetable():
+    """Compiled-wavetable synthesis: compile once per edit, then one table read per callback."""
+    from synth import compile_mip_levels, compile_wavetable, render_wavetable
+
+    for count in VERTEX_COUNTS:
+        x = np.linspace(0, 1, count)
+        vertices = list(zip(x, np.sin(2 * np.pi * x)))
+        for kind in INTERPOLATION_TYPES:
+            yield f"wavetable/compile/{kind}/vertices={count}", lambda v=vertices, k=kind: compile_wavetable(v, k)
+
+    table = compile_wavetable(list(zip(np.linspace(0, 1, 10), np.zeros(10))), "cubic")
+    for frames in BLOCK_SIZES:
+        yield f"wavetable/render/block={frames}", lambda frames=frames: render_wavetable(table, frames, 0.25, 440 / SAMPLE_RATE)
+    yield "wavetable/mip_levels", lambda: compile_mip_levels(table)
+
+
+@suite
+def filters():
+    """Biquad filter stage per block, static and while the cutoff glides; units are voices."""
+    from filters import MultiVoiceFilter
+
+    rng = np.random.default_rng(0)
+    for voices in (1, 8, 64):
+        for frames in (256, 2048):
+            block = rng.standard_normal((voices, frames))
+            static = lazy(lambda voices=voices: MultiVoiceFilter(voices, "lowpass", 1000.0, sample_rate=SAMPLE_RATE))
+            yield f"filter/static/voices={voices}/block={frames}", lambda f=static, b=block: f().process(b), voices
+
+            gliding = lazy(lambda voices=voices: MultiVoiceFilter(voices, "lowpass", 1000.0, sample_rate=SAMPLE_RATE))
+
+            def glide(f=gliding, b=block):
+                f().set(frequency=2000.0 if f().target[0, 0] == 1000.0 else 1000.0)
+                f().process(b)
+            yield f"filter/glide/voices={voices}/block={frames}", glide, voices
+
+            spread = lazy(lambda voices=voices: MultiVoiceFilter(
+                voices, "lowpass", np.geomspace(200, 5000, voices), sample_rate=SAMPLE_RATE))
+            yield (f"filter/per_voice_cutoff/voices={voices}/block={frames}",
+                   lambda f=spread, b=block: f().process(b), voices)
+
+
+@suite
+def reverb():
+    """Partitioned convolution reverb per block against wave_gen's 2048-frame budget (46 ms)."""
+    from convolution_reverb import ConvolutionReverb, synthetic_ir
+
+    rng = np.random.default_rng(0)
+    for seconds in (1.0, 3.0, 6.0):
+        for frames in (256, 2048):
+            reverb = lazy(lambda seconds=seconds, frames=frames: ConvolutionReverb(synthetic_ir(SAMPLE_RATE, seconds), frames))
+            block = rng.standard_normal(frames)
+            yield f"reverb/partitioned/ir={seconds:g}s/block={frames}", lambda r=reverb, b=block: r().process(b)
+
+    # Reference: direct FFT convolution of one block with the whole 3 s IR
+    from scipy.signal import fftconvolve
+    ir, block = lazy(lambda: synthetic_ir(SAMPLE_RATE, 3.0)), rng.standard_normal(2048)
+    yield "reverb/fftconvolve/ir=3s/block=2048", lambda: fftconvolve(block, ir())
+
+
+@suite
+def limiter():
+    """Lookahead limiter per block, sample-peak and true-peak, against the np.clip it replaces."""
+    from limiter import LookaheadLimiter
+
+    rng = np.random.default_rng(0)
+    for frames in BLOCK_SIZES:
+        block = 2 * rng.standard_normal(frames)  # Loud enough to limit most of the time
+        for true_peak in (False, True):
+            limiter = LookaheadLimiter(SAMPLE_RATE, true_peak=true_peak)
+            kind = "true_peak" if true_peak else "sample_peak"
+            yield f"limiter/{kind}/block={frames}", lambda l=limiter, b=block: l.process(b)
+        yield f"limiter/clip/block={frames}", lambda b=block: np.clip(b, -1, 1)
+
+
+@suite
+def resampling():
+    """Streaming polyphase resampler per input block; prints each conversion's filter latency."""
+    from resampler import StreamingResampler
+
+    def build(input_rate, output_rate):
+        resampler = StreamingResampler(input_rate, output_rate, channels=2)
+        print(f"Resampler {input_rate} -> {output_rate} Hz: ratio {resampler.up}/{resampler.down}, "
+              f"latency {1000 * resampler.latency:.2f} ms")
+        return resampler
+
+    rng = np.random.default_rng(0)
+    for input_rate, output_rate in ((44100, 48000), (48000, 44100), (44100, 96000), (96000, 48000)):
+        resampler = lazy(lambda rates=(input_rate, output_rate): build(*rates))
+        for frames in (256, 2048):
+            block = rng.standard_normal((frames, 2))
+            yield (f"resample/{input_rate}->{output_rate}/block={frames}",
+                   lambda r=resampler, b=block: r().process(b))
+
+    # The device-callback path: exact output frames, rendering whole 2048-frame engine blocks
+    resampler = lazy(lambda: StreamingResampler(44100, 48000, channels=2))
+    block = rng.standard_normal((2048, 2))
+    yield "resample/pull/44100->48000/frames=2229", lambda: resampler().pull(2229, lambda n: np.resize(block, (n, 2)), 2048)
+
+
+@suite
+def patch_library():
+    """Opening a memory-mapped library of 200 patches and selecting one, versus compiling it."""
+    import atexit
+    import shutil
+    import tempfile
+    from patch_format import PatchLibrary, compile_patch, write_library
+
+    x = np.linspace(0, 1, 100)
+    vertices = list(zip(x, np.sin(2 * np.pi * x)))
+
+    def build():
+        patch = compile_patch("patch", vertices, "cubic")
+        directory = tempfile.mkdtemp()
+        atexit.register(shutil.rmtree, directory)
+        path = os.path.join(directory, "patches.wgp")
+        write_library(path, (patch._replace(name=f"patch {i}") for i in range(200)))
+        return path
+    path = lazy(build)
+    library = lazy(lambda: PatchLibrary(path()))
+
+    yield "patches/open/patches=200", lambda: PatchLibrary(path())
+    yield "patches/select/patches=200", lambda: library()["patch 100"]
+    yield "patches/compile/vertices=100", lambda: compile_patch("patch", vertices, "cubic")
+
+
+@suite
+def vertex_editing():
+    """VertexModel insertion, screen-space hit-testing and edit history."""
+    from vertex_model import VertexModel
+
+    rng = np.random.default_rng(0)
+    for count in (10, 1000, 10000):
+        model = VertexModel(zip(rng.random(count), rng.random(count)))
+        transform = lambda points: points * 500
+
+        def insert_and_remove(model=model):
+            model.remove(model.insert(0.5, 0.5))
+        yield f"vertices/insert_remove/vertices={count}", insert_and_remove
+        yield f"vertices/nearest/vertices={count}", lambda model=model: model.nearest(250, 250, transform, 10)
+
+    # A drag recorded into the edit history, then undone and redone
+    from edit_history import EditHistory
+    model = VertexModel(zip(rng.random(1000), rng.random(1000)))
+    history = EditHistory(model)
+
+    def drag_undo_redo():
+        for step in range(100):
+            model.move(500, model.x[500], step / 100)
+        history.seal()
+        history.undo()
+        history.redo()
+    yield "vertices/history_drag_undo_redo/moves=100", drag_undo_redo
+
+
+@suite
+def curve_simplification():
+    """Freehand stroke simplification: streaming Visvalingam per point and the final RDP pass."""
+    from curve_simplify import StreamingSimplifier, rdp
+
+    t = np.linspace(0, 1, 2000)
+    stroke = np.column_stack((t, np.sin(6 * np.pi * t) + np.random.default_rng(0).normal(0, 0.002, len(t))))
+
+    def streaming():
+        simplifier = StreamingSimplifier(64)
+        for x, y in stroke:
+            simplifier.add(x, y)
+    yield "simplify/streaming/points=2000", streaming
+    yield "simplify/rdp/points=2000", lambda: rdp(stroke, 0.005)
+
+
+@suite
+def waveform_import():
+    """Period detection, cycle averaging and vertex fitting on a three-minute WAV file."""
+    import atexit
+    import tempfile
+    from scipy.io import wavfile
+    from waveform_import import import_waveform
+
+    def build():
+        t = np.arange(180 * SAMPLE_RATE) / SAMPLE_RATE
+        samples = 0.5 * (2 * ((220 * t) % 1) - 1)
+        path = tempfile.NamedTemporaryFile(suffix=".wav", delete=False).name
+        atexit.register(os.remove, path)
+        wavfile.write(path, SAMPLE_RATE, (samples * 32767).astype(np.int16))
+        return path
+    path = lazy(build)
+    yield "import/wav_180s", lambda: import_waveform(path())
+
+
+# --- Analysis ---
+
+def _spectrogram_step(settings, rows, columns, block_size=2048):
+    # The computation in the vispy scripts' update_spectrogram, without the texture upload
+    from spectrogram_step import spectrogram_column
+
+    audio = np.random.default_rng(0).standard_normal(block_size).astype(np.float32)
+    data = np.zeros((rows, columns), dtype=np.float32)
+
+    def step():
+        column = spectrogram_column(audio, SAMPLE_RATE, **settings, rows=rows)
+        data[:, :-1] = data[:, 1:]
+        data[:len(column), -1] = column
+    return step
+
+
+@suite
+def analysis():
+    """Spectrogram update step at each script's FFT settings."""
+    warnings.filterwarnings("ignore", message="nperseg = .* is greater than input length")
+    from spectrogram_step import SETTINGS
+    yield "analysis/spectogram_gpu", _spectrogram_step(SETTINGS["spectogram_gpu"], 513, 1024)
+    yield "analysis/spectogram", _spectrogram_step(SETTINGS["spectogram"], 2560, 720)
+    yield "analysis/spectogram_larger_axis", _spectrogram_step(SETTINGS["spectogram_larger_axis"], 1280, 720)
+
+    from batched_fft import BatchedSTFT
+    for channels in (1, 8, 16):
+        stft = BatchedSTFT(2048, 2048, channels, window="boxcar")
+        block = np.random.default_rng(0).standard_normal((2048, channels)).astype(np.float32)
+
+        def step(stft=stft, block=block):
+            stft.push(block)
+            spectrum = stft.magnitude()
+            np.clip(20 * np.log10(spectrum + 1e-10), -90, -30)
+        yield f"analysis/spectogam_matplotlib/channels={channels}", step
+
+    from zoom_fft import ZoomSpectrum
+    zoom = ZoomSpectrum(SAMPLE_RATE, 400, 500)
+    block = np.random.default_rng(0).standard_normal(2048)
+
+    def zoom_step():
+        zoom.push(block)
+        zoom.spectrum()
+    yield "analysis/zoom_400_500", zoom_step
+
+
+# --- Drawing (offscreen) ---
+
+@suite
+def drawing():
+    """Draw steps of the plotting backends, where they can run offscreen."""
+    import importlib.util
+
+    x = np.arange(2048)
+    y = np.sin(x / 50)
+
+    def line_figure():
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=(6, 3))
+        canvas = FigureCanvasAgg(figure)
+        ax = figure.add_subplot()
+        line, = ax.plot(x, y)
+        ax.set_ylim(-1, 1)
+        return figure, canvas, ax, line
+    full = lazy(line_figure)
+
+    def full_draw():
+        _, canvas, _, line = full()
+        line.set_ydata(np.roll(y, 1))
+        canvas.draw()
+    yield "draw/matplotlib/full_redraw", full_draw
+
+    def blit_figure():
+        figure, canvas, ax, line = line_figure()
+        canvas.draw()
+        line.set_animated(True)
+        return figure, canvas, ax, line, canvas.copy_from_bbox(figure.bbox)
+    blitted = lazy(blit_figure)
+
+    def blit():
+        figure, canvas, ax, line, background = blitted()
+        canvas.restore_region(background)
+        line.set_ydata(np.roll(y, 1))
+        ax.draw_artist(line)
+        canvas.blit(figure.bbox)
+    yield "draw/matplotlib/blit", blit
+
+    spectrogram_data = np.random.default_rng(0).uniform(-90, -30, (1025, 100))
+
+    def image_figure():
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=(10, 4))
+        canvas = FigureCanvasAgg(figure)
+        image = figure.add_subplot().imshow(spectrogram_data, aspect="auto", origin="lower", vmin=-90, vmax=-30)
+        return canvas, image
+    imaged = lazy(image_figure)
+
+    def image_draw():
+        canvas, image = imaged()
+        image.set_array(spectrogram_data)
+        canvas.draw()
+    yield "draw/matplotlib/spectrogram_image", image_draw
+
+    if importlib.util.find_spec("pyqtgraph") is None:
+        print("Skipping pyqtgraph draw: No module named 'pyqtgraph'")
+    else:
+        def pyqtgraph_plot():
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            import pyqtgraph as pg
+            qt_app = pg.mkQApp()
+            widget = pg.PlotWidget()
+            widget.resize(800, 300)
+            return qt_app, widget, widget.plot(x, y)
+        plot = lazy(pyqtgraph_plot)
+
+        def pyqtgraph_draw():
+            qt_app, widget, curve = plot()
+            curve.setData(x, np.roll(y, 1))
+            widget.grab()
+            qt_app.processEvents()
+        yield "draw/pyqtgraph/line", pyqtgraph_draw
+
+    if importlib.util.find_spec("vispy") is None:
+        print("Skipping vispy draw: No module named 'vispy'")
+    else:
+        texture_data = np.random.default_rng(0).random((720, 1280)).astype(np.float32)
+
+        def vispy_scene():
+            from vispy import scene
+            scene_canvas = scene.SceneCanvas(size=(800, 300), show=False)
+            view = scene_canvas.central_widget.add_view()
+            return scene_canvas, scene.visuals.Image(texture_data, parent=view.scene, cmap="viridis", clim=(0, 1))
+        vispy_image = lazy(vispy_scene)
+
+        def vispy_draw():
+            scene_canvas, visual = vispy_image()
+            visual.set_data(texture_data)
+            scene_canvas.render()
+        yield "draw/vispy/image", vispy_draw
+
+
+def run(pattern=None, min_time=MIN_TIME):
+    """Run every registered case whose name contains `pattern`."""
+    results = {}
+    for suite_func in _suites:
+        # Cases are built one at a time, and their `lazy` fixtures only when a selected case runs
+        cases = suite_func()
+        while True:
+            try:
+                name, fn, *units = next(cases)
+            except StopIteration:
+                break
+            except ImportError as e:
+                print(f"Skipping {suite_func.__name__}: {e}")
+                break
+            if pattern and pattern not in name:
+                continue
+            try:
+                timing = measure(fn, min_time=min_time)
+            except Exception as e:  # E.g. a drawing backend without a GL context
+                print(f"Skipping {name}: {e}")
+                continue
+            results[name] = timing
+            line = f"{name:60s} {results[name]['median_us']:12.2f} us"
+            if units:
+                results[name]["per_unit_us"] = results[name]["median_us"] / units[0]
+                line += f" ({results[name]['per_unit_us']:.2f} us per unit)"
+            print(line)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "node": platform.node(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """
+    Compare two result files case by case.
+
+    Returns:
+        List of (name, baseline_us, current_us, ratio) for cases slower than `1 + threshold`.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = result["median_us"] / reference["median_us"]
+        marker = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:60s} {reference['median_us']:10.2f} -> {result['median_us']:10.2f} us  x{ratio:5.2f} {marker}")
+        if marker:
+            regressions.append((name, reference["median_us"], result["median_us"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the synthesis and analysis hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and store the results as JSON")
+    run_parser.add_argument("-o", "--output", default="benchmark_results.json")
+    run_parser.add_argument("-k", "--filter", default=None, help="Only run cases whose name contains this")
+    run_parser.add_argument("--min-time", type=float, default=MIN_TIME)
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        results = run(args.filter, args.min_time)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {len(results['results'])} results to {args.output}")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        print(f"{len(regressions)} regression(s) beyond {100 * args.threshold:.0f}%")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
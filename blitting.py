@@ -0,0 +1,92 @@
+from trace_events import traced
+
+
+class BlitManager:
+    """
+    Manages blitting for Matplotlib figures.
+
+    The static parts of the figure (axes, ticks, labels) are rendered once and
+    cached; `update` restores that background and redraws only the animated
+    artists. The cache is refreshed on every full draw and dropped on resize.
+    """
+    def __init__(self, canvas, animated_artists=(), flush=False):
+        """
+        Parameters
+        ----------
+        canvas : FigureCanvasAgg
+            The canvas to work with. Must support `copy_from_bbox` and `restore_region`.
+
+        animated_artists : Iterable[Artist]
+            List of the artists to manage.
+
+        flush : bool
+            Call `canvas.flush_events()` after every update. Only needed when
+            updating from outside the GUI event loop.
+        """
+        self.canvas = canvas
+        self.flush = flush
+        self._bg = None
+        self._artists = []
+
+        for a in animated_artists:
+            self.add_artist(a)
+        # Grab the background on every draw, and drop it when the size changes
+        self.cids = [
+            canvas.mpl_connect("draw_event", self.on_draw),
+            canvas.mpl_connect("resize_event", self.on_resize),
+        ]
+
+    def on_draw(self, event):
+        """Callback to register with 'draw_event'."""
+        cv = self.canvas
+        if event is not None and event.canvas != cv:
+            return  # Ignore events from a different canvas
+        self._bg = cv.copy_from_bbox(cv.figure.bbox)
+        self._draw_animated()
+
+    def on_resize(self, event):
+        """Callback to register with 'resize_event'; the cached background no longer fits."""
+        self._bg = None
+
+    def add_artist(self, art):
+        """
+        Add an artist to be managed.
+
+        Parameters
+        ----------
+        art : Artist
+            The artist to be added. Will be set to 'animated'.
+        """
+        if art.figure != self.canvas.figure:
+            raise RuntimeError("Artist must be in the same figure as the canvas.")
+        art.set_animated(True)
+        self._artists.append(art)
+
+    def invalidate(self):
+        """Request a full redraw, e.g. after changing axis limits or labels."""
+        self._bg = None
+        self.canvas.draw_idle()
+
+    def _draw_animated(self):
+        """Draw all of the animated artists."""
+        fig = self.canvas.figure
+        for a in self._artists:
+            fig.draw_artist(a)
+
+    @traced("BlitManager.update")
+    def update(self):
+        """Update the screen with animated artists."""
+        cv = self.canvas
+        if self._bg is None:
+            # No valid background yet: a full draw captures it through on_draw
+            cv.draw()
+        else:
+            # Restore the background
+            cv.restore_region(self._bg)
+            # Draw all the animated artists
+            self._draw_animated()
+            # Update the GUI state
+            cv.blit(cv.figure.bbox)
+        if self.flush:
+            # Let the GUI event loop process anything it has to do
+            cv.flush_events()
@@ -0,0 +1,151 @@
+import functools
+import logging
+import threading
+import time
+
+import numpy as np
+
+BIN_US = 50                      # Width of one histogram bin in microseconds
+BINS = 1024                      # Number of bins; the last one collects everything slower
+XRUN_FLAGS = ("input_underflow", "input_overflow", "output_underflow", "output_overflow")
+
+
+class CallbackStats:
+    """
+    Low-overhead timing of audio callbacks against their budget.
+
+    Each call records its duration (`perf_counter_ns`) into a preallocated
+    histogram, its share of the block budget (`frames / sample_rate`), the
+    xrun flags from `status` and the jitter between consecutive callback starts.
+    Nothing is allocated per call, so it is safe to leave on in the audio thread.
+    """
+    def __init__(self, name, sample_rate, bin_us=BIN_US, bins=BINS):
+        """
+        Args:
+            name: Label used in log lines.
+            sample_rate: Stream sampling rate, used to compute each block's budget.
+            bin_us: Histogram bin width in microseconds.
+            bins: Number of histogram bins.
+        """
+        self.name = name
+        self.sample_rate = sample_rate
+        self.bin_ns = bin_us * 1000
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.xruns = dict.fromkeys(XRUN_FLAGS, 0)
+        self._timer = None
+        self.reset()
+
+    def reset(self):
+        """Clear all counters (the histogram is zeroed in place)."""
+        self.histogram[:] = 0
+        for flag in self.xruns:
+            self.xruns[flag] = 0
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.over_budget = 0
+        self.utilization_sum = 0.0
+        self.utilization_max = 0.0
+        self.jitter_sum_ns = 0
+        self.jitter_max_ns = 0
+        self.last_start_ns = None
+        self.last_budget_ns = 0
+
+    def record(self, start_ns, end_ns, frames, status=None):
+        """Record one callback that ran from `start_ns` to `end_ns` for a block of `frames`."""
+        duration = end_ns - start_ns
+        budget = frames * 1_000_000_000 // self.sample_rate
+        self.count += 1
+        self.total_ns += duration
+        if duration > self.max_ns:
+            self.max_ns = duration
+        self.histogram[min(duration // self.bin_ns, len(self.histogram) - 1)] += 1
+
+        utilization = duration / budget if budget else 0.0
+        self.utilization_sum += utilization
+        if utilization > self.utilization_max:
+            self.utilization_max = utilization
+        if duration > budget:
+            self.over_budget += 1
+
+        # Jitter: how far this start is from one block after the previous start
+        if self.last_start_ns is not None:
+            jitter = abs(start_ns - self.last_start_ns - self.last_budget_ns)
+            self.jitter_sum_ns += jitter
+            if jitter > self.jitter_max_ns:
+                self.jitter_max_ns = jitter
+        self.last_start_ns = start_ns
+        self.last_budget_ns = budget
+
+        if status:
+            for flag in XRUN_FLAGS:
+                if getattr(status, flag, False):
+                    self.xruns[flag] += 1
+
+    def wrap(self, callback):
+        """Return `callback` instrumented with this recorder (sounddevice callback signature)."""
+        @functools.wraps(callback)
+        def timed_callback(data, frames, time_info, status):
+            start = time.perf_counter_ns()
+            try:
+                return callback(data, frames, time_info, status)
+            finally:
+                self.record(start, time.perf_counter_ns(), frames, status)
+        return timed_callback
+
+    def percentile(self, q):
+        """Approximate duration percentile in milliseconds (upper edge of the histogram bin)."""
+        if self.count == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.histogram), q / 100 * self.count))
+        return (index + 1) * self.bin_ns / 1e6
+
+    def snapshot(self):
+        """
+        Current statistics.
+
+        Returns:
+            Dictionary with callback count, duration mean/p50/p99/max (ms), budget
+            utilization, over-budget callbacks, xrun counts and start jitter (ms).
+        """
+        count = max(self.count, 1)
+        return {
+            "name": self.name,
+            "callbacks": self.count,
+            "mean_ms": self.total_ns / count / 1e6,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ns / 1e6,
+            "utilization_mean": self.utilization_sum / count,
+            "utilization_max": self.utilization_max,
+            "over_budget": self.over_budget,
+            "xruns": dict(self.xruns),
+            "jitter_mean_ms": self.jitter_sum_ns / max(self.count - 1, 1) / 1e6,
+            "jitter_max_ms": self.jitter_max_ns / 1e6,
+        }
+
+    def log_line(self):
+        """One-line summary of `snapshot()`."""
+        s = self.snapshot()
+        xruns = sum(s["xruns"].values())
+        return (f"{s['name']}: {s['callbacks']} callbacks, mean {s['mean_ms']:.3f} ms, "
+                f"p99 {s['p99_ms']:.3f} ms, max {s['max_ms']:.3f} ms, "
+                f"budget {100 * s['utilization_mean']:.1f}% (max {100 * s['utilization_max']:.1f}%), "
+                f"over budget {s['over_budget']}, xruns {xruns}, jitter max {s['jitter_max_ms']:.3f} ms")
+
+    def start_logging(self, interval=10.0, log=logging.info):
+        """Emit `log_line()` every `interval` seconds from a daemon thread."""
+        def tick():
+            log(self.log_line())
+            self._timer = threading.Timer(interval, tick)
+            self._timer.daemon = True
+            self._timer.start()
+
+        self._timer = threading.Timer(interval, tick)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop_logging(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
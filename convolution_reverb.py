@@ -0,0 +1,104 @@
+import numpy as np
+
+from audio_files import open_audio, to_float
+
+PARTITION_SIZE = 2048  # Samples per IR partition; use the audio block size for zero added latency
+IR_SECONDS = 3.0       # Length of the synthetic default impulse response
+RT60 = 2.5             # Seconds for the synthetic impulse response to decay by 60 dB
+
+
+def synthetic_ir(sample_rate, seconds=IR_SECONDS, rt60=RT60, seed=0):
+    """
+    Exponentially decaying noise, a simple stand-in for a recorded room.
+
+    Returns:
+        Mono float64 impulse response normalized to unit energy.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    ir = rng.standard_normal(len(t)) * 10 ** (-3 * t / rt60)  # -60 dB after rt60 seconds
+    return ir / np.sqrt(np.sum(ir ** 2))
+
+
+def load_ir(path, sample_rate):
+    """
+    Load an impulse response from an audio file, mixed to mono and normalized to unit energy.
+
+    Files at another rate are resampled once with `scipy.signal.resample_poly`.
+    """
+    data, file_rate = open_audio(path)
+    ir = to_float(data).mean(axis=1).astype(np.float64)
+    if file_rate != sample_rate:
+        from math import gcd
+        from scipy.signal import resample_poly
+
+        divisor = gcd(int(sample_rate), int(file_rate))
+        ir = resample_poly(ir, int(sample_rate) // divisor, int(file_rate) // divisor)
+    energy = np.sqrt(np.sum(ir ** 2))
+    if energy == 0:
+        raise ValueError(f"{path} is silent")
+    return ir / energy
+
+
+class ConvolutionReverb:
+    """
+    Uniformly partitioned overlap-save convolution with a long impulse response.
+
+    The IR is cut into partitions of `partition_size` samples whose spectra
+    (FFT size 2 * partition_size) are computed once. Every partition of input
+    is transformed once and stored in a frequency-domain delay line (a ring of
+    the most recent input spectra); the output spectrum is the sum of each IR
+    spectrum times the input spectrum delayed by its partition. A block then
+    costs one rfft, one irfft and a multiply-accumulate over the delay line,
+    however long the IR, with no latency beyond the block itself.
+    """
+    def __init__(self, ir, partition_size=PARTITION_SIZE, mix=0.3):
+        """
+        Args:
+            ir: Mono impulse response.
+            partition_size: Samples per partition; blocks passed to `process`
+                must be a multiple of it.
+            mix: Wet share of the output, 0 (dry) to 1 (wet only).
+        """
+        ir = np.asarray(ir, dtype=np.float64)
+        self.partition_size = partition_size
+        self.mix = mix
+        count = max(1, -(-len(ir) // partition_size))
+        partitions = np.zeros((count, partition_size))
+        partitions.ravel()[:len(ir)] = ir
+        # Each partition zero-padded to twice its length, so overlap-save keeps the linear part
+        self.ir_spectra = np.fft.rfft(partitions, 2 * partition_size, axis=1)
+        self.delay_line = np.zeros_like(self.ir_spectra)  # Ring of input spectra, newest at `head`
+        self.head = 0
+        self.previous = np.zeros(partition_size)  # Last input partition (the "save" half)
+
+    def reset(self):
+        """Silence the tail, e.g. after the input jumps."""
+        self.delay_line[:] = 0
+        self.previous[:] = 0
+
+    def _partition(self, x):
+        self.head = (self.head + 1) % len(self.delay_line)
+        self.delay_line[self.head] = np.fft.rfft(np.concatenate((self.previous, x)))
+        self.previous = x
+        # Partition p meets the input from p partitions ago: walk the ring backwards from
+        # the head (two views, so nothing is copied)
+        head = self.head
+        spectrum = np.einsum("pk,pk->k", self.ir_spectra[:head + 1], self.delay_line[head::-1])
+        if head + 1 < len(self.delay_line):
+            spectrum += np.einsum("pk,pk->k", self.ir_spectra[head + 1:], self.delay_line[:head:-1])
+        return np.fft.irfft(spectrum)[self.partition_size:]
+
+    def process(self, block):
+        """
+        Convolve one block and mix it with the dry signal.
+
+        Returns:
+            The mixed block as float64.
+        """
+        block = np.asarray(block, dtype=np.float64)
+        if len(block) % self.partition_size:
+            raise ValueError(f"Block of {len(block)} frames is not a multiple of {self.partition_size}")
+        size = self.partition_size
+        wet = np.concatenate([self._partition(block[i:i + size]) for i in range(0, len(block), size)])
+        return (1 - self.mix) * block + self.mix * wet
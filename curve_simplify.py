@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def _segment_distances(points, start, end):
+    # Perpendicular distance of every point to the line through start and end
+    direction = end - start
+    length = np.hypot(*direction)
+    if length == 0:
+        return np.hypot(*(points - start).T)
+    return np.abs(direction[0] * (points[:, 1] - start[1]) - direction[1] * (points[:, 0] - start[0])) / length
+
+
+def rdp(points, epsilon):
+    """
+    Ramer-Douglas-Peucker simplification of a polyline.
+
+    Uses an explicit stack instead of recursion, and computes the distances of
+    a whole segment's points in one vectorized call.
+
+    Args:
+        points: (N, 2) array of points.
+        epsilon: Maximum distance of a dropped point from the simplified line.
+
+    Returns:
+        The kept points as an (M, 2) array, including both end points.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 3:
+        return points.copy()
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(points[first + 1:last], points[first], points[last])
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def _triangle_area(a, b, c):
+    return abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])) / 2
+
+
+class StreamingSimplifier:
+    """
+    Incremental Visvalingam-Whyatt simplification of a path being drawn.
+
+    Every point added is kept until the path exceeds `max_points`; then the
+    interior point whose removal changes the shape least (smallest triangle
+    with its neighbours) is dropped. Points that are nearly collinear with
+    their neighbours (area below `min_area`) are dropped as soon as the next
+    point arrives, so the vertex count stays bounded however long the stroke.
+    """
+    def __init__(self, max_points=64, min_area=1e-6):
+        self.max_points = max_points
+        self.min_area = min_area
+        self.points = []
+        self.areas = []  # Effective area of each point; end points are infinite
+
+    def _area(self, index):
+        if index == 0 or index == len(self.points) - 1:
+            return float("inf")
+        return _triangle_area(self.points[index - 1], self.points[index], self.points[index + 1])
+
+    def _remove(self, index):
+        del self.points[index]
+        del self.areas[index]
+        for neighbour in (index - 1, index):
+            if 0 <= neighbour < len(self.points):
+                self.areas[neighbour] = self._area(neighbour)
+
+    def add(self, x, y):
+        """Append a point to the path, simplifying as needed."""
+        self.points.append((x, y))
+        self.areas.append(float("inf"))
+        if len(self.points) < 3:
+            return
+        # The previous point now has two neighbours
+        self.areas[-2] = self._area(len(self.points) - 2)
+        if self.areas[-2] < self.min_area:
+            self._remove(len(self.points) - 2)
+        while len(self.points) > self.max_points:
+            self._remove(int(np.argmin(self.areas)))
+
+    def result(self):
+        """The simplified path as an (M, 2) array."""
+        return np.array(self.points, dtype=np.float64).reshape(-1, 2)
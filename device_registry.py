@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+
+from audio_backend import get_backend
+
+CACHE_ENV = "WAVE_GEN_DEVICE_CACHE"  # Overrides the cache file location
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "wave_gen", "devices.json")
+POLL_INTERVAL = 2.0                  # Seconds between hotplug rescans (0 = enumerate once)
+
+
+def _device_key(device):
+    # Indices change between PortAudio sessions; host API and name identify a device
+    return device.get('hostapi_name'), device['name']
+
+
+class DeviceRegistry:
+    """
+    Audio device list that never blocks the GUI on enumeration.
+
+    `devices()` returns the devices cached on disk by the previous run right
+    away, grouped by host API. A background thread enumerates the backend,
+    replaces the list, updates the cache and then keeps rescanning to detect
+    hotplugged devices. Listeners are called on that thread with
+    `(devices, added, removed)` whenever the list changes.
+    """
+    def __init__(self, backend=None, cache_path=None, poll_interval=POLL_INTERVAL):
+        """
+        Args:
+            backend: Audio backend to enumerate (default: `get_backend()`).
+            cache_path: JSON cache file (default: WAVE_GEN_DEVICE_CACHE or ~/.cache/wave_gen/devices.json).
+            poll_interval: Seconds between rescans, 0 to enumerate only once.
+        """
+        self.backend = backend or get_backend()
+        self.cache_path = cache_path or os.environ.get(CACHE_ENV, DEFAULT_CACHE_PATH)
+        self.poll_interval = poll_interval
+        self.listeners = []
+        self.fresh = threading.Event()  # Set once the backend has been enumerated
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._devices = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if cache.get("backend") != self.backend.name:
+            return []
+        return [device for devices in cache.get("hostapis", {}).values() for device in devices]
+
+    def _save_cache(self, devices):
+        hostapis = {}
+        for device in devices:
+            hostapis.setdefault(device.get('hostapi_name'), []).append(device)
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"backend": self.backend.name, "hostapis": hostapis}, f, indent=2)
+        os.replace(temp_path, self.cache_path)
+
+    def _enumerate(self, rescan):
+        hostapis = self.backend.query_hostapis()
+        devices = []
+        for device in self.backend.query_devices(rescan=rescan):
+            device = dict(device)
+            device['hostapi_name'] = hostapis[device['hostapi']]['name']
+            devices.append(device)
+        return devices
+
+    def devices(self):
+        """Current device list: cached until the first enumeration finishes."""
+        with self._lock:
+            return list(self._devices)
+
+    def add_listener(self, listener):
+        """Call `listener(devices, added, removed)` from the background thread on every change."""
+        self.listeners.append(listener)
+
+    def refresh(self, rescan=False):
+        """Enumerate now (on the calling thread) and notify listeners if the list changed."""
+        devices = self._enumerate(rescan)
+        with self._lock:
+            old_devices, self._devices = self._devices, devices
+        old_keys = {_device_key(device) for device in old_devices}
+        new_keys = {_device_key(device) for device in devices}
+        added = [device for device in devices if _device_key(device) not in old_keys]
+        removed = [device for device in old_devices if _device_key(device) not in new_keys]
+        changed = bool(added or removed) or not self.fresh.is_set()
+        self.fresh.set()
+        if changed:
+            try:
+                self._save_cache(devices)
+            except OSError as e:
+                print(f"Could not write the device cache: {e}")
+            for listener in list(self.listeners):
+                listener(devices, added, removed)
+
+    def _run(self):
+        try:
+            self.refresh()
+            while self.poll_interval > 0 and not self._stop.wait(self.poll_interval):
+                self.refresh(rescan=True)
+        finally:
+            self.fresh.set()  # Never leave resolve() waiting, even if enumeration failed
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="DeviceRegistry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop rescanning. Call before opening a stream: a rescan re-initializes PortAudio."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def resolve(self, device, timeout=None):
+        """
+        Map a (possibly cached) device to the freshly enumerated one.
+
+        Returns:
+            The current device dictionary with the same host API and name, or None if it is gone.
+        """
+        if not self.fresh.is_set() and self._thread is None:
+            self.refresh()  # Never started (e.g. the dialog closed before it began enumerating)
+        self.fresh.wait(timeout)
+        key = _device_key(device)
+        for current in self.devices():
+            if _device_key(current) == key:
+                return current
+        return None
@@ -0,0 +1,106 @@
+import collections
+
+import numpy as np
+
+MAX_ENTRIES = 1000            # Undo steps kept
+MAX_BYTES = 16 * 1024 * 1024  # Memory kept for undo steps (oldest are dropped first)
+
+
+class _Delta:
+    """One undoable edit with its coordinates packed into small float64 arrays."""
+    __slots__ = ("kind", "index", "old", "new", "sealed")
+
+    def __init__(self, kind, index, old, new):
+        self.kind = kind
+        self.index = index
+        self.old = None if old is None else np.array(old, dtype=np.float64)
+        self.new = None if new is None else np.array(new, dtype=np.float64)
+        self.sealed = False
+
+    @property
+    def nbytes(self):
+        # Rough per-entry overhead plus the packed coordinates
+        return 64 + sum(array.nbytes for array in (self.old, self.new) if array is not None)
+
+
+class EditHistory:
+    """
+    Undo/redo stack for a `VertexModel`, recorded from its change notifications.
+
+    Single-vertex edits store only the index and the old/new coordinates, and
+    consecutive moves of the same vertex merge into one entry (together with
+    the insert that created it) until `seal` is called at the end of a drag, so a long drag costs one small entry instead
+    of a snapshot per motion event. Presets, imports and freehand strokes store
+    the old and new arrays. The oldest entries are dropped once the history
+    exceeds `max_entries` or `max_bytes`. Undo and redo apply a single delta.
+    """
+    def __init__(self, model, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.model = model
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.undo_stack = collections.deque()
+        self.redo_stack = []
+        self.nbytes = 0  # Memory held by undo_stack
+        self._applying = False
+        model.add_listener(self.record)
+
+    def record(self, change):
+        """Model listener: store `change` as an undoable delta."""
+        if self._applying:
+            return
+        self.redo_stack.clear()
+        last = self.undo_stack[-1] if self.undo_stack else None
+        if (change.kind == "move" and last is not None and not last.sealed
+                and last.kind in ("insert", "move") and last.index == change.index):
+            last.new[:] = change.new  # Merge into the running drag (or the click that inserted the vertex)
+            return
+        delta = _Delta(change.kind, change.index, change.old, change.new)
+        self.undo_stack.append(delta)
+        self.nbytes += delta.nbytes
+        while self.undo_stack and (len(self.undo_stack) > self.max_entries or self.nbytes > self.max_bytes):
+            self.nbytes -= self.undo_stack.popleft().nbytes
+
+    def seal(self):
+        """End the current gesture so the next move starts a new entry."""
+        if self.undo_stack:
+            self.undo_stack[-1].sealed = True
+
+    def _apply(self, delta, undo):
+        kind = delta.kind
+        if kind == "move":
+            self.model.move(delta.index, *(delta.old if undo else delta.new))
+        elif kind in ("insert", "remove"):
+            if (kind == "insert") == undo:  # Undo an insert, or redo a remove
+                self.model.remove(delta.index)
+            else:
+                self.model.insert(*(delta.new if kind == "insert" else delta.old))
+        else:  # "reset": whole arrays
+            self.model.reset(np.column_stack(delta.old if undo else delta.new))
+
+    def _step(self, source, target, undo):
+        if not source:
+            return False
+        delta = source.pop()
+        delta.sealed = True
+        self._applying = True
+        try:
+            self._apply(delta, undo)
+        finally:
+            self._applying = False
+        target.append(delta)
+        return True
+
+    def undo(self):
+        """Revert the most recent edit. Returns False if there is nothing to undo."""
+        if not self.undo_stack:
+            return False
+        delta = self.undo_stack[-1]
+        self.nbytes -= delta.nbytes
+        return self._step(self.undo_stack, self.redo_stack, undo=True)
+
+    def redo(self):
+        """Reapply the most recently undone edit. Returns False if there is nothing to redo."""
+        if not self.redo_stack:
+            return False
+        self.nbytes += self.redo_stack[-1].nbytes
+        return self._step(self.redo_stack, self.undo_stack, undo=False)
@@ -0,0 +1,165 @@
+import numpy as np
+
+FILTER_TYPES = ("lowpass", "highpass", "bandpass", "peaking")
+DEFAULT_Q = 1 / np.sqrt(2)  # Butterworth response for the low- and high-pass
+SUB_BLOCK = 256             # Samples per coefficient step while a parameter glides (each step is one sosfilt call)
+
+
+def biquad_sos(kind, frequency, q, gain_db, sample_rate):
+    """
+    RBJ cookbook biquad coefficients as second-order sections.
+
+    All parameters except `kind` and `sample_rate` broadcast, so coefficients
+    for every voice and every interpolation step come from one vectorized call.
+
+    Args:
+        kind: One of FILTER_TYPES.
+        frequency: Cutoff (or center) frequency in Hz, clamped below Nyquist.
+        q: Quality factor.
+        gain_db: Boost or cut of the peaking filter (ignored by the other types).
+        sample_rate: Sampling rate in Hz.
+
+    Returns:
+        Array of shape (..., 6) with rows [b0, b1, b2, 1, a1, a2] as used by `scipy.signal.sosfilt`.
+    """
+    frequency = np.clip(frequency, 1.0, 0.49 * sample_rate)
+    w0 = 2 * np.pi * frequency / sample_rate
+    cos_w0 = np.cos(w0)
+    alpha = np.sin(w0) / (2 * np.asarray(q, dtype=np.float64))
+    cos_w0, alpha, gain_db = np.broadcast_arrays(cos_w0, alpha, gain_db)
+    a0, a1, a2 = 1 + alpha, -2 * cos_w0, 1 - alpha
+
+    if kind == "lowpass":
+        b0 = b2 = (1 - cos_w0) / 2
+        b1 = 1 - cos_w0
+    elif kind == "highpass":
+        b0 = b2 = (1 + cos_w0) / 2
+        b1 = -(1 + cos_w0)
+    elif kind == "bandpass":
+        b0, b1, b2 = alpha, np.zeros_like(alpha), -alpha  # 0 dB peak gain
+    elif kind == "peaking":
+        amplitude = 10 ** (gain_db / 40)
+        b0, b1, b2 = 1 + alpha * amplitude, -2 * cos_w0, 1 - alpha * amplitude
+        a0, a2 = 1 + alpha / amplitude, 1 - alpha / amplitude
+    else:
+        raise ValueError(f"Unsupported filter type: {kind}")
+    return np.stack((b0 / a0, b1 / a0, b2 / a0, np.ones_like(a0), a1 / a0, a2 / a0), axis=-1)
+
+
+class MultiVoiceFilter:
+    """
+    One biquad per voice, filtering (voices, frames) blocks with carried state.
+
+    Voices with identical coefficients (the usual case) are filtered together
+    in one `sosfilt` call along the last axis. Voices with different
+    coefficients are not vectorized: each distinct coefficient set costs its
+    own `sosfilt` call. The `zi` state of every voice is kept between blocks,
+    so block boundaries are seamless. Parameter changes
+    glide to the new value over one block: frequency and Q geometrically, gain
+    linearly, with coefficients recomputed every `sub_block` samples.
+    Interpolating the parameters rather than the coefficients keeps every
+    intermediate filter stable.
+
+    `set`, `set_kind` and `reset` may be called from the GUI thread; they only
+    record the request, and `process` applies it on the audio thread.
+    """
+    def __init__(self, voices, kind="lowpass", frequency=1000.0, q=DEFAULT_Q, gain_db=0.0,
+                 sample_rate=44100, sub_block=SUB_BLOCK):
+        """
+        Args:
+            voices: Number of voices (rows of the blocks passed to `process`).
+            kind: One of FILTER_TYPES.
+            frequency, q, gain_db: Initial parameters, scalars or one value per voice.
+            sample_rate: Sampling rate in Hz.
+            sub_block: Samples per coefficient step while parameters glide.
+        """
+        # scipy.signal is only loaded by the scripts that actually filter
+        from scipy.signal import sosfilt
+
+        self._sosfilt = sosfilt
+        self.voices = voices
+        self.kind = kind  # Kind of `_sos`; `target_kind` is written by `set_kind`
+        self.target_kind = kind
+        self.sample_rate = sample_rate
+        self.sub_block = sub_block
+        # Rows: frequency, q, gain_db; `target` is written by `set`, `_params` by the audio thread
+        self._params = np.array([np.broadcast_to(np.asarray(value, dtype=np.float64), voices)
+                                 for value in (frequency, q, gain_db)])
+        self.target = self._params.copy()
+        self._sos = biquad_sos(kind, *self._params, sample_rate)
+        self.zi = np.zeros((voices, 2))
+        self._reset_requested = False
+
+    def set(self, frequency=None, q=None, gain_db=None, voice=slice(None)):
+        """Set new target parameters for one voice (or all); they are reached by the end of the next block."""
+        for row, value in enumerate((frequency, q, gain_db)):
+            if value is not None:
+                self.target[row, voice] = value
+
+    def set_kind(self, kind):
+        """Switch the filter type at the start of the next block, keeping the state."""
+        if kind not in FILTER_TYPES:
+            raise ValueError(f"Unsupported filter type: {kind}")
+        self.target_kind = kind
+
+    def reset(self):
+        """Clear the filter state before the next block, e.g. after a discontinuity in the input."""
+        self._reset_requested = True
+
+    def _filter(self, block, sos):
+        if (sos == sos[0]).all():
+            out, zi = self._sosfilt(sos[:1], block, axis=-1, zi=self.zi[np.newaxis])
+            self.zi = zi[0]
+            return out
+        # Voices with different settings: one call per distinct coefficient set
+        out = np.empty(block.shape)
+        rows, groups = np.unique(sos, axis=0, return_inverse=True)
+        for group, row in enumerate(rows):
+            voices = np.flatnonzero(groups.ravel() == group)
+            out[voices], zi = self._sosfilt(row[np.newaxis], block[voices], axis=-1, zi=self.zi[voices][np.newaxis])
+            self.zi[voices] = zi[0]
+        return out
+
+    def process(self, block):
+        """
+        Filter one (voices, frames) block.
+
+        Returns:
+            The filtered block as float64.
+        """
+        # `set`, `set_kind` and `reset` may run concurrently on the GUI thread
+        if self._reset_requested:
+            self._reset_requested = False
+            self.zi = np.zeros((self.voices, 2))
+        kind = self.target_kind
+        if kind != self.kind:
+            self._sos = biquad_sos(kind, *self._params, self.sample_rate)
+            self.kind = kind
+        target = self.target.copy()
+        if np.array_equal(target, self._params):
+            return self._filter(block, self._sos)
+
+        frames = block.shape[-1]
+        starts = range(0, frames, self.sub_block)
+        fraction = (np.arange(len(starts)) + 1)[:, np.newaxis] / len(starts)
+        frequency = self._params[0] * (target[0] / self._params[0]) ** fraction
+        q = self._params[1] * (target[1] / self._params[1]) ** fraction
+        gain_db = self._params[2] + (target[2] - self._params[2]) * fraction
+        steps = biquad_sos(kind, frequency, q, gain_db, self.sample_rate)  # (steps, voices, 6)
+
+        out = np.empty(block.shape)
+        for step, start in enumerate(starts):
+            out[:, start:start + self.sub_block] = self._filter(block[:, start:start + self.sub_block], steps[step])
+        self._params = target
+        self._sos = steps[-1]
+        return out
+
+
+class BiquadFilter(MultiVoiceFilter):
+    """A `MultiVoiceFilter` with a single voice, filtering 1-D blocks."""
+    def __init__(self, kind="lowpass", frequency=1000.0, q=DEFAULT_Q, gain_db=0.0, sample_rate=44100,
+                 sub_block=SUB_BLOCK):
+        super().__init__(1, kind, frequency, q, gain_db, sample_rate, sub_block)
+
+    def process(self, samples):
+        return super().process(np.asarray(samples)[np.newaxis])[0]
@@ -0,0 +1,123 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+CEILING_DB = -1.0    # Highest output level (dBFS, or dBTP with true-peak detection)
+LOOKAHEAD_MS = 5.0   # Gain reduction starts this long before a peak (also the added latency)
+RELEASE_MS = 80.0    # Release time constant: gain recovers by a factor of e (8.7 dB) per release time
+OVERSAMPLE = 4       # Interpolation factor of the true-peak detector
+TRUE_PEAK_TAPS = 16  # Interpolation filter length (in input samples) of the true-peak detector
+
+
+def running_max(values, window):
+    """
+    Maximum of every `window` consecutive values along axis 0 (van Herk / Gil-Werman).
+
+    Costs a few `np.maximum.accumulate` passes regardless of the window length.
+
+    Returns:
+        Array of len(values) - window + 1 maxima; element i covers values[i:i + window].
+    """
+    count = len(values)
+    padded_length = -(-count // window) * window
+    padded = np.full(padded_length, -np.inf)
+    padded[:count] = values
+    blocks = padded.reshape(-1, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:count - window + 1], prefix[window - 1:count])
+
+
+def _true_peak_taps(oversample, taps):
+    # Kaiser-windowed sinc interpolators for the oversample - 1 points between samples,
+    # as a (taps, oversample - 1) matrix applied to windows of `taps` input samples
+    offsets = np.arange(taps) - (taps // 2 - 1)  # Input sample positions relative to the current one
+    fractions = np.arange(1, oversample) / oversample
+    window = np.kaiser(taps, 8.0)[:, np.newaxis]
+    return np.sinc(fractions[np.newaxis, :] - offsets[:, np.newaxis]) * window
+
+
+class LookaheadLimiter:
+    """
+    Brickwall limiter with lookahead, processing whole blocks with vectorized windows.
+
+    Per block, the attenuation each sample needs to stay below the ceiling is
+    held over the lookahead window with a running maximum, released
+    exponentially (a linear ramp in dB, computed with `np.maximum.accumulate`
+    instead of a per-sample loop) and smoothed with a box filter as long as the
+    lookahead, so gain changes ramp instead of stepping. The audio is delayed by
+    the lookahead, so the gain is already down when a peak arrives and no
+    sample exceeds the ceiling. With `true_peak`, levels are measured on a
+    `OVERSAMPLE` times interpolated signal to catch peaks between samples.
+    All state is carried between blocks.
+    """
+    def __init__(self, sample_rate, ceiling_db=CEILING_DB, lookahead_ms=LOOKAHEAD_MS, release_ms=RELEASE_MS,
+                 true_peak=False, channels=1):
+        """
+        Args:
+            sample_rate: Sampling rate in Hz.
+            ceiling_db: Highest output level in dBFS.
+            lookahead_ms: Lookahead and attack time; the output is delayed by this much.
+            release_ms: Release time constant.
+            true_peak: Detect inter-sample peaks on an oversampled signal (adds TRUE_PEAK_TAPS / 2 samples of delay).
+            channels: Channels of the blocks passed to `process`; they share one gain.
+        """
+        self.ceiling = 10 ** (ceiling_db / 20)
+        self.lookahead = max(1, int(lookahead_ms * sample_rate / 1000))
+        self.release_step = 20 * np.log10(np.e) / (release_ms * sample_rate / 1000)  # dB per sample
+        self.taps = _true_peak_taps(OVERSAMPLE, TRUE_PEAK_TAPS) if true_peak else None
+        detector_delay = TRUE_PEAK_TAPS // 2 if true_peak else 0
+        self.latency = self.lookahead + detector_delay  # Samples
+
+        # Carried state: input history of the true-peak detector, attenuation not yet
+        # covered by a full lookahead window, released attenuation, gains for the box
+        # filter and delayed audio
+        self._detector_history = np.zeros((TRUE_PEAK_TAPS - 1 if true_peak else 0, channels))
+        self._pending = np.zeros(self.lookahead)
+        self._attenuation = 0.0
+        self._gains = np.ones(self.lookahead)
+        self._delayed = np.zeros((self.latency, channels))
+
+    def _levels(self, block):
+        # Peak level of every sample across channels, delayed by the detector
+        if self.taps is None:
+            return np.abs(block).max(axis=1)
+        extended = np.concatenate((self._detector_history, block))
+        self._detector_history = extended[len(block):]
+        windows = sliding_window_view(extended, TRUE_PEAK_TAPS, axis=0)  # (frames, channels, taps)
+        between = np.abs(windows @ self.taps).max(axis=2)
+        on = np.abs(windows[:, :, TRUE_PEAK_TAPS // 2 - 1])
+        return np.maximum(between, on).max(axis=1)
+
+    def process(self, block):
+        """
+        Limit one block of shape (frames,) or (frames, channels).
+
+        Returns:
+            The limited block, delayed by `latency` samples, with the input's shape.
+        """
+        block = np.asarray(block, dtype=np.float64)
+        samples = block.reshape(len(block), -1)
+        frames = len(samples)
+
+        # Attenuation in dB each sample needs, held over the lookahead window
+        levels = self._levels(samples)
+        required = 20 * np.log10(np.maximum(levels, self.ceiling) / self.ceiling)
+        extended = np.concatenate((self._pending, required))
+        self._pending = extended[frames:]
+        held = running_max(extended, self.lookahead + 1)
+
+        # Exponential release: attenuation[n] = max over k <= n of held[k] - (n - k) * step
+        ramp = np.arange(frames + 1) * self.release_step
+        released = np.maximum.accumulate(np.concatenate(([self._attenuation], held)) + ramp)[1:] - ramp[1:]
+        self._attenuation = released[-1]
+
+        # Box smoothing over the lookahead: each average only includes gains at or below the
+        # gain its sample needs, so the ceiling still holds
+        gains = np.concatenate((self._gains, 10 ** (-released / 20)))
+        self._gains = gains[frames:]
+        sums = np.cumsum(np.concatenate(([0.0], gains)))
+        smoothed = (sums[self.lookahead + 1:] - sums[:-self.lookahead - 1]) / (self.lookahead + 1)
+
+        delayed = np.concatenate((self._delayed, samples))
+        self._delayed = delayed[frames:]
+        return (delayed[:frames] * smoothed[:, np.newaxis]).reshape(block.shape)
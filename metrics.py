@@ -0,0 +1,235 @@
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+METRICS_FILE_ENV = "WAVE_GEN_METRICS_FILE"  # .json or .prom file to export snapshots to
+EXPORT_INTERVAL = 5.0                        # Seconds between exported snapshots
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Counter:
+    """Monotonically increasing count."""
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def collect(self):
+        return {self.name: self.value}
+
+
+class Gauge:
+    """Last value set."""
+    def __init__(self, name):
+        self.name = name
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def collect(self):
+        return {self.name: self.value}
+
+
+class _Window:
+    """Ring of time slots covering the last `window` seconds."""
+    def __init__(self, window, slots, clock):
+        self.slot_seconds = window / slots
+        self.slots = slots
+        self.clock = clock
+        self.current = int(clock() / self.slot_seconds)
+
+    def advance(self):
+        # Index of the slot for "now", and the stale slots that must be cleared first
+        now = int(self.clock() / self.slot_seconds)
+        stale = min(now - self.current, self.slots)
+        self.current = now
+        return now % self.slots, stale
+
+
+class Rate(_Window):
+    """Events per second over a sliding window, so stalls show up within `window` seconds."""
+    def __init__(self, name, window=5.0, slots=10, clock=time.monotonic):
+        super().__init__(window, slots, clock)
+        self.name = name
+        self.window = window
+        self.counts = np.zeros(slots, dtype=np.int64)
+        self.started = clock()
+
+    def _sync(self):
+        index, stale = self.advance()
+        for i in range(stale):
+            self.counts[(index - i) % self.slots] = 0
+        return index
+
+    def mark(self, count=1):
+        self.counts[self._sync()] += count
+
+    def value(self):
+        self._sync()
+        # Until a full window has passed, divide by the time actually covered
+        span = min(self.window, max(self.clock() - self.started, 1e-9))
+        return float(self.counts.sum()) / span
+
+    def collect(self):
+        return {self.name + "_per_second": self.value()}
+
+
+class Latency(_Window):
+    """Histogram of durations (ms) over a sliding window with fixed bucket bounds."""
+    def __init__(self, name, window=60.0, slots=12, buckets=LATENCY_BUCKETS_MS, clock=time.monotonic):
+        super().__init__(window, slots, clock)
+        self.name = name
+        self.bounds = np.asarray(buckets, dtype=np.float64)
+        self.counts = np.zeros((slots, len(buckets) + 1), dtype=np.int64)
+        self.sums = np.zeros(slots, dtype=np.float64)
+
+    def _sync(self):
+        index, stale = self.advance()
+        for i in range(stale):
+            self.counts[(index - i) % self.slots] = 0
+            self.sums[(index - i) % self.slots] = 0.0
+        return index
+
+    def observe(self, ms):
+        index = self._sync()
+        self.counts[index, int(np.searchsorted(self.bounds, ms))] += 1
+        self.sums[index] += ms
+
+    def time(self):
+        """Context manager observing the duration of its block."""
+        return _Timed(self)
+
+    def percentile(self, q):
+        """Approximate percentile (upper bucket bound; inf if it falls in the overflow bucket)."""
+        self._sync()
+        totals = self.counts.sum(axis=0)
+        count = totals.sum()
+        if count == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(totals), q / 100 * count))
+        return float(self.bounds[index]) if index < len(self.bounds) else float("inf")
+
+    def collect(self):
+        self._sync()
+        count = int(self.counts.sum())
+        return {
+            self.name + "_count": count,
+            self.name + "_mean_ms": float(self.sums.sum()) / count if count else 0.0,
+            self.name + "_p50_ms": self.percentile(50),
+            self.name + "_p99_ms": self.percentile(99),
+        }
+
+
+class _Timed:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.latency.observe((time.perf_counter() - self.start) * 1000)
+
+
+class Registry:
+    """
+    Named counters, gauges, rates and latency histograms.
+
+    Updating a metric is a couple of integer or array operations with no locks
+    or allocation, so metrics can be updated from the audio thread. Snapshots
+    can be exported periodically as JSON or Prometheus text format.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = {}
+        self._exporter = None
+
+    def _get(self, cls, name, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, **kwargs)
+        return metric
+
+    def counter(self, name):
+        return self._get(Counter, name)
+
+    def gauge(self, name):
+        return self._get(Gauge, name)
+
+    def rate(self, name, window=5.0):
+        return self._get(Rate, name, window=window)
+
+    def latency(self, name, window=60.0):
+        return self._get(Latency, name, window=window)
+
+    def add_collector(self, prefix, collect):
+        """Include `collect()` (a dict of numbers, e.g. `CallbackStats.snapshot`) in every snapshot."""
+        self.collectors[prefix] = collect
+
+    def snapshot(self):
+        values = {}
+        for metric in list(self.metrics.values()):
+            values.update(metric.collect())
+        for prefix, collect in list(self.collectors.items()):
+            for key, value in collect().items():
+                if isinstance(value, dict):
+                    for sub_key, sub_value in value.items():
+                        values[f"{prefix}_{key}_{sub_key}"] = sub_value
+                elif isinstance(value, (int, float)):
+                    values[f"{prefix}_{key}"] = value
+        return values
+
+    def to_json(self):
+        # JSON has no infinity; an overflowing percentile is reported as null
+        values = {name: None if value == float("inf") else value for name, value in self.snapshot().items()}
+        return json.dumps({"timestamp": time.time(), "metrics": values}, indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        for name, value in self.snapshot().items():
+            metric = re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+            if value == float("inf"):
+                value = "+Inf"
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write a snapshot atomically; the format follows the extension (.prom or JSON)."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def start_exporter(self, path, interval=EXPORT_INTERVAL):
+        """Write a snapshot to `path` every `interval` seconds from a daemon thread."""
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.write(path)
+
+        self._exporter = stop
+        threading.Thread(target=run, name="MetricsExporter", daemon=True).start()
+
+    def stop_exporter(self):
+        if self._exporter is not None:
+            self._exporter.set()
+            self._exporter = None
+
+
+registry = Registry()
+
+
+def start_exporter_from_env():
+    """Start exporting the shared registry if WAVE_GEN_METRICS_FILE is set."""
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        registry.start_exporter(path)
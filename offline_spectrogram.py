@@ -0,0 +1,111 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.signal import spectrogram
+
+from audio_files import open_audio, to_float
+
+# Same analysis settings as spectogram_gpu.update_spectrogram
+NPERSEG = 1024
+NOVERLAP = 512
+SMALL_VALUE = 1e-10
+DB_MIN = -120.0                  # dB mapped to 0 in uint8 output
+DB_MAX = 0.0                     # dB mapped to 255 in uint8 output
+CHUNK_COLUMNS = 4096             # Spectrogram columns computed per task
+
+
+def column_count(frames, nperseg, noverlap):
+    """Number of spectrogram columns `scipy.signal.spectrogram` yields for `frames` samples."""
+    hop = nperseg - noverlap
+    return 0 if frames < nperseg else 1 + (frames - nperseg) // hop
+
+
+def _compute_chunk(task):
+    """Worker: compute columns [first, last) and write them straight into the output file."""
+    (input_path, output_path, first, last, channel, nperseg, noverlap,
+     db_min, db_max, sample_rate_hint, channels_hint) = task
+    data, sample_rate = open_audio(input_path, sample_rate=sample_rate_hint, channels=channels_hint)
+    hop = nperseg - noverlap
+
+    # Column k uses samples [k * hop, k * hop + nperseg), so the chunk overlaps its neighbours
+    # by exactly nperseg - hop samples and the columns line up with a single full-file pass
+    samples = to_float(data[first * hop:(last - 1) * hop + nperseg, channel])
+    _, _, Sxx = spectrogram(samples, fs=sample_rate, nperseg=nperseg, noverlap=noverlap)
+    decibels = 10 * np.log10(Sxx.T + SMALL_VALUE)
+
+    output = np.load(output_path, mmap_mode="r+")
+    if output.dtype == np.uint8:
+        scaled = (decibels - db_min) * (255.0 / (db_max - db_min))
+        output[first:last] = np.clip(scaled, 0, 255).astype(np.uint8)
+    else:
+        output[first:last] = decibels.astype(output.dtype)
+    output.flush()
+    return last - first
+
+
+def offline_spectrogram(input_path, output_path, output_dtype="uint8", channel=0, nperseg=NPERSEG,
+                        noverlap=NOVERLAP, chunk_columns=CHUNK_COLUMNS, workers=None, db_min=DB_MIN,
+                        db_max=DB_MAX, sample_rate=None, channels=1):
+    """
+    Compute the spectrogram of a large audio file in parallel, bounded-memory chunks.
+
+    The result is a (columns, frequency bins) `.npy` file in time-major order, so each
+    chunk is one contiguous write. uint8 output maps [db_min, db_max] onto 0-255;
+    float16 output stores the dB values.
+
+    Returns:
+        Shape of the written array.
+    """
+    data, fs = open_audio(input_path, sample_rate=sample_rate, channels=channels)
+    total = column_count(len(data), nperseg, noverlap)
+    n_bins = nperseg // 2 + 1
+    del data
+
+    # Preallocate the output once; workers map it and fill their own rows
+    output = np.lib.format.open_memmap(output_path, mode="w+", dtype=output_dtype, shape=(total, n_bins))
+    del output
+
+    tasks = [
+        (input_path, output_path, first, min(first + chunk_columns, total), channel, nperseg, noverlap,
+         db_min, db_max, sample_rate, channels)
+        for first in range(0, total, chunk_columns)
+    ]
+    done = 0
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for count in pool.map(_compute_chunk, tasks):
+            done += count
+            print(f"\r{done}/{total} columns", end="", flush=True)
+    elapsed = time.perf_counter() - start_time
+    print(f"\nDone in {elapsed:.1f} s ({total / max(elapsed, 1e-9):.0f} columns/s, {fs} Hz input)")
+    return total, n_bins
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline spectrogram of large WAV/raw recordings.")
+    parser.add_argument("input", help="WAV file, StreamRecorder recording or headerless raw file")
+    parser.add_argument("output", help="Output .npy file (columns x frequency bins)")
+    parser.add_argument("--format", choices=["uint8", "float16"], default="uint8")
+    parser.add_argument("--channel", type=int, default=0)
+    parser.add_argument("--nperseg", type=int, default=NPERSEG)
+    parser.add_argument("--noverlap", type=int, default=NOVERLAP)
+    parser.add_argument("--chunk-columns", type=int, default=CHUNK_COLUMNS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--db-min", type=float, default=DB_MIN)
+    parser.add_argument("--db-max", type=float, default=DB_MAX)
+    parser.add_argument("--sample-rate", type=int, default=None, help="Sample rate of a headerless raw file")
+    parser.add_argument("--channels", type=int, default=1, help="Channel count of a headerless raw file")
+    args = parser.parse_args()
+
+    offline_spectrogram(
+        args.input, args.output, output_dtype=args.format, channel=args.channel, nperseg=args.nperseg,
+        noverlap=args.noverlap, chunk_columns=args.chunk_columns, workers=args.workers,
+        db_min=args.db_min, db_max=args.db_max, sample_rate=args.sample_rate, channels=args.channels
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import collections
+import os
+
+import numpy as np
+
+from synth import MIP_LEVELS, WAVETABLE_SIZE, compile_mip_levels, compile_wavetable
+
+LIBRARY_ENV = "WAVE_GEN_PATCHES"  # Overrides the patch library location
+DEFAULT_LIBRARY_PATH = os.path.join(os.path.expanduser("~"), ".local", "share", "wave_gen", "patches.wgp")
+
+MAGIC = b"WGPATCH\0"
+VERSION = 1
+ALIGNMENT = 16  # Every array starts on a multiple of this many bytes
+
+# Little-endian layout: header, one index entry per patch, then the arrays.
+# Vertices are float64 (count, 2); tables are float32 (levels, table_size + 1).
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u4"), ("count", "<u4")])
+ENTRY_DTYPE = np.dtype([
+    ("name", "S48"),
+    ("interpolation", "S16"),
+    ("vertex_count", "<u4"),
+    ("table_size", "<u4"),
+    ("levels", "<u4"),
+    ("reserved", "<u4"),
+    ("vertex_offset", "<u8"),
+    ("table_offset", "<u8"),
+])
+VERTEX_DTYPE = np.dtype("<f8")
+TABLE_DTYPE = np.dtype("<f4")
+
+# vertices: (count, 2) array; tables: (levels, table_size + 1) wavetable mip levels
+Patch = collections.namedtuple("Patch", "name interpolation vertices tables")
+
+
+def compile_patch(name, vertices, interpolation, size=WAVETABLE_SIZE, levels=MIP_LEVELS):
+    """Compile the wavetable and its mip levels for a set of (x, y) vertices."""
+    vertices = np.asarray(list(vertices), dtype=np.float64).reshape(-1, 2)
+    tables = compile_mip_levels(compile_wavetable(vertices, interpolation, size), levels)
+    return Patch(name, interpolation, vertices, tables)
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _encode(text, field):
+    encoded = text.encode("utf-8")
+    if len(encoded) > ENTRY_DTYPE[field].itemsize:
+        raise ValueError(f"Patch {field} is too long: {text!r}")
+    return encoded
+
+
+def write_library(path, patches):
+    """
+    Write patches to a library file, replacing it atomically.
+
+    Args:
+        path: Library file.
+        patches: Iterable of `Patch`; the arrays may be views of an open library.
+    """
+    patches = list(patches)
+    entries = np.zeros(len(patches), dtype=ENTRY_DTYPE)
+    arrays = []
+    offset = HEADER_DTYPE.itemsize + entries.nbytes
+    for entry, patch in zip(entries, patches):
+        vertices = np.ascontiguousarray(patch.vertices, dtype=VERTEX_DTYPE).reshape(-1, 2)
+        tables = np.ascontiguousarray(patch.tables, dtype=TABLE_DTYPE)
+        entry["name"] = _encode(patch.name, "name")
+        entry["interpolation"] = _encode(patch.interpolation, "interpolation")
+        entry["vertex_count"] = len(vertices)
+        entry["levels"], entry["table_size"] = tables.shape[0], tables.shape[1] - 1
+        for field, array in (("vertex_offset", vertices), ("table_offset", tables)):
+            offset = _align(offset)
+            entry[field] = offset
+            arrays.append((offset, array))
+            offset += array.nbytes
+
+    header = np.array([(MAGIC, VERSION, len(patches))], dtype=HEADER_DTYPE)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(entries.tobytes())
+        for offset, array in arrays:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(array.tobytes())
+    os.replace(temp_path, path)
+
+
+class PatchLibrary:
+    """
+    Read-only, memory-mapped collection of patches in one binary file.
+
+    Opening a library only reads the header and the fixed-size index; patch
+    vertices and tables are views into the mapped file, so nothing is parsed
+    or compiled until a patch is used and selecting one copies no samples.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        self._map = np.memmap(self.path, dtype=np.uint8, mode="r")
+        header = np.frombuffer(self._map, dtype=HEADER_DTYPE, count=1)[0]
+        if header["magic"] != MAGIC.rstrip(b"\0"):
+            raise ValueError(f"{self.path} is not a patch library")
+        if header["version"] != VERSION:
+            raise ValueError(f"{self.path} has unsupported patch format version {header['version']}")
+        self._entries = np.frombuffer(
+            self._map, dtype=ENTRY_DTYPE, count=int(header["count"]), offset=HEADER_DTYPE.itemsize
+        )
+        self._index = {name.decode("utf-8"): i for i, name in enumerate(self._entries["name"])}
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def names(self):
+        """Patch names in file order."""
+        return list(self._index)
+
+    def __getitem__(self, name):
+        entry = self._entries[self._index[name]]
+        count, levels, size = int(entry["vertex_count"]), int(entry["levels"]), int(entry["table_size"])
+        vertices = np.frombuffer(
+            self._map, dtype=VERTEX_DTYPE, count=count * 2, offset=int(entry["vertex_offset"])
+        ).reshape(count, 2)
+        tables = np.frombuffer(
+            self._map, dtype=TABLE_DTYPE, count=levels * (size + 1), offset=int(entry["table_offset"])
+        ).reshape(levels, size + 1)
+        return Patch(name, entry["interpolation"].decode("utf-8"), vertices, tables)
+
+    def save(self, patch):
+        """
+        Add `patch` to the library, replacing a patch with the same name, and reopen it.
+
+        The file is replaced, which Windows refuses while it is mapped, so the library drops
+        its mapping first; it is unmapped once no view returned by `__getitem__` refers to
+        it. Callers must copy or drop such views before saving, otherwise replacing the file
+        fails with OSError on Windows (POSIX only unlinks the old file, so views stay valid).
+        """
+        patches = [patch if name == patch.name else self[name] for name in self._index]
+        if patch.name not in self._index:
+            patches.append(patch)
+        # Copy everything out of the mapping, then drop this library's references to it
+        patches = [Patch(p.name, p.interpolation, np.array(p.vertices), np.array(p.tables)) for p in patches]
+        self._map = self._entries = None
+        try:
+            write_library(self.path, patches)
+        finally:
+            self._open()
+
+
+def open_library(path=None, defaults=()):
+    """
+    Open the patch library, creating it from `defaults` if it does not exist yet.
+
+    Args:
+        path: Library file (default: WAVE_GEN_PATCHES or ~/.local/share/wave_gen/patches.wgp).
+        defaults: Iterable of patches written when the library is created; pass a generator
+            so they are only compiled then, not on every start.
+    """
+    path = path or os.environ.get(LIBRARY_ENV, DEFAULT_LIBRARY_PATH)
+    if not os.path.exists(path):
+        write_library(path, defaults)
+    return PatchLibrary(path)
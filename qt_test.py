@@ -12,77 +12,10 @@ matplotlib.use("Qt5Agg")
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
 
-
-
-class BlitManager:
-    """
-    Manages blitting for Matplotlib figures.
-    """
-    def __init__(self, canvas, animated_artists=()):
-        """
-        Parameters
-        ----------
-        canvas : FigureCanvasAgg
-            The canvas to work with. Must support `copy_from_bbox` and `restore_region`.
-
-        animated_artists : Iterable[Artist]
-            List of the artists to manage.
-        """
-        self.canvas = canvas
-        self._bg = None
-        self._artists = []
-
-        for a in animated_artists:
-            self.add_artist(a)
-        # Grab the background on every draw
-        self.cid = canvas.mpl_connect("draw_event", self.on_draw)
-
-    def on_draw(self, event):
-        """Callback to register with 'draw_event'."""
-        cv = self.canvas
-        if event is not None and event.canvas != cv:
-                print("Canvas mismatch during draw event.")
-                return  # Ignore events from a different canvas
-        self._bg = cv.copy_from_bbox(cv.figure.bbox)
-        self._draw_animated()
-
-    def add_artist(self, art):
-        """
-        Add an artist to be managed.
-
-        Parameters
-        ----------
-        art : Artist
-            The artist to be added. Will be set to 'animated'.
-        """
-        if art.figure != self.canvas.figure:
-            raise RuntimeError("Artist must be in the same figure as the canvas.")
-        art.set_animated(True)
-        self._artists.append(art)
-
-    def _draw_animated(self):
-        """Draw all of the animated artists."""
-        fig = self.canvas.figure
-        for a in self._artists:
-            fig.draw_artist(a)
-
-    def update(self):
-        """Update the screen with animated artists."""
-        cv = self.canvas
-        fig = cv.figure
-        # print("Updating plot with blitting...")
-        # Paranoia in case we missed the draw event
-        if self._bg is None:
-            self.on_draw(None)
-        else:
-            # Restore the background
-            cv.restore_region(self._bg)
-            # Draw all the animated artists
-            self._draw_animated()
-            # Update the GUI state
-            cv.blit(fig.bbox)
-        # Let the GUI event loop process anything it has to do
-        cv.flush_events()
+from blitting import BlitManager
+from redraw_scheduler import QtRedrawScheduler
+import metrics
+from trace_events import span, traced
 
 
 class SineWavePlot:
@@ -98,15 +31,13 @@ class SineWavePlot:
         self.ax.set_ylim(self.fixed_ylim)  # Set static y-limits
         self.ax.legend(loc="upper right")  # Fix legend position
 
-        # Create the blit manager
-        self.bm = BlitManager(self.figure.canvas, [self.line])
-        # Cache the background
-        self.figure.canvas.draw()
-        self.bm.on_draw(None)
+        # Create the canvas here so the blit manager and the UI share it
+        self.canvas = FigureCanvas(self.figure)
+        self.bm = BlitManager(self.canvas, [self.line])
 
-        # Initialize plot frame count and start time
-        self.plot_frame_count = 0
-        self.start_time = time.time()
+        # Plot updates per second over a sliding window, plus per-plot latency
+        self.plot_rate = metrics.registry.rate("qt_test_plot_updates")
+        self.plot_latency = metrics.registry.latency("qt_test_plot")
 
         print(f"Line added to Axes: {self.line in self.ax.lines}")
 
@@ -114,13 +45,20 @@ class SineWavePlot:
         """
         Returns the Matplotlib canvas to embed in the UI.
         """
-        return FigureCanvas(self.figure)
+        return self.canvas
 
+    @traced("SineWavePlot.plot")
     def plot(self, frequency, amplitude):
         """
         Updates the sine wave data and redraws it using the BlitManager.
         """
         # print(f"Updating plot: Frequency={frequency}, Amplitude={amplitude}")
+        with self.plot_latency.time():
+            self._plot(frequency, amplitude)
+        self.plot_rate.mark()
+        return self.plot_rate.value()
+
+    def _plot(self, frequency, amplitude):
         # Update sine wave data
         x = np.linspace(0, 2 * np.pi, 500)
         y = amplitude * np.sin(frequency * x)
@@ -131,18 +69,9 @@ class SineWavePlot:
         print(f"y: {y[:5]} ... {y[-5:]}")
         print(f"y min: {np.min(y)}, y max: {np.max(y)}")
 
-        self.line.set_data(x, y)
-        self.figure.canvas.draw_idle()  # Force full redraw
-
         # Update the plot using the blit manager
-        # self.bm.update()
-
-        self.plot_frame_count += 1
-
-        elapsed_time = time.time() - self.start_time
-        if elapsed_time > 0:
-            return self.plot_frame_count / elapsed_time
-        return 0
+        with span("blit"):
+            self.bm.update()
 
 
 class WorkerSignals(QObject):
@@ -162,15 +91,13 @@ class SineWaveThread(threading.Thread):
         self.running = True
         self.frequency = 1000
         self.amplitude = 0.5
-        self.math_frame_count = 0
-        self.start_time = time.time()
+        self.math_rate = metrics.registry.rate("qt_test_math_updates")
 
     def run(self):
         while self.running:
             # Simulate computation
-            self.math_frame_count += 1
-            elapsed_time = time.time() - self.start_time
-            math_rate = self.math_frame_count / elapsed_time if elapsed_time > 0 else 0
+            self.math_rate.mark()
+            math_rate = self.math_rate.value()
 
             time.sleep(0.05)  # ~20 Hz updates
             self.signals.update.emit(self.frequency, self.amplitude, math_rate)
@@ -216,6 +143,12 @@ class MainWindow(QMainWindow):
         self.plot_rate_label = QLabel("Plot Update Rate: 0.0 Hz")
         layout.addWidget(self.plot_rate_label)
 
+        # Both the worker signal and the timer only mark the plot dirty; it is redrawn at most once per frame
+        self.pending_plot = (self.control_panel.get_frequency(), self.control_panel.get_amplitude())
+        self.redraw_scheduler = QtRedrawScheduler(self, max_fps=60)
+        self.redraw_scheduler.add_view("sine_wave", self.redraw_plot)
+        self.redraw_scheduler.start()
+
         # Start background thread with signals
         self.signals = WorkerSignals()
         self.signals.update.connect(self.update_plot_from_thread)
@@ -233,7 +166,21 @@ class MainWindow(QMainWindow):
         """
         frequency = self.control_panel.get_frequency()
         amplitude = self.control_panel.get_amplitude()
-        self.sine_wave_plot.plot(frequency, amplitude)
+        self.request_plot(frequency, amplitude)
+
+    def request_plot(self, frequency, amplitude):
+        """
+        Store the latest plot parameters and schedule a redraw.
+        """
+        self.pending_plot = (frequency, amplitude)
+        self.redraw_scheduler.mark_dirty("sine_wave")
+
+    def redraw_plot(self):
+        """
+        Redraw the sine wave with the latest parameters (called by the redraw scheduler).
+        """
+        plot_rate = self.sine_wave_plot.plot(*self.pending_plot)
+        self.plot_rate_label.setText(f"Plot Update Rate: {plot_rate:.2f} Hz")
 
     def update_frequency(self):
         """
@@ -254,14 +201,14 @@ class MainWindow(QMainWindow):
         Update the sine wave plot and math update rate from the background thread.
         """
         # print(f"Thread Update: Frequency={frequency}, Amplitude={amplitude}, Math Rate={math_rate}")
-        plot_rate = self.sine_wave_plot.plot(frequency, amplitude)
+        self.request_plot(frequency, amplitude)
         self.math_rate_label.setText(f"Math Update Rate: {math_rate:.2f} Hz")
-        self.plot_rate_label.setText(f"Plot Update Rate: {plot_rate:.2f} Hz")
 
     def closeEvent(self, event):
         """
         Ensure the thread stops when the window is closed.
         """
+        self.redraw_scheduler.stop()
         self.sine_wave_thread.stop()
         self.sine_wave_thread.join()
         super().closeEvent(event)
@@ -310,6 +257,7 @@ class ControlPanel:
 # Run the application
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    metrics.start_exporter_from_env()
     window = MainWindow()
     window.resize(800, 600)
     window.show()
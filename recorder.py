@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+DTYPE = np.float32
+
+
+def _meta_path(path):
+    return path + ".json"
+
+
+def open_recording(path):
+    """
+    Memory-map a recording written by `StreamRecorder`.
+
+    Returns:
+        (data, sample_rate) where data is a read-only (frames, channels) float32 array.
+    """
+    with open(_meta_path(path)) as f:
+        meta = json.load(f)
+    shape = (meta["frames"], meta["channels"])
+    if meta["frames"] == 0:
+        return np.zeros(shape, dtype=DTYPE), meta["sample_rate"]
+    return np.memmap(path, dtype=DTYPE, mode="r", shape=shape), meta["sample_rate"]
+
+
+class StreamRecorder:
+    """
+    Records an input stream to a raw float32 file from a background thread.
+
+    The audio callback only copies its block into a preallocated ring buffer and
+    never waits; if the ring is full the block is counted as dropped. A writer
+    thread drains the ring into a memory-mapped file in large sequential chunks,
+    growing the file in big preallocated steps. The sample rate, channel count
+    and frame count live in a JSON sidecar next to the file (`<path>.json`).
+    """
+    def __init__(self, path, channels, sample_rate, buffer_seconds=10, flush_frames=1 << 16,
+                 grow_seconds=300, poll_interval=0.05):
+        """
+        Args:
+            path: Output file for the interleaved float32 samples.
+            channels: Number of channels per frame.
+            sample_rate: Sampling rate in Hz (stored in the sidecar).
+            buffer_seconds: Capacity of the ring buffer between callback and writer.
+            flush_frames: Minimum number of frames per write to the file.
+            grow_seconds: How much the file grows each time it fills up.
+            poll_interval: Seconds the writer sleeps when there is not enough to flush.
+        """
+        self.path = path
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.flush_frames = flush_frames
+        self.grow_frames = int(grow_seconds * sample_rate)
+        self.poll_interval = poll_interval
+
+        self.ring = np.zeros((int(buffer_seconds * sample_rate), channels), dtype=DTYPE)
+        self.write_pos = 0  # Total frames written into the ring (owned by the callback)
+        self.read_pos = 0  # Total frames drained to disk (owned by the writer)
+        self.dropped_frames = 0
+
+        self.frames = 0
+        self.capacity = 0
+        self.file_map = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Create the file and start the writer thread."""
+        open(self.path, "wb").close()
+        self._grow()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="StreamRecorder", daemon=True)
+        self.thread.start()
+
+    def write(self, indata):
+        """Queue a (frames, channels) block; safe to call from the audio callback."""
+        frames = len(indata)
+        capacity = len(self.ring)
+        if frames > capacity - (self.write_pos - self.read_pos):
+            self.dropped_frames += frames
+            return
+
+        start = self.write_pos % capacity
+        end = start + frames
+        if end <= capacity:
+            self.ring[start:end] = indata
+        else:
+            split = capacity - start
+            self.ring[start:] = indata[:split]
+            self.ring[:end - capacity] = indata[split:]
+        self.write_pos += frames  # Publish only after the copy is complete
+
+    def _run(self):
+        while self.running:
+            if self.write_pos - self.read_pos >= self.flush_frames:
+                self._drain()
+            else:
+                time.sleep(self.poll_interval)
+        self._drain()
+
+    def _drain(self):
+        # Copy everything published so far, in at most two contiguous slices of the ring
+        available = self.write_pos - self.read_pos
+        capacity = len(self.ring)
+        while available > 0:
+            start = self.read_pos % capacity
+            count = min(available, capacity - start)
+            if self.frames + count > self.capacity:
+                self._grow()
+            self.file_map[self.frames:self.frames + count] = self.ring[start:start + count]
+            self.frames += count
+            self.read_pos += count
+            available -= count
+
+    def _grow(self):
+        # Extend the file by a large step and remap it
+        if self.file_map is not None:
+            self.file_map.flush()
+            del self.file_map
+        self.capacity += self.grow_frames
+        with open(self.path, "r+b") as f:
+            f.truncate(self.capacity * self.channels * DTYPE().itemsize)
+        self.file_map = np.memmap(self.path, dtype=DTYPE, mode="r+", shape=(self.capacity, self.channels))
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "dtype": np.dtype(DTYPE).str,
+            "frames": self.frames,
+        }
+        with open(_meta_path(self.path), "w") as f:
+            json.dump(meta, f)
+
+    def stop(self):
+        """Flush everything, trim the preallocated tail and finalise the sidecar."""
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        self.file_map.flush()
+        del self.file_map
+        self.file_map = None
+        with open(self.path, "r+b") as f:
+            f.truncate(self.frames * self.channels * DTYPE().itemsize)
+        self._write_meta()
+        if self.dropped_frames:
+            print(f"Recorder dropped {self.dropped_frames} frames")
+
+    @property
+    def seconds(self):
+        """Duration recorded to disk so far."""
+        return self.frames / self.sample_rate
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
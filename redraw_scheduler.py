@@ -0,0 +1,82 @@
+import threading
+
+MAX_FPS = 60  # Default upper bound on redraws per second
+
+
+class RedrawScheduler:
+    """
+    Coalesces redraw requests into at most one redraw per view per frame.
+
+    Event handlers (and other threads, e.g. the audio callback) only call
+    `mark_dirty`, which sets a flag and returns immediately. A GUI timer calls
+    `tick` once per frame on the GUI thread and redraws the views marked since
+    the previous tick, so a burst of mouse-motion events costs a single redraw.
+    Subclasses provide the timer for a particular toolkit.
+    """
+    def __init__(self, max_fps=MAX_FPS):
+        self.interval_ms = max(1, int(round(1000 / max_fps)))
+        self.views = {}
+        self.dirty = set()
+        self.requests = 0  # Calls to mark_dirty
+        self.frames = 0    # Ticks that redrew at least one view
+        self._lock = threading.Lock()
+
+    def add_view(self, name, redraw):
+        """Register `redraw`, a zero-argument callable run on the GUI thread."""
+        self.views[name] = redraw
+
+    def mark_dirty(self, name):
+        """Request a redraw of `name` on the next frame; safe to call from any thread."""
+        with self._lock:
+            self.dirty.add(name)
+            self.requests += 1
+
+    def tick(self):
+        """Redraw every dirty view. Must run on the GUI thread."""
+        with self._lock:
+            if not self.dirty:
+                return
+            dirty, self.dirty = self.dirty, set()
+        self.frames += 1
+        for name in dirty:
+            self.views[name]()
+
+    def coalesced(self):
+        """Number of redraw requests absorbed by an already pending frame."""
+        return self.requests - self.frames
+
+
+class TkRedrawScheduler(RedrawScheduler):
+    """Scheduler ticking from the Tk event loop with `root.after`."""
+    def __init__(self, root, max_fps=MAX_FPS):
+        super().__init__(max_fps)
+        self.root = root
+        self._after_id = None
+
+    def start(self):
+        self._after_id = self.root.after(self.interval_ms, self._run)
+
+    def _run(self):
+        self.tick()
+        self._after_id = self.root.after(self.interval_ms, self._run)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+
+class QtRedrawScheduler(RedrawScheduler):
+    """Scheduler ticking from the Qt event loop with a `QTimer`."""
+    def __init__(self, parent=None, max_fps=MAX_FPS):
+        from PyQt5.QtCore import QTimer
+
+        super().__init__(max_fps)
+        self.timer = QTimer(parent)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        self.timer.start(self.interval_ms)
+
+    def stop(self):
+        self.timer.stop()
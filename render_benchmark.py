@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+# Offscreen platforms must be chosen before any GUI toolkit is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+RESOLUTIONS = ((640, 360), (1280, 720), (2560, 1440))
+FRAMES = 200                     # Timed frames per backend and resolution
+WARMUP_FRAMES = 10
+WAVEFORM_POINTS = 2048           # Samples in the synthetic waveform (one audio block)
+SPECTROGRAM_SHAPE = (513, 1024)  # Frequency bins x time columns, as spectogram_gpu
+DPI = 100
+
+
+class SyntheticData:
+    """Identical frame sequence for every backend: a moving waveform and a scrolling spectrogram."""
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.x = np.arange(WAVEFORM_POINTS)
+        self.base = np.sin(self.x / 40).astype(np.float32)
+        self.noise = rng.uniform(-0.1, 0.1, (64, WAVEFORM_POINTS)).astype(np.float32)
+        self.columns = rng.random((64, SPECTROGRAM_SHAPE[0])).astype(np.float32)
+        self.spectrogram = np.zeros(SPECTROGRAM_SHAPE, dtype=np.float32)
+
+    def waveform(self, frame):
+        return np.roll(self.base, frame * 7) + self.noise[frame % len(self.noise)]
+
+    def scroll(self, frame):
+        self.spectrogram[:, :-1] = self.spectrogram[:, 1:]
+        self.spectrogram[:, -1] = self.columns[frame % len(self.columns)]
+        return self.spectrogram
+
+
+def matplotlib_blit(width, height, data):
+    """Agg canvas with cached background and animated line/image through blitting.BlitManager."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from blitting import BlitManager
+
+    figure = Figure(figsize=(width / DPI, height / DPI), dpi=DPI)
+    canvas = FigureCanvasAgg(figure)
+    ax_wave, ax_spec = figure.subplots(2, 1)
+    line, = ax_wave.plot(data.x, data.base)
+    ax_wave.set_ylim(-1.2, 1.2)
+    image = ax_spec.imshow(data.spectrogram, aspect="auto", origin="lower", vmin=0, vmax=1)
+    bm = BlitManager(canvas, [line, image])
+    canvas.draw()
+
+    def frame(i):
+        line.set_ydata(data.waveform(i))
+        image.set_array(data.scroll(i))
+        bm.update()
+    return frame
+
+
+def pyqtgraph_offscreen(width, height, data):
+    """pyqtgraph plot and image items rendered with QT_QPA_PLATFORM=offscreen."""
+    import pyqtgraph as pg
+
+    app = pg.mkQApp()
+    widget = pg.GraphicsLayoutWidget()
+    widget.resize(width, height)
+    curve = widget.addPlot(row=0, col=0).plot(data.x, data.base)
+    image = pg.ImageItem(data.spectrogram.T)
+    widget.addPlot(row=1, col=0).addItem(image)
+    widget.show()
+    app.processEvents()
+
+    def frame(i):
+        curve.setData(data.x, data.waveform(i))
+        image.setImage(data.scroll(i).T, autoLevels=False, levels=(0, 1))
+        widget.grab()  # Forces a full render of the scene
+        app.processEvents()
+    return frame
+
+
+def vispy_gloo(width, height, data):
+    """Textured quad with a GPU colormap, as spectogram_gpu.SpectrogramCanvas."""
+    from vispy import app, gloo
+
+    app.use_app()  # Whatever backend provides a (software) GL context, e.g. osmesa or egl
+    vertex = """
+    attribute vec2 a_position;
+    attribute vec2 a_texcoord;
+    varying vec2 v_texcoord;
+    void main() {
+        v_texcoord = a_texcoord;
+        gl_Position = vec4(a_position, 0.0, 1.0);
+    }
+    """
+    fragment = """
+    uniform sampler2D u_texture;
+    varying vec2 v_texcoord;
+    void main() {
+        float intensity = texture2D(u_texture, v_texcoord).r;
+        gl_FragColor = vec4(intensity, intensity * 0.5, 1.0 - intensity, 1.0);
+    }
+    """
+    canvas = app.Canvas(size=(width, height), show=False)
+    canvas.set_current()
+    texture = gloo.Texture2D(data.spectrogram, interpolation="linear")
+    program = gloo.Program(vertex, fragment)
+    program["u_texture"] = texture
+    program["a_position"] = gloo.VertexBuffer(np.array([[-1, -1], [1, -1], [-1, 1], [1, 1]], dtype=np.float32))
+    program["a_texcoord"] = gloo.VertexBuffer(np.array([[0, 0], [1, 0], [0, 1], [1, 1]], dtype=np.float32))
+    frame_buffer = gloo.FrameBuffer(gloo.Texture2D(shape=(height, width, 4)), gloo.RenderBuffer((height, width)))
+
+    def frame(i):
+        texture.set_data(data.scroll(i))
+        with frame_buffer:
+            gloo.set_viewport(0, 0, width, height)
+            gloo.clear()
+            program.draw("triangle_strip")
+            frame_buffer.read()  # Wait for the GPU/rasterizer to finish
+    return frame
+
+
+def vispy_scene(width, height, data):
+    """SceneCanvas with an Image visual, as spectogram.SpectrogramCanvasWithScale."""
+    from vispy import app, scene
+
+    app.use_app()
+    canvas = scene.SceneCanvas(size=(width, height), show=False)
+    view = canvas.central_widget.add_view(camera="panzoom")
+    image = scene.visuals.Image(data.spectrogram, parent=view.scene, cmap="viridis", clim=(0, 1))
+    view.camera.rect = (0, 0, data.spectrogram.shape[1], data.spectrogram.shape[0])
+
+    def frame(i):
+        image.set_data(data.scroll(i))
+        canvas.render()
+    return frame
+
+
+BACKENDS = {
+    "matplotlib_blit": matplotlib_blit,
+    "pyqtgraph": pyqtgraph_offscreen,
+    "vispy_gloo": vispy_gloo,
+    "vispy_scene": vispy_scene,
+}
+
+
+def run_backend(setup, width, height, frames=FRAMES, warmup=WARMUP_FRAMES):
+    """
+    Render `frames` frames and time each one.
+
+    Returns:
+        Dictionary with frame time percentiles (ms), mean FPS and CPU time per frame (ms).
+    """
+    data = SyntheticData()
+    frame = setup(width, height, data)
+    for i in range(warmup):
+        frame(i)
+
+    wall = np.zeros(frames)
+    cpu = np.zeros(frames)
+    for i in range(frames):
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        frame(warmup + i)
+        wall[i] = time.perf_counter() - start_wall
+        cpu[i] = time.process_time() - start_cpu
+
+    wall_ms = wall * 1000
+    return {
+        "p50_ms": float(np.percentile(wall_ms, 50)),
+        "p95_ms": float(np.percentile(wall_ms, 95)),
+        "p99_ms": float(np.percentile(wall_ms, 99)),
+        "max_ms": float(wall_ms.max()),
+        "fps": float(frames / wall.sum()),
+        "cpu_ms_per_frame": float(cpu.mean() * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offscreen frame-time benchmark of the visualization backends.")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("-o", "--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'backend':16s} {'resolution':>11s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'fps':>8s} {'cpu/frame':>10s}")
+    for name in args.backends:
+        for width, height in RESOLUTIONS:
+            key = f"{name}/{width}x{height}"
+            try:
+                result = run_backend(BACKENDS[name], width, height, frames=args.frames)
+            except Exception as e:
+                print(f"{name:16s} {width:>5d}x{height:<5d} skipped: {e}")
+                continue
+            results[key] = result
+            print(f"{name:16s} {width:>5d}x{height:<5d} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                  f"{result['p99_ms']:8.2f} {result['fps']:8.1f} {result['cpu_ms_per_frame']:10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import time
+
+import numpy as np
+
+from audio_backend import VirtualStream
+from audio_files import open_audio, to_float
+from spectrogram_step import SETTINGS, spectrogram_column
+
+
+class FileInputStream(VirtualStream):
+    """
+    Drop-in replacement for `sd.InputStream` that plays back a recorded file.
+
+    Blocks are delivered to `callback(indata, frames, time, status)` from a
+    background thread, like PortAudio does. `speed` sets the pacing: 1.0 is real
+    time, N is N times faster and 0 runs as fast as the callback allows. A file
+    at another rate than `samplerate` is resampled once when the stream is
+    created, so the analysis sees the rate it was opened with.
+    """
+    def __init__(self, path, samplerate=None, channels=1, callback=None, blocksize=1024, dtype="float32",
+                 speed=1.0, loop=False, **kwargs):
+        self.data, file_rate = open_audio(path)
+        if samplerate is not None and samplerate != file_rate:
+            from math import gcd
+            from scipy.signal import resample_poly
+
+            print(f"Replay: resampling {path} from {file_rate} Hz to {samplerate} Hz")
+            divisor = gcd(int(samplerate), int(file_rate))
+            self.data = resample_poly(
+                to_float(self.data), int(samplerate) // divisor, int(file_rate) // divisor, axis=0
+            ).astype(np.float32)
+        super().__init__(
+            "input", samplerate=samplerate or file_rate, channels=channels, callback=callback,
+            blocksize=blocksize, dtype=dtype, speed=speed, source=self._read_block, **kwargs
+        )
+        self.loop = loop
+        self.position = 0  # Next frame of the file to deliver
+
+    def _read_block(self, frames, channels):
+        # Next block as (frames, channels) float; shorter at the end of the file unless looping
+        block = np.zeros((frames, channels), dtype=self.dtype)
+        filled = 0
+        while filled < frames:
+            count = min(frames - filled, len(self.data) - self.position)
+            if count <= 0:
+                if not self.loop:
+                    break
+                self.position = 0
+                continue
+            chunk = to_float(self.data[self.position:self.position + count])
+            for channel in range(channels):
+                block[filled:filled + count, channel] = chunk[:, min(channel, chunk.shape[1] - 1)]
+            filled += count
+            self.position += count
+        return block[:filled] if filled else None
+
+
+def measure(path, target="spectogram", block_size=2048, speed=0, sample_rate=None):
+    """
+    Replay a file through a script's `update_spectrogram` step and time it.
+
+    Args:
+        path: Recording to replay.
+        target: Analyzer script whose spectrogram settings are used (a key of `spectrogram_step.SETTINGS`).
+        block_size: Frames per callback, as in the analyzer scripts.
+        speed: Replay pacing (0 = as fast as possible).
+        sample_rate: Rate to analyse at; the file is resampled if it differs (default: the file's rate).
+
+    Returns:
+        Dictionary with the number of columns, columns/sec and CPU time per column.
+    """
+    settings = SETTINGS[target]
+    durations = []
+    cpu_times = []
+    sample_rate = sample_rate or open_audio(path)[1]
+
+    def callback(indata, frames, time_info, status):
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        spectrogram_column(indata[:, 0], sample_rate, **settings)
+        durations.append(time.perf_counter() - start_wall)
+        cpu_times.append(time.process_time() - start_cpu)
+
+    wall_start = time.perf_counter()
+    stream = FileInputStream(path, samplerate=sample_rate, callback=callback, blocksize=block_size, speed=speed)
+    with stream:
+        stream.wait()
+    wall = time.perf_counter() - wall_start
+
+    durations = np.array(durations)
+    return {
+        "columns": len(durations),
+        "columns_per_second": len(durations) / wall if wall > 0 else 0.0,
+        "cpu_ms_per_column": 1000 * float(np.mean(cpu_times)) if cpu_times else 0.0,
+        "p50_ms": 1000 * float(np.percentile(durations, 50)) if len(durations) else 0.0,
+        "p99_ms": 1000 * float(np.percentile(durations, 99)) if len(durations) else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recording through the spectrogram analysis step.")
+    parser.add_argument("input", help="WAV file or StreamRecorder recording")
+    parser.add_argument("--target", choices=sorted(SETTINGS), default="spectogram",
+                        help="Analyzer script whose spectrogram settings are used")
+    parser.add_argument("--block-size", type=int, default=2048)
+    parser.add_argument("--speed", type=float, default=0, help="1 = real time, N = N times faster, 0 = unpaced")
+    parser.add_argument("--sample-rate", type=int, default=None, help="Resample the file to this rate first")
+    args = parser.parse_args()
+
+    results = measure(args.input, args.target, args.block_size, args.speed, args.sample_rate)
+    for name, value in results.items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TAPS_PER_PHASE = 32  # Filter length in input samples; longer is sharper but slower
+ROLLOFF = 0.92       # Passband edge as a fraction of the lower Nyquist frequency
+KAISER_BETA = 8.6    # Stopband attenuation of about 85 dB
+
+
+def polyphase_filter(up, down, taps_per_phase=TAPS_PER_PHASE, rolloff=ROLLOFF, beta=KAISER_BETA):
+    """
+    Kaiser-windowed sinc lowpass for resampling by up/down, split into `up` phases.
+
+    Returns:
+        Array of shape (up, taps_per_phase); row p holds the taps of phase p in
+        reverse order, ready to be applied to a window of input samples in time order.
+    """
+    length = up * taps_per_phase
+    cutoff = rolloff / max(up, down)  # In cycles per sample at the upsampled rate, relative to Nyquist
+    n = np.arange(length) - (length - 1) / 2
+    taps = up * cutoff * np.sinc(cutoff * n) * np.kaiser(length, beta)
+    return taps.reshape(taps_per_phase, up).T[:, ::-1].copy()
+
+
+class StreamingResampler:
+    """
+    Polyphase sample-rate converter for a continuous stream of blocks.
+
+    The ratio is reduced to up/down (44.1k -> 48k is 160/147). Each output
+    sample reads one phase of the filter over the last `taps_per_phase` input
+    samples; all outputs of a block are gathered from a sliding window view and
+    computed in one `einsum`. The filter history and the fractional position
+    of the next output carry over between blocks, so the output is identical
+    whatever the block sizes. Equal rates pass blocks through unchanged.
+    """
+    def __init__(self, input_rate, output_rate, channels=1, taps_per_phase=TAPS_PER_PHASE):
+        """
+        Args:
+            input_rate, output_rate: Sampling rates in Hz (integers).
+            channels: Channels of the (frames, channels) blocks.
+            taps_per_phase: Filter length in input samples.
+        """
+        divisor = gcd(int(input_rate), int(output_rate))
+        self.up = int(output_rate) // divisor
+        self.down = int(input_rate) // divisor
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.channels = channels
+        self.passthrough = self.up == self.down
+        self.taps_per_phase = 1 if self.passthrough else taps_per_phase
+        self.phases = None if self.passthrough else polyphase_filter(self.up, self.down, taps_per_phase)
+        # Position of the next output at the upsampled rate, relative to the next block's first sample
+        self._position = 0
+        self._history = np.zeros((self.taps_per_phase - 1, channels))
+        self._output = np.zeros((0, channels))  # Produced but not yet pulled
+
+    @property
+    def latency(self):
+        """Group delay of the filter in seconds."""
+        if self.passthrough:
+            return 0.0
+        return (self.up * self.taps_per_phase - 1) / (2 * self.up) / self.input_rate
+
+    def frames_needed(self, output_frames):
+        """Input frames that produce at least `output_frames` more output frames."""
+        if self.passthrough:
+            return output_frames
+        return -(-((output_frames - 1) * self.down + self._position + 1) // self.up)
+
+    def process(self, block):
+        """
+        Resample one (frames, channels) block.
+
+        Returns:
+            The output frames this block completes (their count varies from block to block).
+        """
+        block = np.asarray(block, dtype=np.float64).reshape(len(block), self.channels)
+        if self.passthrough:
+            return block
+        frames = len(block)
+        count = max(0, (frames * self.up - 1 - self._position) // self.down + 1)
+        positions = self._position + np.arange(count) * self.down
+        self._position += count * self.down - frames * self.up
+
+        extended = np.concatenate((self._history, block))
+        self._history = extended[frames:]
+        windows = sliding_window_view(extended, self.taps_per_phase, axis=0)  # (frames, channels, taps)
+        return np.einsum("nct,nt->nc", windows[positions // self.up], self.phases[positions % self.up])
+
+    def pull(self, frames, render, chunk=None):
+        """
+        Produce exactly `frames` output frames, rendering input as needed.
+
+        Args:
+            frames: Output frames wanted (e.g. the device callback's `frames`).
+            render: Callable returning a (n, channels) block of n input frames.
+            chunk: Render in multiples of this many input frames (e.g. an effect's
+                partition size); surplus output is kept for the next call.
+        """
+        while len(self._output) < frames:
+            needed = self.frames_needed(frames - len(self._output))
+            if chunk:
+                needed = -(-needed // chunk) * chunk
+            self._output = np.concatenate((self._output, self.process(render(needed))))
+        out, self._output = self._output[:frames], self._output[frames:]
+        return out
+
+    def wrap(self, callback, chunk=None):
+        """
+        Turn a callback rendering at `input_rate` into one for a stream at `output_rate`.
+
+        `callback(outdata, frames, time, status)` is called with a float32
+        buffer of input-rate frames; its output is resampled into the stream's
+        `outdata`. With `chunk`, a stream callback costs as many chunks as
+        `pull` needs: open the stream with at most the output frames of one chunk
+        (rounded down) per callback, or some callbacks render two chunks.
+        """
+        def resampled_callback(outdata, frames, time, status):
+            def render(count):
+                block = np.zeros((count, self.channels), dtype=np.float32)
+                callback(block, count, time, status)
+                return block
+            outdata[:] = self.pull(frames, render, chunk)
+        return resampled_callback
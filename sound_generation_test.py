@@ -1,7 +1,10 @@
 import numpy as np
-import sounddevice as sd
 import tkinter as tk
 
+from audio_backend import get_backend
+from callback_stats import CallbackStats
+from resampler import StreamingResampler
+
 # Global variables to store frequency, volume, and waveform type
 frequency = 440  # Default frequency
 volume = 0.5     # Default volume
@@ -74,37 +77,53 @@ def update_waveform(selection):
     waveform_type = selection
 
 
-# Create GUI with Tkinter
-root = tk.Tk()
-root.title("Real-time Wave Generator")
-
-# Frequency slider
-freq_slider = tk.Scale(root, from_=20, to=2000, orient='horizontal', label="Frequency (Hz)", command=update_frequency)
-freq_slider.set(frequency)  # Set default frequency
-freq_slider.pack()
-
-# Volume slider
-vol_slider = tk.Scale(root, from_=0, to=1, resolution=0.01, orient='horizontal', label="Volume", command=update_volume)
-vol_slider.set(volume)  # Set default volume
-vol_slider.pack()
-
-# Waveform selection dropdown
-waveform_options = ["sine", "square", "triangle"]
-waveform_var = tk.StringVar(root)
-waveform_var.set(waveform_type)  # Set default waveform type
-waveform_dropdown = tk.OptionMenu(root, waveform_var, *waveform_options, command=update_waveform)
-waveform_dropdown.config(width=10)
-waveform_dropdown.pack()
-waveform_label = tk.Label(root, text="Select Waveform")
-waveform_label.pack()
-
-# Start the audio stream with the callback function
-stream = sd.OutputStream(callback=audio_callback, samplerate=sample_rate, channels=1)
-stream.start()
-
-# Run the GUI loop
-root.mainloop()
-
-# Stop the audio stream when GUI is closed
-stream.stop()
-stream.close()
+def main():
+    """Build the GUI, start the audio stream and run until the window is closed."""
+    # Create GUI with Tkinter
+    root = tk.Tk()
+    root.title("Real-time Wave Generator")
+
+    # Frequency slider
+    freq_slider = tk.Scale(root, from_=20, to=2000, orient='horizontal', label="Frequency (Hz)", command=update_frequency)
+    freq_slider.set(frequency)  # Set default frequency
+    freq_slider.pack()
+
+    # Volume slider
+    vol_slider = tk.Scale(root, from_=0, to=1, resolution=0.01, orient='horizontal', label="Volume", command=update_volume)
+    vol_slider.set(volume)  # Set default volume
+    vol_slider.pack()
+
+    # Waveform selection dropdown
+    waveform_options = ["sine", "square", "triangle"]
+    waveform_var = tk.StringVar(root)
+    waveform_var.set(waveform_type)  # Set default waveform type
+    waveform_dropdown = tk.OptionMenu(root, waveform_var, *waveform_options, command=update_waveform)
+    waveform_dropdown.config(width=10)
+    waveform_dropdown.pack()
+    waveform_label = tk.Label(root, text="Select Waveform")
+    waveform_label.pack()
+
+    # Start the audio stream with the callback function, resampled if the device runs at another rate
+    backend = get_backend()
+    device_rate = int(backend.default_samplerate())
+    callback = audio_callback
+    if device_rate != sample_rate:
+        callback = StreamingResampler(sample_rate, device_rate).wrap(audio_callback)
+        print(f"Resampling {sample_rate} Hz to the device's {device_rate} Hz")
+    callback_stats = CallbackStats("Output callback", device_rate)
+    callback_stats.start_logging(log=print)
+    stream = backend.output_stream(callback=callback_stats.wrap(callback), samplerate=device_rate, channels=1)
+    stream.start()
+
+    # Run the GUI loop
+    root.mainloop()
+
+    # Stop the audio stream when GUI is closed
+    stream.stop()
+    stream.close()
+    callback_stats.stop_logging()
+    print(callback_stats.log_line())
+
+
+if __name__ == "__main__":
+    main()
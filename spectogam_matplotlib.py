@@ -1,12 +1,22 @@
-import sounddevice as sd
+from functools import partial
+import queue
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 
 import utils
+from batched_fft import BatchedSTFT
+from audio_backend import get_backend
+from audio_files import open_audio
+from callback_stats import CallbackStats
+from device_registry import DeviceRegistry
+from recorder import StreamRecorder
+from replay import FileInputStream
+from trace_events import traced
 
 # --- Configurable Parameters ---
 BLOCK_SIZE = 2048                # Size of audio buffer (FFT size)
+HOP_SIZE = BLOCK_SIZE            # Samples between spectrogram columns
+FFT_WINDOW = "boxcar"            # Analysis window (scipy.signal.get_window name)
+FFT_WORKERS = None               # Threads for the batched FFT in the plot update (None = all cores)
 SPECTROGRAM_FRAMES = 100         # Number of time frames in spectrogram
 DEFAULT_FS = 44100               # Default sampling rate (can be overwritten by device info)
 INTERVAL_MS = 5                  # Update interval in milliseconds
@@ -37,8 +47,11 @@ SPECTROGRAM_YLABEL = "Frequency (Hz)"
 TIME_MIN = 0                     # Minimum time for spectrogram
 SPECTROGRAM_ORIGIN = 'lower'     # Origin setting for spectrogram plot
 SPECTROGRAM_ASPECT = 'auto'      # Aspect ratio for spectrogram plot
-AUDIO_STREAM_CHANNELS = 1        # Number of audio channels
+AUDIO_STREAM_CHANNELS = 1        # Number of audio channels (0 = all inputs of the selected device)
 AUDIO_STREAM_DTYPE = 'float32'   # Data type for audio stream
+RECORD_PATH = None               # Raw float32 file to record the input to (None = no recording)
+REPLAY_PATH = None               # Recording to replay instead of a live device (None = live input)
+REPLAY_SPEED = 1.0               # Replay pacing: 1 = real time, N = N times faster, 0 = as fast as possible
 AUDIO_STREAM_MESSAGE = "Audio stream started. Press Ctrl+C to stop."
 AUDIO_STREAM_STOP_MESSAGE = "Audio stream stopped."
 KEYBOARD_INTERRUPT_MESSAGE = "\nStopping the audio stream."
@@ -47,13 +60,38 @@ STREAM_STATUS_MESSAGE = "Stream status: {}"
 
 def main():
     """Main function to run the live audio stream visualization."""
-    # Get the list of audio devices
-    device_list = sd.query_devices()
-    device_names = [device['name'] for device in device_list]
-    device_values = device_list  # Full device information
-
-    # Tkinter-based list selection (assuming tkinter_list is already defined)
-    selected_device = utils.tkinter_list(device_names, device_values)
+    if REPLAY_PATH is not None:
+        # Describe the recording like a device so the rest of the setup is unchanged
+        replay_data, replay_rate = open_audio(REPLAY_PATH)
+        selected_device = {
+            'name': REPLAY_PATH,
+            'index': None,
+            'default_samplerate': replay_rate,
+            'max_input_channels': replay_data.shape[1],
+        }
+        stream_factory = partial(FileInputStream, REPLAY_PATH, speed=REPLAY_SPEED)
+    else:
+        # Show the devices cached by the last run right away; enumeration (which loads sounddevice
+        # and starts PortAudio) only begins in the background once the dialog is up, and replaces
+        # the list (also when devices are plugged in or out) while the dialog is open
+        registry = DeviceRegistry()
+        updates = queue.Queue()
+        registry.add_listener(lambda devices, added, removed: updates.put(
+            ([device['name'] for device in devices], devices)))
+        device_list = registry.devices()
+        device_names = [device['name'] for device in device_list]
+        device_values = device_list  # Full device information
+
+        # Tkinter-based list selection (assuming tkinter_list is already defined)
+        selected_device = utils.tkinter_list(device_names, device_values, updates=updates,
+                                             on_shown=registry.start)
+
+        # Rescanning re-initializes PortAudio, so stop before opening the stream, and
+        # swap a cached entry for the freshly enumerated device (indices can change)
+        registry.stop()
+        if selected_device is not None:
+            selected_device = registry.resolve(selected_device)
+        stream_factory = get_backend().input_stream
 
     # Ensure a device was selected
     if selected_device is None:
@@ -63,9 +101,16 @@ def main():
     # Print the selected device name
     print(f"Selected device: {selected_device['name']}")
 
+    # matplotlib loads after the device dialog, so the dialog appears without waiting for it
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
     # Use selected device's sample rate
     fs = int(selected_device.get("default_samplerate", DEFAULT_FS))
 
+    # Use every input of the device unless a channel count is configured
+    channels = AUDIO_STREAM_CHANNELS or int(selected_device.get("max_input_channels", 1))
+
     # --- Frequency Bin Calculations ---
     freq_bins = np.fft.rfftfreq(BLOCK_SIZE, d=1.0 / fs)
     # Find indices corresponding to FREQ_MIN and FREQ_MAX
@@ -78,28 +123,48 @@ def main():
     audio_buffer = np.zeros(BLOCK_SIZE, dtype=AUDIO_STREAM_DTYPE)
     spectrogram_data = np.zeros((len(freq_indices), SPECTROGRAM_FRAMES))
 
+    # The callback queues whole blocks; each plot update transforms every hop of every channel
+    # that arrived since the previous one in a single batched FFT
+    stft = BatchedSTFT(BLOCK_SIZE, HOP_SIZE, channels, window=FFT_WINDOW, workers=FFT_WORKERS)
+    pending_blocks = queue.SimpleQueue()
+
+    # Background recording of everything the stream delivers
+    recorder = StreamRecorder(RECORD_PATH, channels, fs) if RECORD_PATH else None
+
     # --- Audio Callback ---
+    @traced("audio_callback")
     def audio_callback(indata, frames, time, status):
         """Callback function for the audio input stream."""
         if status:
             print(STREAM_STATUS_MESSAGE.format(status))  # Print stream errors/warnings
+        if recorder is not None:
+            recorder.write(indata)  # Never blocks; drained by the writer thread
         audio_buffer[:] = indata[:, AUDIO_BUFFER_CHANNEL_INDEX]  # Update audio buffer with specified channel data
-
-        # Compute FFT for the spectrogram
-        spectrum = np.abs(np.fft.rfft(audio_buffer, n=BLOCK_SIZE)) / BLOCK_SIZE
-        spectrum = spectrum[freq_indices]  # Select frequencies within the desired range
-        decibel_spectrum = AMPLITUDE_TO_DB_SCALE * np.log10(spectrum + SMALL_VALUE)
-        spectrogram_data[:, :-1] = spectrogram_data[:, 1:]  # Shift data for scrolling effect
-        spectrogram_data[:, -1] = np.clip(decibel_spectrum, VMIN_DB, VMAX_DB)  # Update the latest column
+        pending_blocks.put(indata.copy())
 
     # --- Plotting Functions ---
+    @traced("update_waveform")
     def update_waveform(frame):
         """Update function for the waveform plot."""
         waveform_line.set_ydata(audio_buffer)  # Update the y-data of the line
         return waveform_line,
 
+    @traced("update_spectrogram")
     def update_spectrogram(frame):
         """Update function for the spectrogram plot."""
+        # Compute FFTs for all frames of all channels completed since the last update
+        while True:
+            try:
+                stft.push(pending_blocks.get_nowait())
+            except queue.Empty:
+                break
+        spectra = stft.magnitude()[AUDIO_BUFFER_CHANNEL_INDEX]  # (frames, bins) of the displayed channel
+        count = min(len(spectra), SPECTROGRAM_FRAMES)
+        if count > 0:
+            spectrum = spectra[-count:, freq_indices].T  # Select frequencies within the desired range
+            decibel_spectrum = AMPLITUDE_TO_DB_SCALE * np.log10(spectrum + SMALL_VALUE)
+            spectrogram_data[:, :-count] = spectrogram_data[:, count:]  # Shift data for scrolling effect
+            spectrogram_data[:, -count:] = np.clip(decibel_spectrum, VMIN_DB, VMAX_DB)  # Update the latest columns
         spectrogram_image.set_array(spectrogram_data)
         return spectrogram_image,
 
@@ -130,12 +195,16 @@ def main():
     ax_spectrogram.set_ylabel(SPECTROGRAM_YLABEL, fontsize=AXIS_FONT_SIZE)
 
     # --- Audio Stream Configuration ---
+    callback_stats = CallbackStats("Input callback", fs)
+    callback_stats.start_logging(log=print)
+    if recorder is not None:
+        recorder.start()
     try:
-        with sd.InputStream(
+        with stream_factory(
             device=selected_device['index'],
-            channels=AUDIO_STREAM_CHANNELS,
+            channels=channels,
             samplerate=fs,
-            callback=audio_callback,
+            callback=callback_stats.wrap(audio_callback),
             blocksize=BLOCK_SIZE,
             dtype=AUDIO_STREAM_DTYPE
         ):
@@ -163,6 +232,13 @@ def main():
         # Handle errors
         print(ERROR_MESSAGE.format(e))
 
+    finally:
+        callback_stats.stop_logging()
+        print(callback_stats.log_line())
+        if recorder is not None:
+            recorder.stop()
+            print(f"Recorded {recorder.seconds:.1f} s to {RECORD_PATH}")
+
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,20 @@
 from vispy import app, scene
 import numpy as np
-import sounddevice as sd
+from functools import partial
 from scipy.signal import spectrogram
 
+from audio_backend import get_backend
+from callback_stats import CallbackStats
+from replay import FileInputStream
+from spectrogram_step import SETTINGS, normalized_column, spectrogram_column
+from trace_events import span, traced
+
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QLabel, QSlider, QWidget
 from PyQt6.QtCore import Qt
 
 
 class SpectrogramCanvasWithScale(scene.SceneCanvas):
-    def __init__(self, sample_rate, block_size, freq_min, freq_max, time_window):
+    def __init__(self, sample_rate, block_size, freq_min, freq_max, time_window, zoom=False, stream_factory=None):
         super().__init__(keys="interactive", size=(2560, 1440))
 
         # Allow adding new attributes
@@ -20,17 +26,6 @@ class SpectrogramCanvasWithScale(scene.SceneCanvas):
         self.freq_max = freq_max
         self.time_window = time_window
 
-        # Initialize sounddevice input stream
-        self.audio_buffer = np.zeros(block_size, dtype=np.float32)  # Placeholder buffer
-        self.stream = sd.InputStream(
-            samplerate=self.sample_rate,
-            channels=1,
-            callback=self.audio_callback,
-            blocksize=self.block_size,
-            dtype='float32'
-        )
-        self.stream.start()
-
         # Create a grid layout
         self.grid = self.central_widget.add_grid(spacing=0)
 
@@ -45,6 +40,28 @@ class SpectrogramCanvasWithScale(scene.SceneCanvas):
         _, _, initial_Sxx = spectrogram(np.zeros(block_size), fs=sample_rate,  nperseg=2<<12, noverlap=128)
         self.data = np.zeros((width, height), dtype=np.float32)
 
+        # Band-limited analysis of freq_min..freq_max instead of the full spectrum; one spectrum
+        # covers at most a tenth of the time window and has no more bins than the image has rows
+        self.zoom = None
+        if zoom:
+            from zoom_fft import ZoomSpectrum
+            self.zoom = ZoomSpectrum(sample_rate, freq_min, freq_max, time_resolution=time_window / 10,
+                                     max_bins=self.data.shape[0])
+
+        # Initialize the input stream (live device by default)
+        stream_factory = stream_factory or get_backend().input_stream
+        self.audio_buffer = np.zeros(block_size, dtype=np.float32)  # Placeholder buffer
+        self.callback_stats = CallbackStats("Input callback", self.sample_rate)
+        self.callback_stats.start_logging(log=print)
+        self.stream = stream_factory(
+            samplerate=self.sample_rate,
+            channels=1,
+            callback=self.callback_stats.wrap(self.audio_callback),
+            blocksize=self.block_size,
+            dtype='float32'
+        )
+        self.stream.start()
+
         # Create an image visual for the spectrogram
         self.image = scene.visuals.Image(
             self.data,
@@ -77,37 +94,50 @@ class SpectrogramCanvasWithScale(scene.SceneCanvas):
 
         self.show()
 
+    @traced("audio_callback")
     def audio_callback(self, indata, frames, time, status):
         """Audio callback function to capture real-time audio data."""
         if status:
             print(f"Audio stream status: {status}")
         self.audio_buffer = np.copy(indata[:, 0])  # Copy the audio data to the buffer
+        if self.zoom is not None:
+            self.zoom.push(self.audio_buffer)  # Every block must reach the zoom analyser exactly once
+
+    def set_frequency_range(self, freq_min, freq_max):
+        """Change the displayed band, retuning the zoom analyser if enabled (it switches on the audio thread)."""
+        self.freq_min = freq_min
+        self.freq_max = freq_max
+        if self.zoom is not None:
+            self.zoom.set_band(freq_min, freq_max)
 
+    @traced("update_spectrogram")
     def update_spectrogram(self, event):
         """Update the spectrogram with audio data."""
-        # Use real-time audio data
-        audio_data = self.audio_buffer
-
-        # Compute spectrogram
-        f, t, Sxx = spectrogram(audio_data, fs=self.sample_rate, nperseg=2<<12, noverlap=128)
-
-        # Convert to dB and normalize
-        Sxx = 10 * np.log10(Sxx + 1e-10)
-        Sxx = np.clip((Sxx - np.min(Sxx)) / (np.max(Sxx) - np.min(Sxx)), 0, 1)
+        if self.zoom is not None:
+            # Only the requested band, stretched over all rows of the image
+            power = self.zoom.spectrum()
+            rows = np.linspace(0, len(power) - 1, self.data.shape[0])
+            column = normalized_column(np.interp(rows, np.arange(len(power)), power)[:, np.newaxis])
+        else:
+            # Use real-time audio data
+            column = spectrogram_column(self.audio_buffer, self.sample_rate, **SETTINGS["spectogram"],
+                                        rows=self.data.shape[0])
 
         # Shift spectrogram data
         self.data[:, :-1] = self.data[:, 1:]  # Shift left
-        self.data[:Sxx.shape[0], -1] = Sxx.mean(axis=1)  # Add new column
-        if Sxx.shape[0] < self.data.shape[0]:  # Zero remaining rows if Sxx has fewer rows
-            self.data[Sxx.shape[0]:, -1] = 0
+        self.data[:len(column), -1] = column  # Add new column
+        if len(column) < self.data.shape[0]:  # Zero remaining rows if the column is shorter
+            self.data[len(column):, -1] = 0
 
         # Update texture with new data
-        self.image.set_data(self.data)
+        with span("image.set_data"):
+            self.image.set_data(self.data)
         self.update()
 
 class SliderWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, on_value_changed=None, freq_min=80, freq_max=8000):
         super().__init__()
+        self.on_value_changed = on_value_changed  # Called with (label_text, value)
         self.setWindowTitle("Slider Example")
         self.setGeometry(100, 100, 400, 300)
 
@@ -118,8 +148,8 @@ class SliderWindow(QMainWindow):
         central_widget.setLayout(layout)
 
         # Example sliders
-        self.create_slider(layout, "Frequency Min", 0, 1000, 80)
-        self.create_slider(layout, "Frequency Max", 1000, 8000, 8000)
+        self.create_slider(layout, "Frequency Min", 0, 1000, freq_min)
+        self.create_slider(layout, "Frequency Max", 1000, 8000, freq_max)
         self.create_slider(layout, "Gain", 0, 100, 50)
         self.create_slider(layout, "Time Window", 1, 10, 5)
 
@@ -144,6 +174,8 @@ class SliderWindow(QMainWindow):
         """Update the label and print the slider value."""
         label.setText(f"{label_text}: {value}")
         print(f"{label_text}: {value}")
+        if self.on_value_changed is not None:
+            self.on_value_changed(label_text, value)
 
 
 # Parameters
@@ -152,13 +184,29 @@ block_size = 2048  # Number of samples per block
 freq_min = 0  # Minimum frequency to display
 freq_max = 8000  # Maximum frequency to display
 time_window = 5  # Time window in seconds
+zoom = False  # Analyse only freq_min..freq_max with the zoom FFT
+replay_path = None  # Recording to replay instead of the input device (None = live input)
+replay_speed = 1.0  # Replay pacing: 1 = real time, N = N times faster, 0 = as fast as possible
+
+
+
+def main():
+    stream_factory = get_backend().input_stream
+    if replay_path is not None:
+        stream_factory = partial(FileInputStream, replay_path, speed=replay_speed)
+
+    app.use_app("pyqt6")  # The sliders share vispy's QApplication
+    canvas = SpectrogramCanvasWithScale(sample_rate, block_size, freq_min, freq_max, time_window, zoom=zoom, stream_factory=stream_factory)
+
+    def on_slider_changed(label_text, value):
+        band = {"Frequency Min": (value, canvas.freq_max), "Frequency Max": (canvas.freq_min, value)}.get(label_text)
+        if band is not None and band[0] < band[1]:  # Both sliders at 1000 Hz leave no band
+            canvas.set_frequency_range(*band)
 
-# Start the SpectrogramCanvas
-# slider_app = QApplication([])
-# window = SliderWindow()
-# window.show()
-# slider_app.exec()
+    window = SliderWindow(on_slider_changed, freq_min, freq_max)
+    window.show()
+    app.run()
 
 
-canvas = SpectrogramCanvasWithScale(sample_rate, block_size, freq_min, freq_max, time_window)
-app.run()
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,19 @@ import numpy as np
 from vispy import app, gloo
 from scipy.signal import spectrogram
 import matplotlib.cm as cm
-import sounddevice as sd
+from functools import partial
+import queue
 import time
 
-print(sd.query_devices())
-print(sd.default.device)
-
 import numpy.fft as fft
 
+from audio_backend import get_backend
+from callback_stats import CallbackStats
+from replay import FileInputStream
+from spectrogram_step import SETTINGS, spectrogram_column
+from trace_events import span, traced
+from tile_pyramid import TilePyramid
+
 
 
 
@@ -59,7 +64,7 @@ void main() {
 """
 
 class SpectrogramCanvas(app.Canvas):
-    def __init__(self, sample_rate, block_size, freq_min, freq_max, time_window):
+    def __init__(self, sample_rate, block_size, freq_min, freq_max, time_window, history_path=None, stream_factory=None):
         super().__init__(keys="interactive", size=(2560, 1440))
         self.sample_rate = sample_rate
         self.block_size = block_size
@@ -67,12 +72,16 @@ class SpectrogramCanvas(app.Canvas):
         self.freq_max = freq_max
         self.time_window = time_window
 
-        # Initialize sounddevice input stream
+        # Initialize the input stream (live device by default)
+        stream_factory = stream_factory or get_backend().input_stream
         self.audio_buffer = np.zeros(block_size, dtype=np.float32)  # Placeholder buffer
-        self.stream = sd.InputStream(
+        self.pending_blocks = queue.SimpleQueue()  # Blocks received since the last timer tick
+        self.callback_stats = CallbackStats("Input callback", self.sample_rate)
+        self.callback_stats.start_logging(log=print)
+        self.stream = stream_factory(
             samplerate=self.sample_rate,
             channels=1,
-            callback=self.audio_callback,
+            callback=self.callback_stats.wrap(self.audio_callback),
             blocksize=self.block_size,
             dtype='float32'
         )
@@ -82,6 +91,14 @@ class SpectrogramCanvas(app.Canvas):
         _, _, initial_Sxx = spectrogram(np.zeros(block_size), fs=sample_rate, nperseg=256, noverlap=128)
         self.data = np.zeros((initial_Sxx.shape[0], 1024), dtype=np.float32)  # Match spectrogram frequency bins
 
+        # Optional on-disk history of every column, browsable with tile_pyramid.view_history
+        self.history = None
+        if history_path is not None:
+            self.history = TilePyramid(
+                history_path, n_bins=self.data.shape[0], mode="w",
+                info={"sample_rate": sample_rate, "block_size": block_size}
+            )
+
         # Prepare texture for data
         self.texture = gloo.Texture2D(self.data, interpolation="linear")
 
@@ -111,48 +128,59 @@ class SpectrogramCanvas(app.Canvas):
         colormap_texture = gloo.Texture2D(colormap_data[np.newaxis, :, :], interpolation="linear")
         return colormap_texture
 
+    @traced("audio_callback")
     def audio_callback(self, indata, frames, time, status):
         """Audio callback function to capture real-time audio data."""
         if status:
             print(f"Audio stream status: {status}")
         self.audio_buffer = np.copy(indata[:, 0])  # Copy the audio data to the buffer
+        self.pending_blocks.put(self.audio_buffer)
 
+    @traced("update_spectrogram")
     def update_spectrogram(self, event):
         # start_time = time.perf_counter()  # Start timing
 
+        # The timer ticks far more often than blocks arrive; only a new block adds a column,
+        # so the display scrolls (and the history grows) by exactly one column per block
+        blocks = []
+        try:
+            while True:
+                blocks.append(self.pending_blocks.get_nowait())
+        except queue.Empty:
+            pass
+        if not blocks:
+            return
+
         # Use real-time audio data
         # audio_data = np.sin(2 * np.pi * 6000 * np.arange(block_size) / sample_rate)
-        audio_data = self.audio_buffer
         # print(f"Sampling rate: {self.stream.samplerate}")
         # fft_data = fft.rfft(audio_data)
         # freqs = fft.rfftfreq(len(audio_data), 1 / sample_rate)
         # max_freq = freqs[np.argmax(np.abs(fft_data))]
         # print(f"Maximum frequency in audio input: {max_freq} Hz")
 
-        # Compute spectrogram
-        f, t, Sxx = spectrogram(audio_data, fs=self.sample_rate, nperseg=1024, noverlap=512)
-
-        # Downsample spectrogram data for visualization
-        Sxx = Sxx[:min(self.data.shape[0], Sxx.shape[0]), :]  # Match number of rows
-
-        # Convert to dB and normalize
-        Sxx = 10 * np.log10(Sxx + 1e-10)
-        Sxx = np.clip((Sxx - np.min(Sxx)) / (np.max(Sxx) - np.min(Sxx)), 0, 1)
+        for audio_data in blocks:
+            # Compute the spectrogram column
+            column = spectrogram_column(audio_data, self.sample_rate, **SETTINGS["spectogram_gpu"], rows=self.data.shape[0])
 
-        # Shift spectrogram data
-        self.data[:, :-1] = self.data[:, 1:]  # Shift left
-        self.data[:Sxx.shape[0], -1] = Sxx.mean(axis=1)  # Add new column
-        if Sxx.shape[0] < self.data.shape[0]:  # Zero remaining rows if Sxx has fewer rows
-            self.data[Sxx.shape[0]:, -1] = 0
+            # Shift spectrogram data
+            self.data[:, :-1] = self.data[:, 1:]  # Shift left
+            self.data[:len(column), -1] = column  # Add new column
+            if len(column) < self.data.shape[0]:  # Zero remaining rows if the column is shorter
+                self.data[len(column):, -1] = 0
+            if self.history is not None:
+                self.history.append(self.data[:, -1])
 
         # Update texture with new data
-        self.texture.set_data(self.data)
+        with span("texture.set_data"):
+            self.texture.set_data(self.data)
         self.update()
 
         # Print frame processing time
         # frame_time = time.perf_counter() - start_time  # Measure elapsed time
         # print(f"VisPy frame time: {frame_time:.10f} seconds")
 
+    @traced("on_draw")
     def on_draw(self, event):
         gloo.clear()
         self.program.draw("triangle_strip")
@@ -160,6 +188,10 @@ class SpectrogramCanvas(app.Canvas):
     def on_resize(self, event):
         gloo.set_viewport(0, 0, *event.size)
 
+    def on_close(self, event):
+        if self.history is not None:
+            self.history.close()
+
 
 # Parameters
 sample_rate = 44100  # Sampling rate in Hz
@@ -167,7 +199,24 @@ block_size = 2048  # Number of samples per block
 freq_min = 80  # Minimum frequency to display
 freq_max = 44100  # Maximum frequency to display
 time_window = 5  # Time window in seconds
+history_path = None  # Directory for the on-disk spectrogram history (None = disabled)
+replay_path = None  # Recording to replay instead of the input device (None = live input)
+replay_speed = 1.0  # Replay pacing: 1 = real time, N = N times faster, 0 = as fast as possible
+
+
+def main():
+    # Device enumeration is slow; only do it when actually starting
+    print(get_backend().query_devices())
+    print(get_backend().default_device())
+
+    # Start the SpectrogramCanvas
+    stream_factory = get_backend().input_stream
+    if replay_path is not None:
+        stream_factory = partial(FileInputStream, replay_path, speed=replay_speed)
+
+    canvas = SpectrogramCanvas(sample_rate, block_size, freq_min, freq_max, time_window, history_path=history_path, stream_factory=stream_factory)
+    app.run()
+
 
-# Start the SpectrogramCanvas
-canvas = SpectrogramCanvas(sample_rate, block_size, freq_min, freq_max, time_window)
-app.run()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import numpy as np
-import sounddevice as sd
 from vispy import app, gloo
 import matplotlib.cm as cm
 import matplotlib
 
+from audio_backend import get_backend
+from callback_stats import CallbackStats
+
 # Enable DPI awareness for high-resolution displays
 import ctypes
 try:
@@ -51,11 +53,13 @@ class TimeFFTCanvas(app.Canvas):
         self.audio_buffer = np.zeros(block_size, dtype=np.float32)
 
         # Initialize sounddevice input stream
-        self.stream = sd.InputStream(
+        self.callback_stats = CallbackStats("Input callback", self.sample_rate)
+        self.callback_stats.start_logging(log=print)
+        self.stream = get_backend().input_stream(
             channels=1,
             samplerate=self.sample_rate,
             blocksize=self.block_size,
-            callback=self.audio_callback,
+            callback=self.callback_stats.wrap(self.audio_callback),
             dtype='float32'
         )
         self.stream.start()
@@ -166,6 +170,13 @@ class TimeFFTCanvas(app.Canvas):
 sample_rate = 44100  # Sampling rate in Hz
 block_size = 2048  # Number of samples per block
 
-# Start the visualization
-canvas = TimeFFTCanvas(sample_rate, block_size)
-app.run()
+
+def main():
+    # Start the visualization
+    canvas = TimeFFTCanvas(sample_rate, block_size)
+    app.run()
+
+
+if __name__ == "__main__":
+    main()
+
@@ -1,14 +1,19 @@
 from vispy import app, scene
 import numpy as np
-import sounddevice as sd
-from scipy.signal import spectrogram
+from functools import partial
+
+from audio_backend import get_backend
+from callback_stats import CallbackStats
+from replay import FileInputStream
+from spectrogram_step import SETTINGS, spectrogram_column
+from trace_events import span, traced
 
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QLabel, QSlider, QWidget
 from PyQt6.QtCore import Qt
 
 
 class SpectrogramCanvasWithScale(scene.SceneCanvas):
-    def __init__(self, sample_rate, block_size, freq_min, freq_max, time_window):
+    def __init__(self, sample_rate, block_size, freq_min, freq_max, time_window, stream_factory=None):
         super().__init__(keys="interactive", size=(2560, 1440))
 
         # Allow adding new attributes
@@ -20,12 +25,15 @@ class SpectrogramCanvasWithScale(scene.SceneCanvas):
         self.freq_max = freq_max
         self.time_window = time_window
 
-        # Initialize sounddevice input stream
+        # Initialize the input stream (live device by default)
+        stream_factory = stream_factory or get_backend().input_stream
         self.audio_buffer = np.zeros(block_size)  # Placeholder buffer
-        self.stream = sd.InputStream(
+        self.callback_stats = CallbackStats("Input callback", self.sample_rate)
+        self.callback_stats.start_logging(log=print)
+        self.stream = stream_factory(
             samplerate=self.sample_rate,
             channels=1,
-            callback=self.audio_callback,
+            callback=self.callback_stats.wrap(self.audio_callback),
             blocksize=self.block_size,
             # dtype='float32'
         )
@@ -75,33 +83,29 @@ class SpectrogramCanvasWithScale(scene.SceneCanvas):
 
         self.show()
 
+    @traced("audio_callback")
     def audio_callback(self, indata, frames, time, status):
         """Audio callback function to capture real-time audio data."""
         if status:
             print(f"Audio stream status: {status}")
         self.audio_buffer = np.copy(indata[:, 0])  # Copy the audio data to the buffer
 
+    @traced("update_spectrogram")
     def update_spectrogram(self, event):
         """Update the spectrogram with audio data."""
         # Use real-time audio data
-        audio_data = self.audio_buffer
-
-        # Compute spectrogram
-        f, t, Sxx = spectrogram(audio_data, fs=self.sample_rate, nperseg=2048, noverlap=1024)
-
-        # Convert to dB and normalize
-        Sxx = 20 * np.log10(Sxx + 1e-10)
-        Sxx = np.clip((Sxx - np.min(Sxx)) / (np.max(Sxx) - np.min(Sxx)), 0, 1)
+        column = spectrogram_column(self.audio_buffer, self.sample_rate, **SETTINGS["spectogram_larger_axis"],
+                                    rows=self.data.shape[0])
 
         # Shift spectrogram data
         self.data[:, :-1] = self.data[:, 1:]  # Shift left
-        self.data[:Sxx.shape[0], -1] = Sxx.mean(axis=1)  # Add new column
-        # self.data[:Sxx.shape[0], -1] = Sxx.mean(axis=1)  # Add new column
-        if Sxx.shape[0] < self.data.shape[0]:  # Zero remaining rows if Sxx has fewer rows
-            self.data[Sxx.shape[0]:, -1] = 0
+        self.data[:len(column), -1] = column  # Add new column
+        if len(column) < self.data.shape[0]:  # Zero remaining rows if the column is shorter
+            self.data[len(column):, -1] = 0
 
         # Update texture with new data
-        self.image.set_data(self.data)
+        with span("image.set_data"):
+            self.image.set_data(self.data)
         self.update()
 
 
@@ -111,6 +115,8 @@ block_size = 2048  # Number of samples per block
 freq_min = 0  # Minimum frequency to display
 freq_max = 8000  # Maximum frequency to display
 time_window = 5  # Time window in seconds
+replay_path = None  # Recording to replay instead of the input device (None = live input)
+replay_speed = 1.0  # Replay pacing: 1 = real time, N = N times faster, 0 = as fast as possible
 
 # Start the SpectrogramCanvas
 # slider_app = QApplication([])
@@ -119,5 +125,14 @@ time_window = 5  # Time window in seconds
 # slider_app.exec()
 
 
-canvas = SpectrogramCanvasWithScale(sample_rate, block_size, freq_min, freq_max, time_window)
-app.run()
+def main():
+    stream_factory = get_backend().input_stream
+    if replay_path is not None:
+        stream_factory = partial(FileInputStream, replay_path, speed=replay_speed)
+
+    canvas = SpectrogramCanvasWithScale(sample_rate, block_size, freq_min, freq_max, time_window, stream_factory=stream_factory)
+    app.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import numpy as np
+
+# Spectrogram settings of each vispy analyzer's update_spectrogram; replay.py and
+# benchmark.py measure the same step with the same settings
+SETTINGS = {
+    "spectogram": {"nperseg": 2 << 12, "noverlap": 128, "db_scale": 10},
+    "spectogram_gpu": {"nperseg": 1024, "noverlap": 512, "db_scale": 10},
+    "spectogram_larger_axis": {"nperseg": 2048, "noverlap": 1024, "db_scale": 20},
+}
+
+
+def normalized_column(Sxx, db_scale=10):
+    """
+    Convert a (frequencies, segments) power spectrogram to one display column.
+
+    Returns:
+        The dB values scaled to [0, 1] and averaged over the segments.
+    """
+    Sxx = db_scale * np.log10(Sxx + 1e-10)
+    Sxx = np.clip((Sxx - np.min(Sxx)) / (np.max(Sxx) - np.min(Sxx)), 0, 1)
+    return Sxx.mean(axis=1)
+
+
+def spectrogram_column(audio, sample_rate, nperseg, noverlap, db_scale=10, rows=None):
+    """
+    Spectrogram of one audio block reduced to one display column.
+
+    Args:
+        audio: Mono block of samples.
+        sample_rate: Sampling rate in Hz.
+        nperseg, noverlap: Segment length and overlap passed to `scipy.signal.spectrogram`.
+        db_scale: 10 for power dB, 20 as some scripts use.
+        rows: Keep only the lowest `rows` frequencies (the height of the image), or None.
+    """
+    from scipy.signal import spectrogram
+
+    _, _, Sxx = spectrogram(audio, fs=sample_rate, nperseg=nperseg, noverlap=noverlap)
+    if rows is not None:
+        Sxx = Sxx[:rows]
+    return normalized_column(Sxx, db_scale)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPTS = (
+    "wave_gen",
+    "sound_generation_test",
+    "spectogam_matplotlib",
+    "spectogram",
+    "spectogram_gpu",
+    "spectogram_larger_axis",
+    "spectogram_gpu_plus_fft",
+    "animation_test_qt",
+)
+BUDGET_PATH = "startup_budget.json"
+REPEATS = 3                      # Import measurements per module; the median is reported
+FIRST_BLOCK_TIMEOUT = 30         # Seconds to wait for a script's first audio block
+
+# Runs a script as __main__ on a free-running virtual backend and reports the
+# wall-clock time right after its first audio callback returns, then exits.
+_FIRST_BLOCK_BOOTSTRAP = """
+import os, runpy, sys, time
+import audio_backend
+
+class FirstBlockBackend(audio_backend.VirtualBackend):
+    def _open(self, kind, kwargs):
+        callback = kwargs.get("callback")
+        def first_block(*args):
+            callback(*args)
+            print(f"FIRST_BLOCK {time.time()!r}", flush=True)
+            os._exit(0)
+        kwargs["callback"] = first_block
+        return super()._open(kind, kwargs)
+
+audio_backend.set_backend(FirstBlockBackend(speed=0))
+sys.argv = [sys.argv[1]]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def _environment(backend="virtual"):
+    # backend=None leaves the default (sounddevice) backend selected
+    env = dict(os.environ)
+    env.pop("WAVE_GEN_AUDIO_BACKEND", None)
+    if backend is not None:
+        env["WAVE_GEN_AUDIO_BACKEND"] = backend
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def import_time_ms(module, repeats=REPEATS, backend="virtual"):
+    """
+    Cumulative import time of `module` as reported by `python -X importtime`.
+
+    Args:
+        module: Module to import.
+        repeats: Timed runs.
+        backend: Audio backend selected while importing (None = the default, sounddevice).
+
+    Returns:
+        (milliseconds, imports_sounddevice): the median over `repeats` runs (after one
+        warm-up run that writes the bytecode caches), or None if the import fails, and
+        whether the import loaded sounddevice (which starts PortAudio and enumerates devices).
+    """
+    times = []
+    imports_sounddevice = False
+    for i in range(repeats + 1):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=_environment(backend),
+        )
+        if result.returncode != 0:
+            return None, False
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"; top-level entries are not indented
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == "sounddevice":
+                imports_sounddevice = True
+            if len(parts) == 3 and parts[2].rstrip() == f" {module}":
+                if i > 0:
+                    times.append(int(parts[1]) / 1000)
+                break
+    return (statistics.median(times) if times else None), imports_sounddevice
+
+
+def first_block_ms(script, timeout=FIRST_BLOCK_TIMEOUT):
+    """
+    Time from launching `script` to the end of its first audio callback.
+
+    Returns:
+        (milliseconds, None) on success, or (None, reason) if no block was produced.
+    """
+    start = time.time()
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", _FIRST_BLOCK_BOOTSTRAP, f"{script}.py"],
+            capture_output=True, text=True, env=_environment(), timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return None, f"no audio block within {timeout} s"
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_BLOCK "):
+            return (float(line.split()[1]) - start) * 1000, None
+    errors = result.stderr.strip().splitlines()
+    return None, errors[-1] if errors else f"exited with code {result.returncode}"
+
+
+def check(results, budget):
+    """
+    Compare measurements with the budget.
+
+    Returns:
+        List of (metric, script, measured_ms, budget_ms) for every measurement over budget.
+    """
+    violations = []
+    for metric, limits in budget.items():
+        for script, limit in limits.items():
+            measured = results.get(metric, {}).get(script)
+            if measured is not None and measured > limit:
+                violations.append((metric, script, measured, limit))
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first audio block of each entry point.")
+    parser.add_argument("scripts", nargs="*", default=list(SCRIPTS))
+    parser.add_argument("--budget", default=BUDGET_PATH, help="JSON file with millisecond limits per script")
+    parser.add_argument("-o", "--output", default=None, help="Also write the measurements as JSON")
+    args = parser.parse_args()
+
+    # The default-backend import catches anything that starts PortAudio at import time,
+    # which the virtual backend used for the other measurements would hide
+    results = {"import_ms": {}, "import_default_backend_ms": {}, "first_block_ms": {}}
+    loads_sounddevice = []
+    print(f"{'script':28s} {'import':>10s} {'default backend':>16s} {'first block':>12s}")
+    for script in args.scripts:
+        imported, _ = import_time_ms(script)
+        imported_default, imports_sounddevice = import_time_ms(script, backend=None)
+        first_block, reason = first_block_ms(script)
+        if imported is not None:
+            results["import_ms"][script] = imported
+        if imported_default is not None:
+            results["import_default_backend_ms"][script] = imported_default
+        if imports_sounddevice:
+            loads_sounddevice.append(script)
+        if first_block is not None:
+            results["first_block_ms"][script] = first_block
+        imported_text = f"{imported:8.1f} ms" if imported is not None else "    failed"
+        default_text = f"{imported_default:8.1f} ms" if imported_default is not None else "    failed"
+        if imports_sounddevice:
+            default_text += " (sounddevice)"
+        first_block_text = f"{first_block:9.1f} ms" if first_block is not None else f"  skipped: {reason}"
+        print(f"{script:28s} {imported_text:>10s} {default_text:>16s} {first_block_text}")
+    results["imports_sounddevice"] = loads_sounddevice
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if os.path.exists(args.budget):
+        with open(args.budget) as f:
+            budget = json.load(f)
+        violations = check(results, budget)
+        for metric, script, measured, limit in violations:
+            print(f"OVER BUDGET: {script} {metric} {measured:.1f} ms > {limit} ms")
+        # Importing a script must never enumerate devices, whatever the import costs on this machine
+        for script in loads_sounddevice:
+            print(f"OVER BUDGET: importing {script} loads sounddevice (starts PortAudio)")
+        count = len(violations) + len(loads_sounddevice)
+        print(f"{count} startup budget violation(s)")
+        sys.exit(1 if count else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import logging
+
+import numpy as np
+
+WAVETABLE_SIZE = 4096  # Samples per cycle in a compiled wavetable
+MIP_LEVELS = int(np.log2(WAVETABLE_SIZE // 2))  # Band-limited copies of a wavetable, one octave apart; the last is a sine
+
+
+def build_interpolator(waveform_vertices, interpolation_type):
+    """
+    Build the single-cycle interpolator for a list of (x, y) vertices.
+
+    Duplicate x values keep their last y, the vertices are sorted by x and the
+    last y is forced to the first so the cycle loops without a jump.
+
+    Args:
+        waveform_vertices: Iterable of (x, y) pairs with x in [0, 1].
+        interpolation_type: "linear", "cubic", "nearest" or "smooth".
+
+    Returns:
+        A callable mapping phase values in [0, 1) to samples.
+    """
+    # scipy.interpolate takes longer to import than everything else in the editor together
+    from scipy.interpolate import interp1d, make_interp_spline
+
+    x_points, y_points = zip(*waveform_vertices)
+
+    # Remove duplicates by creating a dictionary (keeps last occurrence of each x value)
+    unique_points = dict(zip(x_points, y_points))
+    x_points, y_points = zip(*sorted(unique_points.items()))
+
+    y_points = list(y_points)
+    y_points[-1] = y_points[0]  # Ensure continuity by matching endpoints
+
+    # Choose interpolation type based on the number of unique vertices
+    try:
+        if interpolation_type == "smooth":
+            return make_interp_spline(x_points, y_points, k=min(3, len(x_points)-1))
+        elif len(x_points) <= 4:
+            return interp1d(x_points, y_points, kind="linear", fill_value="extrapolate")
+        else:
+            return interp1d(x_points, y_points, kind=interpolation_type, fill_value="extrapolate")
+    except ValueError as e:
+        logging.error(f"Interpolation failed: {e}. Falling back to linear interpolation.")
+        return interp1d(x_points, y_points, kind="linear", fill_value="extrapolate")
+
+
+def compile_wavetable(waveform_vertices, interpolation_type, size=WAVETABLE_SIZE):
+    """
+    Sample one cycle of the interpolated waveform into a lookup table.
+
+    Compile once per edit; the audio callback then only reads the table
+    (`render_wavetable`) instead of building an interpolator every block.
+
+    Returns:
+        Array of `size + 1` samples clipped to [-1, 1]; the extra sample repeats
+        the first so reads can interpolate across the end of the cycle.
+    """
+    interpolator = build_interpolator(waveform_vertices, interpolation_type)
+    table = np.empty(size + 1)
+    table[:size] = np.clip(interpolator(np.arange(size) / size), -1, 1)
+    table[size] = table[0]
+    return table
+
+
+def compile_mip_levels(table, levels=MIP_LEVELS):
+    """
+    Band-limit a compiled wavetable into one table per octave.
+
+    Level k keeps the harmonics up to (size / 2) >> k, so playing a high note
+    from a higher level does not alias; the last level keeps only the
+    fundamental, so notes above every level's range still do not alias. All
+    levels keep the full table length and are clipped to [-1, 1] like the
+    table (band-limiting overshoots at jumps).
+
+    Returns:
+        Array of shape (levels, size + 1) in the layout of `compile_wavetable`.
+    """
+    size = len(table) - 1
+    spectrum = np.fft.rfft(table[:size])
+    # One batched inverse FFT over a (levels, bins) spectrum with the upper harmonics zeroed
+    limits = np.maximum(1, (size // 2) >> np.arange(levels))
+    limits[-1] = 1
+    limited = np.where(np.arange(len(spectrum)) <= limits[:, np.newaxis], spectrum, 0)
+    mips = np.empty((levels, size + 1))
+    mips[:, :size] = np.fft.irfft(limited, size, axis=1)
+    np.clip(mips, -1, 1, out=mips)
+    mips[:, size] = mips[:, 0]
+    return mips
+
+
+def mip_level(levels, phase_increment, size=WAVETABLE_SIZE):
+    """
+    Pick the most detailed mip level whose harmonics stay below Nyquist.
+
+    Args:
+        levels: Number of mip levels available.
+        phase_increment: Cycles per sample (frequency / sample rate).
+        size: Samples per cycle of the level 0 table.
+    """
+    size_increment = size * phase_increment
+    if size_increment <= 1:
+        return 0
+    return min(levels - 1, int(np.ceil(np.log2(size_increment))))
+
+
+def render_wavetable(table, frames, phase, phase_increment):
+    """
+    Render `frames` samples from a compiled wavetable with linear interpolation.
+
+    Returns:
+        (waveform, phase) with the phase where the block ends.
+    """
+    size = len(table) - 1
+    position = ((np.arange(frames) * phase_increment + phase) % 1) * size
+    index = position.astype(np.intp)
+    fraction = position - index
+    waveform = table[index] + fraction * (table[index + 1] - table[index])
+
+    # The phase to continue from in the next buffer
+    return waveform, (phase + frames * phase_increment) % 1
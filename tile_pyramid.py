@@ -0,0 +1,221 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+META_FILE = "meta.json"
+LEVEL_FILE = "level_{}.dat"
+
+
+class TilePyramid:
+    """
+    On-disk level-of-detail store for spectrogram columns.
+
+    Level 0 holds every column at full resolution; level k holds one column per
+    2**k input columns (the element-wise maximum, so short events stay visible).
+    Each level is a flat file of fixed-size tiles written sequentially. Only the
+    newest partial tile of each level is kept in RAM, and reads memory-map just
+    the rows that cover the requested range. The metadata is replaced
+    atomically whenever tiles are written, so after a crash the pyramid still
+    opens with every tile that reached the disk.
+    """
+    def __init__(self, path, n_bins=None, tile_columns=256, levels=12, dtype=np.float16, info=None, mode="r"):
+        """
+        Args:
+            path: Directory holding the pyramid.
+            n_bins: Number of frequency bins per column (required when creating).
+            tile_columns: Columns per tile; tiles are the unit of disk writes.
+            levels: Number of levels including full resolution.
+            dtype: Storage dtype for the column values.
+            info: Extra metadata (e.g. sample rate, hop) stored alongside.
+            mode: "w" to create a new pyramid, "r" to open one for reading.
+        """
+        self.path = path
+        self.mode = mode
+        if mode == "w":
+            if n_bins is None:
+                raise ValueError("n_bins is required when creating a pyramid")
+            os.makedirs(path, exist_ok=True)
+            self.n_bins = n_bins
+            self.tile_columns = tile_columns
+            self.levels = levels
+            self.dtype = np.dtype(dtype)
+            self.info = info or {}
+            self.columns = [0] * levels
+            for level in range(levels):
+                open(self._level_path(level), "wb").close()
+            self._write_meta(self.columns)
+        elif mode == "r":
+            with open(os.path.join(path, META_FILE)) as f:
+                meta = json.load(f)
+            self.n_bins = meta["n_bins"]
+            self.tile_columns = meta["tile_columns"]
+            self.levels = meta["levels"]
+            self.dtype = np.dtype(meta["dtype"])
+            self.info = meta["info"]
+            self.columns = meta["columns"]
+        else:
+            raise ValueError(f"Unsupported mode: {mode}")
+
+        # Newest, not yet written, tile of each level and the odd column awaiting its pair
+        self._tiles = [np.zeros((self.tile_columns, self.n_bins), dtype=self.dtype) for _ in range(self.levels)]
+        self._flushed = list(self.columns)
+        self._carry = [None] * self.levels
+
+    def _level_path(self, level):
+        return os.path.join(self.path, LEVEL_FILE.format(level))
+
+    def append(self, columns):
+        """Append one column (n_bins,) or several (count, n_bins) at full resolution."""
+        if self.mode != "w":
+            raise RuntimeError("Pyramid is opened read-only")
+        columns = np.atleast_2d(np.asarray(columns, dtype=self.dtype))
+        flushed = list(self._flushed)
+        self._append(0, columns)
+        if self._flushed != flushed:
+            self._write_meta(self._flushed)
+
+    def _append(self, level, columns):
+        # Store the columns at this level, writing out every tile that fills up
+        offset = 0
+        while offset < len(columns):
+            filled = self.columns[level] - self._flushed[level]
+            count = min(self.tile_columns - filled, len(columns) - offset)
+            self._tiles[level][filled:filled + count] = columns[offset:offset + count]
+            self.columns[level] += count
+            offset += count
+            if filled + count == self.tile_columns:
+                self._write_tile(level, self.tile_columns)
+
+        # Reduce pairs of columns into the next level
+        if level + 1 >= self.levels:
+            return
+        if self._carry[level] is not None:
+            columns = np.concatenate((self._carry[level], columns))
+        paired = len(columns) // 2 * 2
+        self._carry[level] = columns[paired:] if paired < len(columns) else None
+        if paired:
+            reduced = np.maximum(columns[0:paired:2], columns[1:paired:2])
+            self._append(level + 1, reduced)
+
+    def _write_tile(self, level, rows):
+        with open(self._level_path(level), "ab") as f:
+            f.write(self._tiles[level][:rows].tobytes())
+        self._flushed[level] += rows
+
+    def _write_meta(self, columns):
+        # Replace the metadata atomically; `columns` must only count columns already on disk
+        meta = {
+            "n_bins": self.n_bins,
+            "tile_columns": self.tile_columns,
+            "levels": self.levels,
+            "dtype": self.dtype.str,
+            "info": self.info,
+            "columns": list(columns),
+        }
+        temp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, os.path.join(self.path, META_FILE))
+
+    def read(self, level, start, stop):
+        """
+        Read columns [start, stop) of a level.
+
+        Returns:
+            Array of shape (stop - start, n_bins); only the covered rows are read from disk.
+        """
+        start = max(0, start)
+        stop = min(stop, self.columns[level])
+        if stop <= start:
+            return np.zeros((0, self.n_bins), dtype=self.dtype)
+
+        flushed = self._flushed[level]
+        parts = []
+        if start < flushed:
+            disk_stop = min(stop, flushed)
+            parts.append(np.memmap(
+                self._level_path(level),
+                dtype=self.dtype,
+                mode="r",
+                offset=start * self.n_bins * self.dtype.itemsize,
+                shape=(disk_stop - start, self.n_bins),
+            ))
+        if stop > flushed:
+            parts.append(self._tiles[level][max(start, flushed) - flushed:stop - flushed])
+        return np.concatenate(parts) if len(parts) > 1 else np.array(parts[0])
+
+    def viewport(self, start, stop, max_columns):
+        """
+        Read the full-resolution range [start, stop) at the coarsest level that still
+        provides at least `max_columns` columns (or level 0 if the range is narrower).
+
+        Returns:
+            (level, data) where each data column spans 2**level full-resolution columns.
+        """
+        span = max(1, stop - start)
+        level = 0
+        while level + 1 < self.levels and span >> (level + 1) >= max_columns:
+            level += 1
+        scale = 1 << level
+        return level, self.read(level, start // scale, -(-stop // scale))
+
+    def close(self):
+        """Write the partial tiles and the metadata to disk."""
+        if self.mode != "w":
+            return
+        # An odd last column has no pair: it becomes a partial column of the next level on its own
+        for level in range(self.levels - 1):
+            if self._carry[level] is not None:
+                carry, self._carry[level] = self._carry[level], None
+                self._append(level + 1, carry)
+        for level in range(self.levels):
+            pending = self.columns[level] - self._flushed[level]
+            if pending:
+                self._write_tile(level, pending)
+        self._write_meta(self.columns)
+        self.mode = "r"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def view_history(path, max_columns=2048):
+    """Browse a recorded pyramid; panning and zooming load only the visible range."""
+    import matplotlib.pyplot as plt
+
+    pyramid = TilePyramid(path)
+    total = pyramid.columns[0]
+    level, data = pyramid.viewport(0, total, max_columns)
+
+    fig, ax = plt.subplots(figsize=(12, 5))
+    image = ax.imshow(
+        data.T.astype(np.float32), aspect="auto", origin="lower", cmap="viridis",
+        vmin=0, vmax=1, extent=(0, total, 0, pyramid.n_bins)
+    )
+    ax.set_xlabel("Column")
+    ax.set_ylabel("Frequency bin")
+    ax.set_autoscale_on(False)  # set_extent must not feed back into the limits
+
+    def on_xlim_changed(axes):
+        start, stop = (int(v) for v in axes.get_xlim())
+        start, stop = max(0, start), min(total, stop)
+        level, data = pyramid.viewport(start, stop, max_columns)
+        if len(data) == 0:
+            return
+        scale = 1 << level
+        image.set_data(data.T.astype(np.float32))
+        image.set_extent((start // scale * scale, start // scale * scale + len(data) * scale, 0, pyramid.n_bins))
+        ax.set_title(f"Level {level} ({scale}x)")
+
+    ax.callbacks.connect("xlim_changed", on_xlim_changed)
+    on_xlim_changed(ax)
+    plt.show()
+
+
+if __name__ == "__main__":
+    view_history(sys.argv[1])
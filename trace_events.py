@@ -0,0 +1,130 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+TRACE_ENV = "WAVE_GEN_TRACE"     # Output file; tracing is enabled when set
+BUFFER_EVENTS = 1 << 16          # Spans kept per thread (oldest are overwritten)
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _ThreadBuffer:
+    """Preallocated ring of spans written by a single thread only, so no locking is needed."""
+    def __init__(self, capacity):
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.names = np.zeros(capacity, dtype=np.int32)
+        self.begins = np.zeros(capacity, dtype=np.int64)
+        self.ends = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    def add(self, name_id, begin, end):
+        index = self.count % len(self.names)
+        self.names[index] = name_id
+        self.begins[index] = begin
+        self.ends[index] = end
+        self.count += 1
+
+
+class _Span:
+    __slots__ = ("tracer", "name_id", "begin")
+
+    def __init__(self, tracer, name_id):
+        self.tracer = tracer
+        self.name_id = name_id
+
+    def __enter__(self):
+        self.begin = time.perf_counter_ns()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer._buffer().add(self.name_id, self.begin, time.perf_counter_ns())
+
+
+class Tracer:
+    """
+    Opt-in recorder of begin/end spans, exported as Chrome trace-event JSON.
+
+    Each thread appends to its own preallocated buffer, so the audio callback
+    never contends with the GUI thread. When disabled, `span()` returns a shared
+    no-op context manager and `traced` leaves functions undecorated.
+    """
+    def __init__(self, enabled=False, capacity=BUFFER_EVENTS):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.names = {}
+        self.buffers = []
+        self._local = threading.local()
+        self.origin = time.perf_counter_ns()
+
+    def _buffer(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = _ThreadBuffer(self.capacity)
+            self.buffers.append(buffer)
+        return buffer
+
+    def _name_id(self, name):
+        name_id = self.names.get(name)
+        if name_id is None:
+            name_id = self.names.setdefault(name, len(self.names))
+        return name_id
+
+    def span(self, name):
+        """Context manager recording one span on the calling thread."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self._name_id(name))
+
+    def traced(self, name=None):
+        """Decorator recording a span per call; returns the function untouched when disabled."""
+        def decorate(func):
+            if not self.enabled:
+                return func
+            name_id = self._name_id(name or func.__qualname__)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(self, name_id):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def events(self):
+        """Recorded spans as Chrome trace events (complete "X" events plus thread names)."""
+        names = {name_id: name for name, name_id in self.names.items()}
+        pid = os.getpid()
+        events = []
+        for buffer in list(self.buffers):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": buffer.thread_id,
+                           "args": {"name": buffer.thread_name}})
+            count = min(buffer.count, len(buffer.names))
+            for i in range(count):
+                begin = int(buffer.begins[i])
+                events.append({
+                    "name": names[int(buffer.names[i])],
+                    "ph": "X",
+                    "pid": pid,
+                    "tid": buffer.thread_id,
+                    "ts": (begin - self.origin) / 1000,
+                    "dur": (int(buffer.ends[i]) - begin) / 1000,
+                })
+        return events
+
+    def dump(self, path):
+        """Write the trace; open it in chrome://tracing or ui.perfetto.dev."""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+
+
+tracer = Tracer(enabled=bool(os.environ.get(TRACE_ENV)))
+span = tracer.span
+traced = tracer.traced
+
+if tracer.enabled:
+    atexit.register(tracer.dump, os.environ[TRACE_ENV])
@@ -1,5 +1,3 @@
-import sounddevice
-
 # noqa
 # noinspection ALL
 
@@ -27,17 +25,23 @@ Navigation:          Navigate Back/Forward: Ctrl + Alt + ← / →
 
 #  pip install PyQt5 wxPython dearpygui pywebio prompt_toolkit
 
-def tkinter_list(items, values):
+def tkinter_list(items, values, updates=None, poll_ms=100, on_shown=None):
     """
     Display a Tkinter list selection window and return the selected value.
 
     Args:
         items: List of strings to display in the Listbox.
         values: List of corresponding values to return when an item is selected.
+        updates: Optional queue.Queue of (items, values) pairs replacing the list while
+            the window is open, e.g. from a background device enumeration.
+        poll_ms: Interval at which `updates` is checked.
+        on_shown: Optional callable run once the window is up, e.g. to start that enumeration
+            only after the first window has been drawn.
 
     Returns:
         The value corresponding to the selected item, or None if no selection is made.
     """
+    import queue
     import tkinter as tk
 
     selected_value = None  # Variable to store the selected value
@@ -49,17 +53,36 @@ def tkinter_list(items, values):
             selected_value = values[selected_index[0]]  # Map index to the actual value
         root.destroy()  # Close the window after selection
 
+    def fill(new_items):
+        # Keep the selected item selected if it is still in the list
+        selected_index = listbox.curselection()
+        selected_item = listbox.get(selected_index[0]) if selected_index else None
+        listbox.delete(0, tk.END)
+        for item in new_items:
+            listbox.insert(tk.END, item)
+        if selected_item in new_items:
+            listbox.selection_set(new_items.index(selected_item))
+        listbox.config(width=max((len(item) for item in new_items), default=18) + 2)
+
+    def poll_updates():
+        nonlocal items, values
+        latest = None
+        try:
+            while True:
+                latest = updates.get_nowait()  # Only the latest update matters
+        except queue.Empty:
+            pass
+        if latest is not None:
+            items, values = latest
+            fill(items)
+        root.after(poll_ms, poll_updates)
+
     root = tk.Tk()
     root.title("Select an Item")
 
-    # Dynamically calculate the width to fit the longest item
-    max_length = max(len(item) for item in items)
-    listbox_width = max_length + 2
-
-    # Create a Listbox with the calculated width
-    listbox = tk.Listbox(root, selectmode=tk.SINGLE, width=listbox_width)
-    for item in items:
-        listbox.insert(tk.END, item)
+    # Create a Listbox sized to fit the longest item
+    listbox = tk.Listbox(root, selectmode=tk.SINGLE, exportselection=False)
+    fill(items)
 
     listbox.pack(fill=tk.BOTH, expand=True)
 
@@ -67,6 +90,11 @@ def tkinter_list(items, values):
     button = tk.Button(root, text="Select", command=on_select)
     button.pack()
 
+    if updates is not None:
+        root.after(poll_ms, poll_updates)
+    if on_shown is not None:
+        root.after_idle(on_shown)  # Idle callbacks run after the window has been mapped and drawn
+
     root.mainloop()
 
     return selected_value  # Return the selected value after the window is closed
@@ -289,15 +317,9 @@ items = ["Item 1", "Item 2", "Item 3", "Item 4", "Item 5"]
 # pywebio_list(items)          # Opens in a web browser; suitable for lightweight web-based GUIs without HTML/CSS/JS knowledge. Designed to keep server open forever!
 # prompt_toolkit_list(items)   # Must run in cmd/terminal; creates a DOS-style interactive prompt, ideal for CLI applications.
 
-import inspect
-from pprint import pprint
-
-from pprint import pprint
-
-# Example with a sounddevice list
-import sounddevice as sd
-
-devices = sd.query_devices()
+# Example with a sounddevice list (query devices on demand, not at import):
+# import sounddevice as sd
+# devices = sd.query_devices()
 
 # Explore the list of sound devices
 #explore(devices)
@@ -404,8 +426,6 @@ def explore(obj, depth=1, indent=0, max_items=None):
 
 
 #
-import numpy as np
-import sounddevice as sd
 # dl = sounddevice.query_devices()
 # device_names = [device['name'] for device in dl]
 # device_values = dl  # Full device information
@@ -0,0 +1,115 @@
+import collections
+
+import numpy as np
+
+# One edit: kind is "insert", "move", "remove" or "reset"; old/new are (x, y)
+# pairs (None where not applicable), or (x array, y array) pairs for "reset"
+VertexChange = collections.namedtuple("VertexChange", "kind index old new")
+
+
+class VertexModel:
+    """
+    Waveform vertices kept as two NumPy arrays sorted by x.
+
+    Insertion finds its slot with a binary search instead of re-sorting, and
+    hit-testing measures the distance to every vertex in one vectorized call,
+    so editing stays responsive with thousands of points. Every edit is passed
+    to the listeners as a `VertexChange`, e.g. to recompile the wavetable once.
+    Iterating yields (x, y) tuples, so the model can stand in for a vertex list.
+    """
+    def __init__(self, vertices=()):
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.listeners = []
+        self.version = 0  # Incremented on every change
+        self._assign(vertices)
+
+    def _assign(self, vertices):
+        points = np.asarray(list(vertices), dtype=np.float64).reshape(-1, 2)
+        order = np.argsort(points[:, 0], kind="stable")
+        self.x = points[order, 0].copy()
+        self.y = points[order, 1].copy()
+
+    def __len__(self):
+        return len(self.x)
+
+    def __iter__(self):
+        return zip(self.x.tolist(), self.y.tolist())
+
+    def __getitem__(self, index):
+        return float(self.x[index]), float(self.y[index])
+
+    def add_listener(self, listener):
+        """Call `listener(change)` after every edit."""
+        self.listeners.append(listener)
+
+    def _notify(self, change):
+        self.version += 1
+        for listener in list(self.listeners):
+            listener(change)
+
+    def insert(self, x, y):
+        """
+        Insert a vertex, keeping the arrays sorted by x.
+
+        Returns:
+            Index of the new vertex.
+        """
+        index = int(np.searchsorted(self.x, x, side="right"))
+        self.x = np.insert(self.x, index, x)
+        self.y = np.insert(self.y, index, y)
+        self._notify(VertexChange("insert", index, None, (x, y)))
+        return index
+
+    def move(self, index, x, y):
+        """Move a vertex; the caller keeps x between its neighbours."""
+        old = self[index]
+        self.x[index] = x
+        self.y[index] = y
+        self._notify(VertexChange("move", index, old, (x, y)))
+
+    def remove(self, index):
+        old = self[index]
+        self.x = np.delete(self.x, index)
+        self.y = np.delete(self.y, index)
+        self._notify(VertexChange("remove", index, old, None))
+
+    def reset(self, vertices):
+        """Replace every vertex, e.g. with a preset."""
+        old = (self.x, self.y)
+        self._assign(vertices)
+        self._notify(VertexChange("reset", None, old, (self.x.copy(), self.y.copy())))
+
+    def splice(self, x_min, x_max, vertices):
+        """
+        Replace the interior vertices with x_min < x < x_max by `vertices` (one change).
+
+        The first and last vertex are always kept, as are vertices outside the range.
+        """
+        old = (self.x, self.y)
+        inside = (self.x > x_min) & (self.x < x_max)
+        inside[0] = inside[-1] = False
+        points = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        points = points[(points[:, 0] > self.x[0]) & (points[:, 0] < self.x[-1])]
+        self._assign(np.concatenate((np.column_stack((self.x[~inside], self.y[~inside])), points)))
+        self._notify(VertexChange("reset", None, old, (self.x.copy(), self.y.copy())))
+
+    def nearest(self, px, py, transform, radius):
+        """
+        Find the vertex closest to a point in screen space.
+
+        Args:
+            px, py: Point in display coordinates (e.g. a Matplotlib event's x and y).
+            transform: Maps an (N, 2) array of vertices to display coordinates
+                (e.g. `ax.transData.transform`).
+            radius: Maximum distance in display units.
+
+        Returns:
+            Index of the nearest vertex within `radius`, or None.
+        """
+        if len(self.x) == 0:
+            return None
+        screen = transform(np.column_stack((self.x, self.y)))
+        distances = (screen[:, 0] - px) ** 2 + (screen[:, 1] - py) ** 2
+        index = int(np.argmin(distances))
+        return index if distances[index] <= radius ** 2 else None
@@ -1,130 +1,209 @@
 import numpy as np
-import sounddevice as sd
 import tkinter as tk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d, make_interp_spline
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from audio_backend import get_backend
+from blitting import BlitManager
+from callback_stats import CallbackStats
+from convolution_reverb import ConvolutionReverb, load_ir, synthetic_ir
+from curve_simplify import StreamingSimplifier, rdp
+from edit_history import EditHistory
+from filters import DEFAULT_Q, FILTER_TYPES, BiquadFilter
+from limiter import LookaheadLimiter
+from redraw_scheduler import TkRedrawScheduler
+from resampler import StreamingResampler
+from patch_format import Patch, compile_patch, open_library
+from synth import MIP_LEVELS, compile_mip_levels, compile_wavetable, mip_level, render_wavetable
+from vertex_model import VertexModel
+from waveform_import import import_waveform
+import metrics
+from trace_events import span, traced
 
 # Global variables to store frequency, volume, and sample rate
 frequency = 440
 volume = 0.5
 sample_rate = 44100
-waveform_vertices = [(0, 0), (0.5, 1), (1, 0)]  # Initial sine-like waveform vertices
+block_size = 1024 * 2  # Frames per output callback
+waveform_vertices = VertexModel([(0, 0), (0.5, 1), (1, 0)])  # Initial sine-like waveform vertices
+edit_history = EditHistory(waveform_vertices)  # Undo/redo of vertex edits (Ctrl+Z / Ctrl+Y)
 output_buffer = np.zeros(1024)  # Buffer for visualization
 
+# Filter stage after the oscillator; created when a filter type is first selected (loads scipy.signal)
+filter_type = "off"
+filter_cutoff = 2000.0  # Hz
+filter_q = DEFAULT_Q
+filter_gain_db = 0.0    # Peaking filter only
+output_filter = None
+
+# Convolution reverb after the filter; created when the mix is first raised above 0
+reverb_mix = 0.0
+output_reverb = None
+
+# Always-on safety stage: lookahead limiter with true-peak detection (adds about 5 ms of latency)
+output_limiter = LookaheadLimiter(sample_rate, true_peak=True)
+
 minimum_delta = 0.0001
 num_points = 10
 interpolation_type = "cubic"  # Default interpolation type
 
 
+# Built-in presets, written to the patch library the first time it is created
+def default_patches():
+    x_points = np.linspace(0, 1, num_points)  # `num_points` vertices for a smooth sine wave
+    yield compile_patch("sine", zip(x_points, np.sin(2 * np.pi * x_points)), "cubic")
+    yield compile_patch("triangle", [(0, 0), (1 / 3, 1), (2 / 3, -1), (1, 0)], "linear")
+    yield compile_patch(
+        "square", [(0, 1), (1 / 2, 1), ((1 / 2 + minimum_delta), -1), ((1 - minimum_delta), -1), (1, 1)], "linear"
+    )
+    yield compile_patch("sawtooth", [(0, -1), (1 - minimum_delta, 1), (1, -1)], "linear")
+
+
 # Function to set waveform based on preset selection
 def set_preset_waveform(waveform_type):
     '''
-    :param waveform_type:
-    :return:
+    Load a patch from the library: its vertices, interpolation and precompiled
+    wavetable (a view of the memory-mapped file, so nothing is recompiled).
+
+    :param waveform_type: Patch name
     '''
-    global waveform_vertices
-    if waveform_type == 'sine':
-        # Generate `num_points` vertices for a smooth sine wave
-        x_points = np.linspace(0, 1, num_points)
-        y_points = np.sin(2 * np.pi * x_points)
-        waveform_vertices = list(zip(x_points, y_points))
+    global wavetable, interpolation_type, loading_patch
+    if waveform_type not in preset_library:
+        logging.warning(f"No patch named {waveform_type!r} in {preset_library.path}")
+        return
+    patch = preset_library[waveform_type]
+    interpolation_type = patch.interpolation
+    interp_var.set(interpolation_type)
+    loading_patch = True
+    try:
+        waveform_vertices.reset(patch.vertices)
+    finally:
+        loading_patch = False
+    wavetable = patch.tables
+    if len(wavetable) != MIP_LEVELS:  # Saved with another number of mip levels: rebuild them from level 0
+        wavetable = compile_mip_levels(wavetable[0])
 
-    elif waveform_type == 'triangle':
-        waveform_vertices = [(0, 0), (1 / 3, 1), (2 / 3, -1), (1, 0)]
+    logging.info(f"Set waveform to {waveform_type} preset.")
+    update_plot()  # Refresh the plot with the new vertices
 
-    elif waveform_type == 'square':
-        waveform_vertices = [(0, 1), (1 / 2, 1), ((1 / 2 + minimum_delta), -1), ((1 - minimum_delta), -1), (1, 1)]
 
-    elif waveform_type == 'sawtooth':
-        waveform_vertices = [(0, -1), (1 - minimum_delta, 1), (1, -1)]
+# Save the current waveform into the patch library under a new or existing name
+def save_patch():
+    global wavetable
+    from tkinter import messagebox, simpledialog
 
-    logging.info(f"Set waveform to {waveform_type} preset.")
-    update_plot()  # Refresh the plot with the new vertices
+    name = simpledialog.askstring("Save patch", "Patch name:", initialvalue=waveform_var.get(), parent=root)
+    if not name:
+        return
+    is_new = name not in preset_library
+    vertices = np.column_stack((waveform_vertices.x, waveform_vertices.y))
+    # A loaded patch's tables are a view of the mapped library, which saving closes and replaces
+    wavetable = np.array(wavetable)
+    try:
+        preset_library.save(Patch(name, interpolation_type, vertices, wavetable))
+    except (OSError, ValueError) as e:
+        logging.error(f"Saving patch {name} failed: {e}")
+        messagebox.showerror("Save failed", str(e))
+        return
+    if is_new:
+        preset_dropdown["menu"].add_command(label=name, command=tk._setit(waveform_var, name, set_preset_waveform))
+    waveform_var.set(name)
+    logging.info(f"Saved patch {name} to {preset_library.path}")
+
+# Replace the waveform with one averaged cycle of an audio file
+def import_waveform_file():
+    from tkinter import filedialog, messagebox
+
+    path = filedialog.askopenfilename(
+        title="Import waveform", filetypes=[("WAV files", "*.wav"), ("All files", "*.*")]
+    )
+    if not path:
+        return
+    try:
+        vertices, detected_frequency = import_waveform(path)
+    except (OSError, ValueError) as e:
+        logging.error(f"Import of {path} failed: {e}")
+        messagebox.showerror("Import failed", str(e))
+        return
+    waveform_vertices.reset(vertices)
+    logging.info(f"Imported {len(vertices)} vertices from {path} (fundamental {detected_frequency:.1f} Hz)")
+    update_plot()
 
 current_phase = 0.0  # Tracks the current phase across callbacks
+wavetable = None  # Mip levels of one interpolated cycle, recompiled on every edit
+loading_patch = False  # Set while a patch's vertices are loaded along with its compiled tables
 
-# Function to generate waveform from vertices using interpolation
-def generate_custom_waveform(frames):
-    global current_phase
-    phase_increment = frequency / sample_rate
 
-    x_points, y_points = zip(*waveform_vertices)
+# Recompile the wavetable read by the audio callback (on the GUI thread)
+def compile_current_wavetable(change=None):
+    global wavetable
+    if loading_patch:
+        return
+    wavetable = compile_mip_levels(compile_wavetable(waveform_vertices, interpolation_type))
 
-    # Remove duplicates by creating a dictionary (keeps last occurrence of each x value)
-    unique_points = dict(zip(x_points, y_points))
-    x_points, y_points = zip(*sorted(unique_points.items()))
 
-    y_points = list(y_points)
-    y_points[-1] = y_points[0]  # Ensure continuity by matching endpoints
+waveform_vertices.add_listener(compile_current_wavetable)
 
-    # Choose interpolation type based on the number of unique vertices
-    try:
-        if interpolation_type == "smooth":
-            interpolator = make_interp_spline(x_points, y_points, k=min(3, len(x_points)-1))
-        elif len(x_points) <=4:
-            interpolator = interp1d(x_points, y_points, kind="linear", fill_value="extrapolate")
-        else:
-            interpolator = interp1d(x_points, y_points, kind=interpolation_type, fill_value="extrapolate")
-    except ValueError as e:
-        logging.error(f"Interpolation failed: {e}. Falling back to linear interpolation.")
-        interpolator = interp1d(x_points, y_points, kind="linear", fill_value="extrapolate")
 
-    # Generate time values for the current phase, ensuring continuity
-    t = (np.arange(frames) * phase_increment + current_phase) % 1
-    waveform = interpolator(t)
-    waveform = np.clip(waveform, -1, 1)
+# Function to generate waveform from the compiled wavetable
+def generate_custom_waveform(frames):
+    global current_phase
+    phase_increment = frequency / sample_rate
 
-    # Update the current phase to where this buffer ends
-    current_phase = (current_phase + frames * phase_increment) % 1
+    # Read the band-limited copy of the table that cannot alias at this frequency
+    table = wavetable[mip_level(len(wavetable), phase_increment, wavetable.shape[1] - 1)]
+    waveform, current_phase = render_wavetable(table, frames, current_phase, phase_increment)
 
     return waveform
 
 # Function to plot output buffer for visualization
+@traced("plot_output_buffer")
 def plot_output_buffer():
-    ax_output.clear()
-    ax_output.plot(output_buffer, 'r-')
-    ax_output.set_title("Output Buffer Waveform")
-    ax_output.set_ylim(-1.0, 1.0)
-    canvas_output.draw()
+    if len(output_buffer) != len(output_line.get_xdata()):
+        # The block size changed: new x range, so the cached background is stale
+        output_line.set_data(np.arange(len(output_buffer)), output_buffer)
+        ax_output.set_xlim(0, len(output_buffer) - 1)
+        output_blit.invalidate()
+        return
+    output_line.set_ydata(output_buffer)
+    with span("output_blit.update"):
+        output_blit.update()
 
 
 # Audio callback function
+@traced("audio_callback")
 def audio_callback(outdata, frames, time, status):
     global volume, output_buffer
     waveform = generate_custom_waveform(frames)
-    outdata[:, 0] = (waveform * volume).astype(np.float32) # left
+    active_filter = output_filter if filter_type != "off" else None
+    if active_filter is not None:
+        waveform = active_filter.process(waveform)
+    active_reverb = output_reverb if reverb_mix > 0 else None
+    if active_reverb is not None:
+        waveform = active_reverb.process(waveform)
+    # Resonance and reverb tails can overshoot; the limiter keeps them below the ceiling without clipping
+    waveform = output_limiter.process(waveform * volume)
+    outdata[:, 0] = waveform.astype(np.float32) # left
     outdata[:, 1] = (waveform * 0).astype(np.float32) # right
 
-    # Update output buffer for visualization and plot it
-    output_buffer = waveform * volume  # Copy the waveform into the buffer
-    plot_output_buffer()  # Update plot in real-time
+    # Update output buffer for visualization; the GUI thread plots it on its next frame
+    output_buffer = waveform  # Copy the waveform into the buffer
+    redraw_scheduler.mark_dirty("output")
 
 # Initialize the frame counter for the callback function
 audio_callback.current_frame = 0
 
-# Create the Tkinter window and layout
-root = tk.Tk()
-root.title("Interactive Waveform Editor")
-
-
 # Function to properly close the application
 def on_close():
     logging.info("Closing the application...")
+    redraw_scheduler.stop()
     stream.stop()
     stream.close()
+    callback_stats.stop_logging()
+    logging.info(callback_stats.log_line())
     root.quit()
     root.destroy()
 
 
-# Bind the window close event to the on_close function
-root.protocol("WM_DELETE_WINDOW", on_close)
-
-
 # Function to update frequency and update the frequency label
 def update_frequency(val):
     global frequency
@@ -141,145 +220,153 @@ def update_volume(val):
     logging.info(f"Volume changed to {volume}")
 
 
+# Filter controls; parameter changes glide over the next audio block
+def update_filter_type(val):
+    global filter_type, output_filter
+    if val != "off":
+        if output_filter is None:
+            output_filter = BiquadFilter(val, filter_cutoff, filter_q, filter_gain_db, sample_rate)
+        else:
+            output_filter.set_kind(val)
+            if filter_type == "off":
+                output_filter.reset()  # Do not resume from the state of the last time it was on
+    filter_type = val
+    logging.info(f"Filter type changed to {filter_type}")
+
+
+def update_filter_cutoff(val):
+    global filter_cutoff
+    filter_cutoff = 20 * 1000 ** (float(val) / 1000)  # Slider positions 0..1000 map to 20 Hz..20 kHz
+    cutoff_value_label.config(text=f"{filter_cutoff:.0f}")
+    if output_filter is not None:
+        output_filter.set(frequency=filter_cutoff)
+
+
+def update_filter_q(val):
+    global filter_q
+    filter_q = float(val)
+    if output_filter is not None:
+        output_filter.set(q=filter_q)
+
+
+def update_filter_gain(val):
+    global filter_gain_db
+    filter_gain_db = float(val)
+    if output_filter is not None:
+        output_filter.set(gain_db=filter_gain_db)
+
+
+# Reverb controls; the partitions match the callback block, so the reverb adds no latency
+def update_reverb_mix(val):
+    global reverb_mix, output_reverb
+    mix = float(val)
+    if mix > 0 and output_reverb is None:
+        output_reverb = ConvolutionReverb(synthetic_ir(sample_rate), block_size, mix)
+    if output_reverb is not None:
+        if reverb_mix == 0:
+            output_reverb.reset()  # Do not resume the tail of the last time it was on
+        output_reverb.mix = mix
+    reverb_mix = mix
+
+
+def load_reverb_ir():
+    global output_reverb
+    from tkinter import filedialog, messagebox
+
+    path = filedialog.askopenfilename(
+        title="Load impulse response", filetypes=[("WAV files", "*.wav"), ("All files", "*.*")]
+    )
+    if not path:
+        return
+    try:
+        ir = load_ir(path, sample_rate)
+    except (OSError, ValueError) as e:
+        logging.error(f"Loading impulse response {path} failed: {e}")
+        messagebox.showerror("Load failed", str(e))
+        return
+    output_reverb = ConvolutionReverb(ir, block_size, reverb_mix)
+    logging.info(f"Loaded a {len(ir) / sample_rate:.1f} s impulse response from {path}")
+
+
 # Function to update interpolation type
 def update_interpolation_type(val):
     global interpolation_type
     interpolation_type = val
     logging.info(f"Interpolation type changed to {interpolation_type}")
+    compile_current_wavetable()
     update_plot()
 
 
-# Dropdown menu for interpolation type
-interp_frame = tk.Frame(root)
-interp_frame.pack(pady=10)
-interp_label = tk.Label(interp_frame, text="Interpolation Type")
-interp_label.pack(side="left")
-
-interp_var = tk.StringVar(root)
-interp_var.set("linear")
-interp_dropdown_list = ["linear", "cubic", "nearest", "smooth"]
-
-interp_dropdown = tk.OptionMenu(interp_frame, interp_var, *interp_dropdown_list, command=update_interpolation_type)
-interp_dropdown.pack(side="left")
-
-# Create a frame to hold the sliders side by side
-slider_frame = tk.Frame(root)
-slider_frame.pack()
-
-# Frequency slider frame
-freq_frame = tk.Frame(slider_frame)
-freq_frame.pack(side="left", padx=10)
-
-# Frequency label at the top
-freq_label = tk.Label(freq_frame, text="Frequency (Hz)")
-freq_label.pack()
-
-# Frequency slider
-freq_slider = tk.Scale(freq_frame, from_=20, to=4000, orient='horizontal', command=update_frequency)
-freq_slider.set(frequency)
-freq_slider.pack()
-
-# Frequency value label below the slider
-freq_value_label = tk.Label(freq_frame, text=str(frequency))
-freq_value_label.pack()
-
-# Volume slider frame
-vol_frame = tk.Frame(slider_frame)
-vol_frame.pack(side="left", padx=10)
-
-# Volume label at the top
-vol_label = tk.Label(vol_frame, text="Volume")
-vol_label.pack()
-
-# Volume slider
-vol_slider = tk.Scale(vol_frame, from_=0, to=1, resolution=0.01, orient='horizontal', command=update_volume)
-vol_slider.set(volume)
-vol_slider.pack()
-
-# Volume value label below the slider
-vol_value_label = tk.Label(vol_frame, text=str(volume))
-vol_value_label.pack()
-
-# Dropdown menu for waveform presets
-preset_frame = tk.Frame(root)
-preset_frame.pack(pady=10)
-preset_label = tk.Label(preset_frame, text="Waveform Preset")
-preset_label.pack(side="left")
-
-waveform_var = tk.StringVar(root)
-waveform_var.set("")  # Default to no preset waveform
-
-dropdown_list = ["sine", "triangle", "square", "sawtooth", "custom"]
-
-# Dropdown menu with waveform options
-preset_dropdown = tk.OptionMenu(
-    preset_frame, waveform_var, "", *dropdown_list, command=set_preset_waveform
-)
-preset_dropdown.pack(side="left")
-
-# Matplotlib figure and canvas for interactive waveform editing
-fig, ax = plt.subplots(figsize=(6, 3))
-canvas = FigureCanvasTkAgg(fig, master=root)
-canvas.get_tk_widget().pack()
-
-# Plot initial waveform and set axis limits
-line, = ax.plot(*zip(*waveform_vertices), 'bo-')  # plot vertices as blue circles connected by lines
-ax.set_xlim(0, 1)
-ax.set_ylim(-1.0, 1.0)
-
-# Output buffer plot for visualizing waveform
-fig_output, ax_output = plt.subplots(figsize=(6, 2))
-canvas_output = FigureCanvasTkAgg(fig_output, master=root)
-canvas_output.get_tk_widget().pack()
-
 # Function to update the plot after modifying vertices
+@traced("update_plot")
 def update_plot():
-    x_points, y_points = zip(*waveform_vertices)
-    line.set_data(x_points, y_points)
-    fig.canvas.draw()
+    line.set_data(waveform_vertices.x, waveform_vertices.y)
+    with span("editor_blit.update"):
+        editor_blit.update()
 
 
 # Vertex interaction management
 selected_vertex = None
-vertex_radius = 0.08  # Threshold distance to detect nearby vertices
+vertex_radius = 10  # Threshold distance in pixels to detect nearby vertices
+
+# Freehand drawing: the stroke is simplified while drawing, so it never adds more than this many vertices
+freehand_stroke = None
+freehand_max_points = 64
+freehand_tolerance = 0.005  # Final Ramer-Douglas-Peucker tolerance when the stroke ends
 
 
 # Mouse click event to add points anywhere on the graph or move existing ones
 def on_click(event):
-    global selected_vertex
+    global selected_vertex, freehand_stroke
     if event.inaxes != ax or event.button != 1:  # Only respond to left-clicks
         return
+    edit_history.seal()  # A new gesture never merges into the previous one
+
+    # In freehand mode a left-drag draws a stroke instead of editing single vertices
+    if freehand_var.get():
+        freehand_stroke = StreamingSimplifier(freehand_max_points)
+        freehand_stroke.add(event.xdata, event.ydata)
+        return
 
     # Detect if Ctrl key is held for forced point addition
     ctrl_held = event.key == 'control' if event.key is not None else False
 
     # Add a new vertex if Ctrl is held, regardless of proximity
     if ctrl_held:
-        waveform_vertices.append((event.xdata, event.ydata))
-        waveform_vertices.sort()  # Keep vertices ordered by x
+        waveform_vertices.insert(event.xdata, event.ydata)  # Inserted in x order
         logging.info(f"Ctrl+Click: Added vertex at ({event.xdata:.2f}, {event.ydata:.2f})")
         update_plot()
         return
 
     # Check if click is near an existing vertex to move
-    for i, (x, y) in enumerate(waveform_vertices):
-        if abs(x - event.xdata) < vertex_radius and abs(y - event.ydata) < vertex_radius:
-            selected_vertex = i  # Select this vertex for moving
-            logging.info(f"Selected vertex at ({x:.2f}, {y:.2f}) for moving")
-            return
+    index = waveform_vertices.nearest(event.x, event.y, ax.transData.transform, vertex_radius)
+    if index is not None:
+        selected_vertex = index  # Select this vertex for moving
+        x, y = waveform_vertices[index]
+        logging.info(f"Selected vertex at ({x:.2f}, {y:.2f}) for moving")
+        return
 
     # Add new vertex at the click location if not near any vertex
-    waveform_vertices.append((event.xdata, event.ydata))
-    waveform_vertices.sort()  # Keep vertices ordered by x
-    selected_vertex = waveform_vertices.index((event.xdata, event.ydata))  # Track the new vertex
+    selected_vertex = waveform_vertices.insert(event.xdata, event.ydata)  # Track the new vertex
     logging.info(f"Added vertex at ({event.xdata:.2f}, {event.ydata:.2f})")
     update_plot()
 
 
 # Mouse release event to release the selected vertex
 def on_release(event):
-    global selected_vertex
+    global selected_vertex, freehand_stroke
     selected_vertex = None  # Deselect the vertex after releasing
+    edit_history.seal()  # The whole drag is one undo step
+
+    if freehand_stroke is not None:
+        # Replace the vertices under the stroke with the simplified stroke, as one edit
+        points = rdp(freehand_stroke.result(), freehand_tolerance)
+        freehand_stroke = None
+        stroke_line.set_data([], [])
+        if len(points) > 1:
+            waveform_vertices.splice(points[0, 0], points[-1, 0], points)
+            logging.info(f"Freehand stroke added {len(points)} vertices")
+        update_plot()
 
 
 minimum_delta = 0.01  # Define the minimum delta to keep vertices separated
@@ -287,61 +374,304 @@ minimum_delta = 0.01  # Define the minimum delta to keep vertices separated
 # Mouse motion event to move a selected vertex
 def on_motion(event):
     global selected_vertex
+    if freehand_stroke is not None:
+        # Only keep points moving right, so the stroke stays a function of x
+        if event.inaxes == ax and event.xdata > freehand_stroke.points[-1][0]:
+            freehand_stroke.add(event.xdata, event.ydata)
+            stroke_line.set_data(*freehand_stroke.result().T)
+            redraw_scheduler.mark_dirty("editor")
+        return
+
     if selected_vertex is None or event.inaxes != ax:
         return
 
     # Restrict movement for the first and last vertices to y-coordinate only
     if selected_vertex == 0:
-        waveform_vertices[0] = (0, event.ydata)
+        waveform_vertices.move(0, 0, event.ydata)
     elif selected_vertex == len(waveform_vertices) - 1:
-        waveform_vertices[-1] = (1, event.ydata)
+        waveform_vertices.move(selected_vertex, 1, event.ydata)
     else:
         # Get the x-coordinates of neighboring vertices
-        prev_x = waveform_vertices[selected_vertex - 1][0]
-        next_x = waveform_vertices[selected_vertex + 1][0]
+        prev_x = waveform_vertices.x[selected_vertex - 1]
+        next_x = waveform_vertices.x[selected_vertex + 1]
 
         # Constrain x within neighboring vertices with a minimum delta
         new_x = min(max(event.xdata, prev_x + minimum_delta), next_x - minimum_delta)
 
         # Update the selected vertex position with constrained x and new y
-        waveform_vertices[selected_vertex] = (new_x, event.ydata)
+        waveform_vertices.move(selected_vertex, new_x, event.ydata)
 
-    update_plot()
+    # Motion events arrive much faster than the display refreshes; redraw once per frame
+    redraw_scheduler.mark_dirty("editor")
 
 
 # Right-click event to remove a vertex
 def on_right_click(event):
-    global waveform_vertices
     if event.inaxes != ax or event.button != 3:  # Only respond to right-clicks
         return
 
+    index = waveform_vertices.nearest(event.x, event.y, ax.transData.transform, vertex_radius)
+
     # Prevent deletion of the first and last vertices
-    for i, (x, y) in enumerate(waveform_vertices):
-        if i == 0 or i == len(waveform_vertices) - 1:
-            continue  # Skip deletion for the first and last vertices
-
-        if abs(x - event.xdata) < vertex_radius and abs(y - event.ydata) < vertex_radius:
-            logging.info(f"Removed vertex at ({x:.2f}, {y:.2f})")
-            del waveform_vertices[i]
-            update_plot()
-            break
-
-# Connect Matplotlib events
-fig.canvas.mpl_connect('button_press_event', on_click)
-fig.canvas.mpl_connect('button_release_event', on_release)
-fig.canvas.mpl_connect('motion_notify_event', on_motion)
-fig.canvas.mpl_connect('button_press_event', on_right_click)
-
-#stream = sd.OutputStream(callback=audio_callback, samplerate=sample_rate, channels=1)
-stream = sd.OutputStream(
-    callback=audio_callback,
-    samplerate=sample_rate,
-    channels=2,
-    blocksize=(1024*2),
-    latency='low',
-    prime_output_buffers_using_stream_callback=True
-)
-stream.start()
-
-# Run the Tkinter main loop
-root.mainloop()
+    if index is None or index == 0 or index == len(waveform_vertices) - 1:
+        return
+
+    x, y = waveform_vertices[index]
+    logging.info(f"Removed vertex at ({x:.2f}, {y:.2f})")
+    waveform_vertices.remove(index)
+    update_plot()
+
+
+# Keyboard shortcuts to step through the edit history
+def undo_edit(event=None):
+    if edit_history.undo():
+        update_plot()
+
+
+def redo_edit(event=None):
+    if edit_history.redo():
+        update_plot()
+
+
+def build_gui():
+    """Create the controls and the two plots inside the already open window."""
+    global interp_var, freq_value_label, vol_value_label, waveform_var
+    global fig, ax, line, canvas, editor_blit, ax_output, output_line, output_blit
+    global freehand_var, stroke_line, preset_library, preset_dropdown, cutoff_value_label
+    # matplotlib is only needed once the window is built, after the stream has started
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    import matplotlib.pyplot as plt
+
+    # Dropdown menu for interpolation type
+    interp_frame = tk.Frame(root)
+    interp_frame.pack(pady=10)
+    interp_label = tk.Label(interp_frame, text="Interpolation Type")
+    interp_label.pack(side="left")
+
+    interp_var = tk.StringVar(root)
+    interp_var.set("linear")
+    interp_dropdown_list = ["linear", "cubic", "nearest", "smooth"]
+
+    interp_dropdown = tk.OptionMenu(interp_frame, interp_var, *interp_dropdown_list, command=update_interpolation_type)
+    interp_dropdown.pack(side="left")
+
+    # Create a frame to hold the sliders side by side
+    slider_frame = tk.Frame(root)
+    slider_frame.pack()
+
+    # Frequency slider frame
+    freq_frame = tk.Frame(slider_frame)
+    freq_frame.pack(side="left", padx=10)
+
+    # Frequency label at the top
+    freq_label = tk.Label(freq_frame, text="Frequency (Hz)")
+    freq_label.pack()
+
+    # Frequency slider
+    freq_slider = tk.Scale(freq_frame, from_=20, to=4000, orient='horizontal', command=update_frequency)
+    freq_slider.set(frequency)
+    freq_slider.pack()
+
+    # Frequency value label below the slider
+    freq_value_label = tk.Label(freq_frame, text=str(frequency))
+    freq_value_label.pack()
+
+    # Volume slider frame
+    vol_frame = tk.Frame(slider_frame)
+    vol_frame.pack(side="left", padx=10)
+
+    # Volume label at the top
+    vol_label = tk.Label(vol_frame, text="Volume")
+    vol_label.pack()
+
+    # Volume slider
+    vol_slider = tk.Scale(vol_frame, from_=0, to=1, resolution=0.01, orient='horizontal', command=update_volume)
+    vol_slider.set(volume)
+    vol_slider.pack()
+
+    # Volume value label below the slider
+    vol_value_label = tk.Label(vol_frame, text=str(volume))
+    vol_value_label.pack()
+
+    # Filter type and parameters
+    filter_frame = tk.Frame(root)
+    filter_frame.pack(pady=10)
+    filter_label = tk.Label(filter_frame, text="Filter")
+    filter_label.pack(side="left")
+
+    filter_var = tk.StringVar(root)
+    filter_var.set(filter_type)
+    filter_dropdown = tk.OptionMenu(filter_frame, filter_var, "off", *FILTER_TYPES, command=update_filter_type)
+    filter_dropdown.pack(side="left")
+
+    cutoff_frame = tk.Frame(filter_frame)
+    cutoff_frame.pack(side="left", padx=10)
+    cutoff_label = tk.Label(cutoff_frame, text="Cutoff (Hz)")
+    cutoff_label.pack()
+    cutoff_slider = tk.Scale(cutoff_frame, from_=0, to=1000, orient='horizontal', showvalue=False,
+                             command=update_filter_cutoff)
+    cutoff_slider.set(1000 * np.log(filter_cutoff / 20) / np.log(1000))
+    cutoff_slider.pack()
+    cutoff_value_label = tk.Label(cutoff_frame, text=f"{filter_cutoff:.0f}")
+    cutoff_value_label.pack()
+
+    q_frame = tk.Frame(filter_frame)
+    q_frame.pack(side="left", padx=10)
+    q_label = tk.Label(q_frame, text="Q")
+    q_label.pack()
+    q_slider = tk.Scale(q_frame, from_=0.1, to=10, resolution=0.01, orient='horizontal', command=update_filter_q)
+    q_slider.set(filter_q)
+    q_slider.pack()
+
+    gain_frame = tk.Frame(filter_frame)
+    gain_frame.pack(side="left", padx=10)
+    gain_label = tk.Label(gain_frame, text="Peak gain (dB)")
+    gain_label.pack()
+    gain_slider = tk.Scale(gain_frame, from_=-24, to=24, resolution=0.5, orient='horizontal',
+                           command=update_filter_gain)
+    gain_slider.set(filter_gain_db)
+    gain_slider.pack()
+
+    # Reverb mix (0 = off) and impulse response
+    reverb_frame = tk.Frame(root)
+    reverb_frame.pack(pady=10)
+    reverb_label = tk.Label(reverb_frame, text="Reverb mix")
+    reverb_label.pack(side="left")
+    reverb_slider = tk.Scale(reverb_frame, from_=0, to=1, resolution=0.01, orient='horizontal',
+                             command=update_reverb_mix)
+    reverb_slider.set(reverb_mix)
+    reverb_slider.pack(side="left")
+    ir_button = tk.Button(reverb_frame, text="Impulse response...", command=load_reverb_ir)
+    ir_button.pack(side="left", padx=10)
+
+    # Dropdown menu for waveform presets
+    preset_frame = tk.Frame(root)
+    preset_frame.pack(pady=10)
+    preset_label = tk.Label(preset_frame, text="Waveform Preset")
+    preset_label.pack(side="left")
+
+    waveform_var = tk.StringVar(root)
+    waveform_var.set("")  # Default to no preset waveform
+
+    # Only the library index is read here; patches are memory-mapped when selected
+    preset_library = open_library(defaults=default_patches())
+    dropdown_list = preset_library.names()
+
+    # Dropdown menu with waveform options
+    preset_dropdown = tk.OptionMenu(
+        preset_frame, waveform_var, *dropdown_list, command=set_preset_waveform
+    )
+    preset_dropdown.pack(side="left")
+
+    # Store the current waveform as a patch
+    save_button = tk.Button(preset_frame, text="Save...", command=save_patch)
+    save_button.pack(side="left", padx=(5, 0))
+
+    # Freehand drawing mode toggle
+    freehand_var = tk.BooleanVar(root, value=False)
+    freehand_check = tk.Checkbutton(preset_frame, text="Freehand draw", variable=freehand_var)
+    freehand_check.pack(side="left", padx=10)
+
+    # Import a single cycle from an audio file
+    import_button = tk.Button(preset_frame, text="Import...", command=import_waveform_file)
+    import_button.pack(side="left")
+
+    # Matplotlib figure and canvas for interactive waveform editing
+    fig, ax = plt.subplots(figsize=(6, 3))
+    canvas = FigureCanvasTkAgg(fig, master=root)
+    canvas.get_tk_widget().pack()
+
+    # Plot initial waveform and set axis limits
+    line, = ax.plot(waveform_vertices.x, waveform_vertices.y, 'bo-')  # plot vertices as blue circles connected by lines
+    ax.set_xlim(0, 1)
+    ax.set_ylim(-1.0, 1.0)
+    stroke_line, = ax.plot([], [], 'g-')  # Freehand stroke while it is being drawn
+    # Only the vertex line is redrawn while editing; the axes come from the cached background
+    editor_blit = BlitManager(canvas, [line, stroke_line])
+
+    # Output buffer plot for visualizing waveform
+    fig_output, ax_output = plt.subplots(figsize=(6, 2))
+    canvas_output = FigureCanvasTkAgg(fig_output, master=root)
+    canvas_output.get_tk_widget().pack()
+
+    output_line, = ax_output.plot(output_buffer, 'r-')
+    ax_output.set_title("Output Buffer Waveform")
+    ax_output.set_xlim(0, len(output_buffer) - 1)
+    ax_output.set_ylim(-1.0, 1.0)
+    output_blit = BlitManager(canvas_output, [output_line])
+
+    # Connect Matplotlib events
+    fig.canvas.mpl_connect('button_press_event', on_click)
+    fig.canvas.mpl_connect('button_release_event', on_release)
+    fig.canvas.mpl_connect('motion_notify_event', on_motion)
+    fig.canvas.mpl_connect('button_press_event', on_right_click)
+
+    root.bind_all('<Control-z>', undo_edit)
+    root.bind_all('<Control-y>', redo_edit)
+    root.bind_all('<Control-Z>', redo_edit)  # Ctrl+Shift+Z
+
+    redraw_scheduler.add_view("editor", update_plot)
+    redraw_scheduler.add_view("output", plot_output_buffer)
+
+
+def main():
+    """Start the output stream as early as possible, then build the editor and run the Tk main loop."""
+    global root, redraw_scheduler, callback_stats, stream
+
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Compile the initial wavetable (and load scipy.interpolate) before the first audio callback
+    compile_current_wavetable()
+
+    # Create the Tkinter window
+    root = tk.Tk()
+    root.title("Interactive Waveform Editor")
+
+    # Bind the window close event to the on_close function
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
+    # Redraws requested by mouse motion and the audio callback are coalesced to one per frame
+    redraw_scheduler = TkRedrawScheduler(root, max_fps=60)
+
+    #stream = get_backend().output_stream(callback=audio_callback, samplerate=sample_rate, channels=1)
+    # The engine renders at `sample_rate`; if the device runs at another native rate, resample here
+    # instead of leaving it to PortAudio or the OS. Whole engine blocks keep the reverb partitions aligned.
+    backend = get_backend()
+    device_rate = int(backend.default_samplerate())
+    callback = audio_callback
+    device_block_size = block_size
+    if device_rate != sample_rate:
+        resampler = StreamingResampler(sample_rate, device_rate, channels=2)
+        callback = resampler.wrap(audio_callback, chunk=block_size)
+        # Rounded down: one engine block always covers a callback, so no callback renders two
+        # (rounding up makes the buffered surplus run out every few callbacks)
+        device_block_size = block_size * device_rate // sample_rate
+        logging.info(f"Resampling {sample_rate} Hz to the device's {device_rate} Hz")
+
+    # Time every callback against its budget and log a summary periodically
+    callback_stats = CallbackStats("Output callback", device_rate)
+    callback_stats.start_logging()
+    metrics.registry.add_collector("wave_gen_output_callback", callback_stats.snapshot)
+    metrics.start_exporter_from_env()
+
+    stream = backend.output_stream(
+        callback=callback_stats.wrap(callback),
+        samplerate=device_rate,
+        channels=2,
+        blocksize=device_block_size,
+        latency='low',
+        prime_output_buffers_using_stream_callback=True
+    )
+    stream.start()
+
+    # The first blocks play while the plots are being built; redraws start with the scheduler
+    build_gui()
+    redraw_scheduler.start()
+
+    # Run the Tkinter main loop
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import numpy as np
+
+from audio_files import open_audio, to_float
+from curve_simplify import rdp
+
+ANALYSIS_SECONDS = 2.0   # Audio analysed for the period, taken from the middle of the file
+MIN_FREQUENCY = 20       # Lowest fundamental considered (Hz)
+MAX_FREQUENCY = 4000     # Highest fundamental considered (Hz)
+CYCLE_POINTS = 1024      # Resolution of the averaged cycle
+TOLERANCE = 0.01         # Maximum deviation of the fitted vertices from the averaged cycle
+
+
+def detect_period(samples, sample_rate, min_frequency=MIN_FREQUENCY, max_frequency=MAX_FREQUENCY):
+    """
+    Estimate the fundamental period with an FFT-based autocorrelation.
+
+    Returns:
+        Period in samples (fractional, refined with a parabolic fit around the peak).
+    """
+    samples = samples - samples.mean()
+    n = len(samples)
+    size = 1 << int(np.ceil(np.log2(2 * n)))  # Zero padding avoids circular wrap-around
+    spectrum = np.fft.rfft(samples, size)
+    autocorrelation = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+    # Unbiased estimate, so long lags are not penalized for overlapping less
+    autocorrelation /= np.arange(n, 0, -1)
+
+    min_lag = max(1, int(sample_rate / max_frequency))
+    max_lag = min(n - 2, int(sample_rate / min_frequency))
+    if max_lag <= min_lag:
+        raise ValueError("Not enough audio to detect a period in the requested frequency range")
+    # Skip the peak around lag 0: start searching where the autocorrelation first turns negative
+    negative = np.flatnonzero(autocorrelation[min_lag:max_lag + 1] < 0)
+    if len(negative) == 0:
+        raise ValueError("No periodicity found in the requested frequency range")
+    min_lag += int(negative[0])
+    window = autocorrelation[min_lag:max_lag + 1]
+    # The first lag that comes close to the highest peak is the fundamental, not a multiple of it
+    candidates = np.flatnonzero(window >= 0.9 * window.max())
+    lag = min_lag + int(candidates[0])
+    while lag + 1 <= max_lag and autocorrelation[lag + 1] > autocorrelation[lag]:
+        lag += 1
+
+    left, center, right = autocorrelation[lag - 1], autocorrelation[lag], autocorrelation[lag + 1]
+    denominator = left - 2 * center + right
+    offset = 0.5 * (left - right) / denominator if denominator != 0 else 0.0
+    return lag + offset
+
+
+def average_cycle(samples, period, points=CYCLE_POINTS):
+    """
+    Average every whole cycle of `samples`, resampled to `points` values.
+
+    All cycles are interpolated in a single `np.interp` call over a
+    (cycles, points) grid of positions. The cycles start at the first rising
+    zero crossing so the result begins near zero.
+    """
+    crossings = np.flatnonzero((samples[:-1] <= 0) & (samples[1:] > 0))
+    start = 0.0
+    if len(crossings) and crossings[0] < period:
+        i = crossings[0]
+        start = i + samples[i] / (samples[i] - samples[i + 1])  # Interpolated crossing
+    cycles = int((len(samples) - 1 - start) // period)
+    if cycles < 1:
+        raise ValueError("Less than one full cycle of audio")
+    positions = start + period * (np.arange(cycles)[:, np.newaxis] + np.arange(points) / points)
+    values = np.interp(positions.ravel(), np.arange(len(samples)), samples).reshape(cycles, points)
+    return values.mean(axis=0)
+
+
+def fit_vertices(cycle, tolerance=TOLERANCE):
+    """
+    Fit a minimal set of (x, y) vertices to one cycle, x in [0, 1].
+
+    The cycle is normalized to a peak of 1 and closed (the last vertex repeats
+    the first value), then simplified with Ramer-Douglas-Peucker so no sample
+    deviates from the vertex polyline by more than `tolerance`.
+    """
+    peak = np.abs(cycle).max()
+    if peak > 0:
+        cycle = cycle / peak
+    x = np.arange(len(cycle) + 1) / len(cycle)
+    y = np.append(cycle, cycle[0])
+    return [(float(px), float(py)) for px, py in rdp(np.column_stack((x, y)), tolerance)]
+
+
+def import_waveform(path, tolerance=TOLERANCE, analysis_seconds=ANALYSIS_SECONDS):
+    """
+    Load an audio file and turn one averaged cycle into waveform vertices.
+
+    Only `analysis_seconds` from the middle of the file are read (the file is
+    memory-mapped), so long recordings import as fast as short ones.
+
+    Returns:
+        (vertices, frequency) with the vertices as (x, y) pairs and the detected fundamental in Hz.
+    """
+    data, sample_rate = open_audio(path)
+    length = min(len(data), int(analysis_seconds * sample_rate))
+    start = (len(data) - length) // 2
+    samples = to_float(data[start:start + length]).mean(axis=1)  # Mix down to mono
+
+    period = detect_period(samples, sample_rate)
+    cycle = average_cycle(samples, period)
+    return fit_vertices(cycle, tolerance), sample_rate / period
@@ -0,0 +1,145 @@
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+TIME_RESOLUTION = 0.5  # Longest stretch of signal one spectrum may cover, in seconds
+MIN_N_FFT = 16         # Shortest FFT, however narrow the band
+
+
+class _Band:
+    """Filter, decimation and ring state for one band; replaced as a whole on retuning."""
+    def __init__(self, sample_rate, freq_min, freq_max, time_resolution, max_bins, filter_order):
+        self.freq_min = freq_min
+        self.freq_max = freq_max
+        self.center = (freq_min + freq_max) / 2
+
+        # Low-pass just wider than half the band, decimate with ~25% headroom
+        cutoff = (freq_max - freq_min) / 2 * 1.05
+        self.decimation = max(1, int(sample_rate // (2.5 * cutoff)))
+        self.decimated_rate = sample_rate / self.decimation
+        self.sos = butter(filter_order, cutoff, fs=sample_rate, output='sos')
+
+        # Longest power-of-two window that fits in the time resolution, halved until the
+        # band has no more bins than the caller can show
+        self.n_fft = max(MIN_N_FFT, 2 ** int(np.log2(max(1.0, self.decimated_rate * time_resolution))))
+        while True:
+            freqs = self.center + np.fft.fftshift(np.fft.fftfreq(self.n_fft, d=1.0 / self.decimated_rate))
+            self.band_indices = np.where((freqs >= freq_min) & (freqs <= freq_max))[0]
+            if max_bins is None or len(self.band_indices) <= max_bins or self.n_fft <= MIN_N_FFT:
+                break
+            self.n_fft //= 2
+        self.freqs = freqs[self.band_indices]
+        self.window = np.hanning(self.n_fft)
+
+        # Carried state between blocks
+        self.zi = np.zeros((self.sos.shape[0], 2), dtype=np.complex128)
+        self.mixer_phase = 0.0
+        self.decimation_offset = 0
+        self.ring = np.zeros(self.n_fft, dtype=np.complex128)
+        self.write_index = 0
+
+
+class ZoomSpectrum:
+    """
+    Streaming band-limited ("zoom") spectrum using heterodyne-and-decimate.
+
+    The input is mixed down so that the centre of the requested band sits at
+    0 Hz, low-pass filtered and decimated. Only the decimated samples are kept,
+    so a long analysis window (and therefore a fine frequency resolution) over
+    a narrow band costs a small complex FFT instead of a giant full-band one.
+
+    The FFT length follows the band: it is the longest power of two whose
+    window spans at most `time_resolution` seconds of decimated signal, so a
+    narrow band does not smear the display over many seconds.
+
+    `push` runs on the audio thread and `set_band` / `spectrum` on the GUI
+    thread. `set_band` only prepares the new band; `push` switches to it at
+    the start of the next block, and `spectrum` always reads one consistent band.
+    """
+    def __init__(self, sample_rate, freq_min, freq_max, time_resolution=TIME_RESOLUTION, max_bins=None,
+                 filter_order=8):
+        """
+        Args:
+            sample_rate: Sampling rate of the input stream in Hz.
+            freq_min: Lower edge of the band to analyse in Hz.
+            freq_max: Upper edge of the band to analyse in Hz.
+            time_resolution: Longest stretch of signal, in seconds, one spectrum may cover.
+            max_bins: Most bins `spectrum` may return (e.g. the rows of the display), or None.
+            filter_order: Order of the anti-aliasing Butterworth filter.
+        """
+        self.sample_rate = sample_rate
+        self.time_resolution = time_resolution
+        self.max_bins = max_bins
+        self.filter_order = filter_order
+        self.set_band(freq_min, freq_max)
+        self._band = self._requested
+
+    def set_band(self, freq_min, freq_max):
+        """Retune the analyser to a new band; the carried state restarts with the next pushed block."""
+        if not 0 <= freq_min < freq_max <= self.sample_rate / 2:
+            raise ValueError(f"Invalid band: {freq_min}-{freq_max} Hz")
+        self._requested = _Band(self.sample_rate, freq_min, freq_max, self.time_resolution, self.max_bins,
+                                self.filter_order)
+
+    @property
+    def freqs(self):
+        """Frequencies in Hz of the bins returned by `spectrum`."""
+        return self._band.freqs
+
+    @property
+    def n_fft(self):
+        """Length of the FFT over the decimated signal."""
+        return self._band.n_fft
+
+    @property
+    def resolution(self):
+        """Frequency spacing of the output bins in Hz."""
+        return self._band.decimated_rate / self._band.n_fft
+
+    def push(self, block):
+        """Mix down, filter and decimate a block of real input samples."""
+        # Switch to a band requested by `set_band` (a single reference swap, so no lock)
+        band = self._requested
+        if band is not self._band:
+            self._band = band
+
+        block = np.asarray(block, dtype=np.float64)
+        frames = len(block)
+
+        # Heterodyne the band centre to 0 Hz, keeping the oscillator phase continuous
+        step = -2 * np.pi * band.center / self.sample_rate
+        mixed = block * np.exp(1j * (band.mixer_phase + step * np.arange(frames)))
+        band.mixer_phase = (band.mixer_phase + step * frames) % (2 * np.pi)
+
+        filtered, band.zi = sosfilt(band.sos, mixed, zi=band.zi)
+
+        # Keep every Nth sample, continuing the decimation grid across blocks
+        decimated = filtered[band.decimation_offset::band.decimation]
+        band.decimation_offset = (band.decimation_offset - frames) % band.decimation
+
+        # Append to the ring of decimated samples
+        count = len(decimated)
+        if count >= band.n_fft:
+            band.ring[:] = decimated[-band.n_fft:]
+            band.write_index = 0
+            return
+        end = band.write_index + count
+        if end <= band.n_fft:
+            band.ring[band.write_index:end] = decimated
+        else:
+            split = band.n_fft - band.write_index
+            band.ring[band.write_index:] = decimated[:split]
+            band.ring[:end - band.n_fft] = decimated[split:]
+        band.write_index = end % band.n_fft
+
+    def spectrum(self):
+        """
+        Power spectrum of the most recent `n_fft` decimated samples.
+
+        Returns:
+            Array of power values for the bins in `self.freqs` (freq_min to freq_max).
+        """
+        band = self._band
+        write_index = band.write_index
+        ordered = np.concatenate((band.ring[write_index:], band.ring[:write_index]))
+        spectrum = np.fft.fftshift(np.fft.fft(ordered * band.window))
+        return np.abs(spectrum[band.band_indices]) ** 2 / band.n_fft